@@ -2,11 +2,44 @@ from flask import Flask, render_template
 from flask_pymongo import PyMongo
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
+from flask_sock import Sock
+from pymongo import monitoring
 from config import Config
+from .utils.spatial_index import LiveRideIndex
+from .utils.cache import TieredCache
+from .utils.maps_client import MapsClient
+from .utils.events import EventBroker
+from .utils.location_relay import LocationRelay
+from .utils.location_buffer import LocationWriteBuffer
+from .utils.trajectory import TrajectoryRecorder
+from .utils.landmark_matrix import LandmarkMatrix
+from .utils.distance_matrix import CachedDistanceMatrix
+from .utils.directions_cache import DirectionsCache
+from .utils.autocomplete import AutocompleteIndex
+from .utils.offline_geocoder import OfflineGeocoder
+from .utils.token_cache import VerifiedTokenCache
+from .utils.revocation import RevocationList
+from .utils.dataloader import query_counter
+from .utils.json_provider import ORJSONProvider
 
 mongo = PyMongo()
 bcrypt = Bcrypt()
 cors = CORS()
+sock = Sock()
+live_rides = LiveRideIndex()
+geocode_cache = TieredCache('reverse_geocode', 'GEOCODE_CACHE')
+maps_client = MapsClient()
+ride_events = EventBroker()
+location_relay = LocationRelay()
+location_buffer = LocationWriteBuffer()
+trajectories = TrajectoryRecorder()
+landmark_matrix = LandmarkMatrix()
+distance_matrix = CachedDistanceMatrix(maps_client)
+directions_cache = DirectionsCache(maps_client)
+autocomplete_index = AutocompleteIndex(maps_client)
+offline_geocoder = OfflineGeocoder()
+token_cache = VerifiedTokenCache()
+revocations = RevocationList()
 
 def create_app():
     """Application factory function."""
@@ -18,14 +51,41 @@ def create_app():
     
     app.config.from_object(Config)
 
+    # Query counting for tests must be registered before the client exists
+    if app.config.get('MONGO_COUNT_QUERIES'):
+        monitoring.register(query_counter)
+    
     # Initialize MongoDB only if MONGO_URI is configured
     if app.config.get('MONGO_URI'):
         mongo.init_app(app)
     else:
         print("Warning: MONGO_URI not configured. Database features will be disabled.")
+
+    # orjson-backed jsonify that understands ObjectId, datetime and Decimal.
+    # Installed after mongo.init_app, which sets its own BSON provider.
+    app.json = ORJSONProvider(app)
     
     bcrypt.init_app(app)
+    token_cache.init_app(app)
     cors.init_app(app, resources={r"/api/*": {"origins": "*"}})
+    live_rides.init_app(app)
+    geocode_cache.init_app(app)
+    offline_geocoder.init_app(app)
+    maps_client.init_app(app)
+    landmark_matrix.init_app(app)
+    distance_matrix.init_app(app)
+    directions_cache.init_app(app)
+    autocomplete_index.init_app(app)
+    ride_events.init_app(app)
+    location_relay.init_app(app)
+    trajectories.init_app(app)
+    
+    from .models.ride_model import Ride
+    location_buffer.init_app(app, Ride.bulk_update_current_locations)
+    
+    from .models.token_model import RevokedToken
+    revocations.init_app(app, RevokedToken.find_revoked_since)
+    sock.init_app(app)
 
     # -------------------------
     # Frontend Routes
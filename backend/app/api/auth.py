@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify, make_response, current_app
 from app.models.user_model import User
-from .. import mongo
+from app.models.token_model import RevokedToken
+from .. import mongo, token_cache, revocations
 from app.utils.jwt_utils import generate_jwt_token, verify_jwt_token, token_required
+from app.utils.validation import validate_body
+from .schemas import RegisterBody, LoginBody
 import datetime
 import secrets
 
@@ -11,10 +14,9 @@ ALLOWED_EMAIL_DOMAIN = "kristujayanti.com"
 CONFIRMATION_TOKEN_EXPIRATION_HOURS = 24
 
 @auth_bp.route('/register', methods=['POST'])
+@validate_body(RegisterBody)
 def register():
-    data = request.get_json()
-    if not all(k in data for k in ['email', 'password', 'name', 'homeAddress', 'coordinates', 'role']):
-        return jsonify({"error": "Missing required fields"}), 400
+    data = request.payload
 
     email = data['email']
     if not email.endswith(f"@{ALLOWED_EMAIL_DOMAIN}"):
@@ -23,16 +25,12 @@ def register():
     if User.find_by_email(email):
         return jsonify({"error": "Email already registered"}), 409
 
-    coordinates = data['coordinates']
-    if not isinstance(coordinates, list) or len(coordinates) != 2:
-        return jsonify({"error": "Invalid coordinates format"}), 400
-
     new_user = User(
         name=data['name'],
         email=email,
         password=data['password'],
         home_address_text=data['homeAddress'],
-        coordinates=coordinates,
+        coordinates=data['coordinates'],
         role=data['role']
     )
     result = new_user.save()
@@ -66,10 +64,9 @@ def confirm_email(token):
     return make_response("<h1>Your email has been confirmed successfully! You can now log in.</h1>", 200)
 
 @auth_bp.route('/login', methods=['POST'])
+@validate_body(LoginBody)
 def login():
-    data = request.get_json()
-    if not data or not data.get('email') or not data.get('password'):
-        return jsonify({"error": "Missing email or password"}), 400
+    data = request.payload
 
     user_data = User.find_by_email(data['email'])
     if user_data and user_data.get('status') != 'verified':
@@ -110,9 +107,20 @@ def verify_token():
 @auth_bp.route('/logout', methods=['POST'])
 @token_required
 def logout():
-    """Logout endpoint (client should remove token)"""
+    """Logout endpoint: revokes the current token on every worker"""
+    payload = verify_jwt_token(request.auth_token)
+    if payload and payload.get('jti'):
+        RevokedToken.revoke(payload['jti'], payload['user_id'], payload['exp'])
+        revocations.add(payload['jti'], payload['exp'])
+    token_cache.evict(request.auth_token)
     return jsonify({"message": "Logged out successfully"}), 200
 
+@auth_bp.route('/token-cache-stats', methods=['GET'])
+@token_required
+def get_token_cache_stats():
+    """Hit rate of the verified-token cache used by token_required, and revocation counters"""
+    return jsonify(dict(token_cache.stats(), revocations=revocations.stats())), 200
+
 @auth_bp.route('/profile', methods=['GET'])
 @token_required
 def get_profile():
@@ -1,109 +1,126 @@
 # Add this to your existing backend/app/api/ directory as maps.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from ..utils.jwt_utils import token_required
+from ..utils.distance_utils import quantize_coordinates
+from ..utils.directions_cache import estimate_directions
+from ..utils.offline_geocoder import geocode_response
+from ..utils.validation import validate_body
+from .schemas import ReverseGeocodeBody, AutocompleteBody, PlaceDetailsBody, DirectionsBody, DistanceMatrixBody
+from ..models.user_model import User
+from .. import mongo, geocode_cache, maps_client, landmark_matrix, distance_matrix, directions_cache, autocomplete_index, offline_geocoder
 import requests
-import os
 
 maps_bp = Blueprint('maps_bp', __name__)
 
 @maps_bp.route('/reverse-geocode', methods=['POST'])
 @token_required
+@validate_body(ReverseGeocodeBody)
 def reverse_geocode():
     """Convert coordinates to human-readable address"""
-    data = request.get_json()
-    
-    if 'lat' not in data or 'lng' not in data:
-        return jsonify({"error": "Latitude and longitude required"}), 400
-    
+    data = request.payload
     lat = data['lat']
     lng = data['lng']
     
-    # Get Google Maps API key from environment
-    api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-    if not api_key:
+    # Nearby points (same gate, same hostel block) share one cache entry
+    cell_lat, cell_lng = quantize_coordinates(lat, lng, current_app.config['GEOCODE_CACHE_GRID_DEG'])
+    cache_key = f"{cell_lat},{cell_lng}"
+    
+    cached = geocode_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached), 200
+    
+    # Nearest named place from the local index; Google only when asked to refine or on a miss
+    if not data['refine']:
+        place = offline_geocoder.lookup(lat, lng)
+        if place is not None:
+            return jsonify(geocode_response(place)), 200
+    
+    # API key is read once at start-up by the shared maps client
+    if not maps_client.api_key:
         return jsonify({"error": "Maps API key not configured"}), 500
     
     try:
         # Call Google Maps Geocoding API
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
-            'latlng': f"{lat},{lng}",
-            'key': api_key
+            'latlng': cache_key
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = maps_client.get('geocode', params)
         
         if response.status_code == 200:
-            return jsonify(response.json()), 200
+            geocode_data = response.json()
+            
+            # Only cache real answers, never quota or request errors
+            if geocode_data.get('status') == 'OK':
+                geocode_cache.set(cache_key, geocode_data)
+            
+            return jsonify(geocode_data), 200
         else:
             return jsonify({"error": "Geocoding service unavailable"}), 503
             
     except requests.RequestException as e:
         return jsonify({"error": "Failed to connect to geocoding service"}), 503
 
+def get_saved_places(user_id):
+    """The user's saved places, cached briefly so typing doesn't hit the database per keystroke"""
+    saved = autocomplete_index.saved_places.get(user_id)
+    if saved is None:
+        saved = User.find_saved_places(user_id) if mongo.db is not None else []
+        autocomplete_index.saved_places.set(user_id, saved)
+    return saved
+
 @maps_bp.route('/autocomplete', methods=['POST'])
 @token_required
+@validate_body(AutocompleteBody)
 def places_autocomplete():
     """Get place suggestions for autocomplete"""
-    data = request.get_json()
+    query = request.payload['input']
+    saved_places = get_saved_places(request.current_user['user_id'])
     
-    if 'input' not in data:
-        return jsonify({"error": "Input query required"}), 400
+    # Prefixes already seen are answered from the local trie
+    suggestions = autocomplete_index.lookup(query, saved_places)
+    if suggestions is not None:
+        return jsonify(suggestions), 200
     
-    query = data['input']
-    
-    # Get Google Maps API key from environment
-    api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-    if not api_key:
+    # API key is read once at start-up by the shared maps client
+    if not maps_client.api_key:
         return jsonify({"error": "Maps API key not configured"}), 500
     
     try:
-        # Call Google Places Autocomplete API
-        url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
-        params = {
-            'input': query,
-            'key': api_key,
-            'components': 'country:in',  # Restrict to India
-            'types': 'establishment|geocode'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Autocomplete service unavailable"}), 503
-            
+        # Concurrent requests for the same prefix share one Places Autocomplete call
+        provider_data = autocomplete_index.fetch(query)
     except requests.RequestException as e:
         return jsonify({"error": "Failed to connect to autocomplete service"}), 503
+    
+    if provider_data is None:
+        return jsonify({"error": "Autocomplete service unavailable"}), 503
+    
+    # Rank the fresh provider results together with saved and popular places
+    suggestions = autocomplete_index.lookup(query, saved_places, force=True)
+    if suggestions is None or not suggestions['predictions']:
+        return jsonify(provider_data), 200
+    return jsonify(suggestions), 200
 
 @maps_bp.route('/place-details', methods=['POST'])
 @token_required
+@validate_body(PlaceDetailsBody)
 def get_place_details():
     """Get detailed information about a place"""
-    data = request.get_json()
-    
-    if 'place_id' not in data:
-        return jsonify({"error": "Place ID required"}), 400
+    place_id = request.payload['place_id']
     
-    place_id = data['place_id']
-    
-    # Get Google Maps API key from environment
-    api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-    if not api_key:
+    # API key is read once at start-up by the shared maps client
+    if not maps_client.api_key:
         return jsonify({"error": "Maps API key not configured"}), 500
     
     try:
         # Call Google Places Details API
-        url = "https://maps.googleapis.com/maps/api/place/details/json"
         params = {
             'place_id': place_id,
-            'key': api_key,
             'fields': 'name,formatted_address,geometry,types,rating,user_ratings_total'
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = maps_client.get('place_details', params)
         
         if response.status_code == 200:
             return jsonify(response.json()), 200
@@ -113,111 +130,119 @@ def get_place_details():
     except requests.RequestException as e:
         return jsonify({"error": "Failed to connect to place details service"}), 503
 
+def format_distance(meters):
+    """Google-style distance text, e.g. 850 m or 12.4 km"""
+    return f"{round(meters)} m" if meters < 1000 else f"{meters / 1000:.1f} km"
+
+def format_duration(seconds):
+    """Google-style duration text, e.g. 25 mins or 1 hour 5 mins"""
+    minutes = max(1, round(seconds / 60))
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours > 1 else ''}")
+    if minutes or not hours:
+        parts.append(f"{minutes} min{'s' if minutes != 1 else ''}")
+    return ' '.join(parts)
+
+def format_route(route):
+    """Directions route summary from a dict with distance_m, duration_s and polyline"""
+    return {
+        'distance': format_distance(route['distance_m']),
+        'distance_value': round(route['distance_m']),
+        'duration': format_duration(route['duration_s']),
+        'duration_value': round(route['duration_s']),
+        'start_address': route.get('start_address', ''),
+        'end_address': route.get('end_address', ''),
+        'polyline': route['polyline']
+    }
+
 @maps_bp.route('/directions', methods=['POST'])
 @token_required  
+@validate_body(DirectionsBody)
 def get_directions():
     """Get driving directions between two points"""
-    data = request.get_json()
-    
-    required_fields = ['origin', 'destination']
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Origin and destination required"}), 400
-    
+    data = request.payload
     origin = data['origin']
     destination = data['destination']
     
-    # Get Google Maps API key from environment
-    api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-    if not api_key:
+    # Trips to or from a popular destination are answered from the precomputed matrix
+    if isinstance(origin, dict) and isinstance(destination, dict):
+        precomputed = landmark_matrix.lookup(
+            [origin['lng'], origin['lat']], [destination['lng'], destination['lat']], with_route=True
+        )
+        # Only real road data; an estimated matrix is no substitute for a route
+        if precomputed and precomputed['source'] == 'road' and precomputed.get('polyline'):
+            return jsonify({
+                'status': 'OK',
+                'source': 'precomputed',
+                'route': format_route(precomputed)
+            }), 200
+    
+    # API key is read once at start-up by the shared maps client
+    if not maps_client.api_key:
         return jsonify({"error": "Maps API key not configured"}), 500
     
-    try:
-        # Call Google Directions API
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
-            'origin': f"{origin['lat']},{origin['lng']}" if isinstance(origin, dict) else origin,
-            'destination': f"{destination['lat']},{destination['lng']}" if isinstance(destination, dict) else destination,
-            'key': api_key,
-            'mode': 'driving',
-            'alternatives': 'false',
-            'optimize': 'true'
-        }
-        
-        response = requests.get(url, params=params, timeout=15)
-        
-        if response.status_code == 200:
-            directions_data = response.json()
-            
-            # Extract useful information
-            if directions_data['status'] == 'OK' and directions_data['routes']:
-                route = directions_data['routes'][0]
-                leg = route['legs'][0]
-                
-                simplified_response = {
-                    'status': 'OK',
-                    'route': {
-                        'distance': leg['distance']['text'],
-                        'distance_value': leg['distance']['value'],  # in meters
-                        'duration': leg['duration']['text'],
-                        'duration_value': leg['duration']['value'],  # in seconds
-                        'start_address': leg['start_address'],
-                        'end_address': leg['end_address'],
-                        'polyline': route['overview_polyline']['points']
-                    }
-                }
-                
-                return jsonify(simplified_response), 200
-            else:
-                return jsonify({
-                    'status': 'NOT_FOUND',
-                    'error': 'No route found between the specified points'
-                }), 404
-        else:
-            return jsonify({"error": "Directions service unavailable"}), 503
-            
-    except requests.RequestException as e:
-        return jsonify({"error": "Failed to connect to directions service"}), 503
+    # Cached routes are served at once (stale ones refresh in the background);
+    # Google is only waited on briefly, and skipped while its circuit is open
+    cached, source = directions_cache.get(origin, destination)
+    
+    if cached is None:
+        if isinstance(origin, dict) and isinstance(destination, dict):
+            return jsonify({
+                'status': 'OK',
+                'source': 'estimate',
+                'route': format_route(estimate_directions(origin, destination))
+            }), 200
+        return jsonify({"error": "Directions service unavailable"}), 503
+    
+    if cached['route'] is None:
+        return jsonify({
+            'status': 'NOT_FOUND',
+            'error': 'No route found between the specified points'
+        }), 404
+    
+    return jsonify({
+        'status': 'OK',
+        'source': source,
+        'route': cached['route']
+    }), 200
 
 @maps_bp.route('/distance-matrix', methods=['POST'])
 @token_required
+@validate_body(DistanceMatrixBody)
 def get_distance_matrix():
     """Calculate distance and time between multiple origins and destinations"""
-    data = request.get_json()
+    origins = request.payload['origins']
+    destinations = request.payload['destinations']
     
-    required_fields = ['origins', 'destinations']
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Origins and destinations required"}), 400
+    # API key is read once at start-up by the shared maps client
+    if not maps_client.api_key:
+        return jsonify({"error": "Maps API key not configured"}), 500
     
-    origins = data['origins']
-    destinations = data['destinations']
+    # Cached cells are reused; only missing ones are fetched, in provider-sized chunks
+    matrix, _ = distance_matrix.get(origins, destinations)
     
-    # Get Google Maps API key from environment
-    api_key = os.getenv('GOOGLE_MAPS_API_KEY')
-    if not api_key:
-        return jsonify({"error": "Maps API key not configured"}), 500
+    if matrix is None:
+        return jsonify({"error": "Distance matrix service unavailable"}), 503
     
-    try:
-        # Format coordinates for API call
-        origins_str = '|'.join([f"{o['lat']},{o['lng']}" if isinstance(o, dict) else str(o) for o in origins])
-        destinations_str = '|'.join([f"{d['lat']},{d['lng']}" if isinstance(d, dict) else str(d) for d in destinations])
-        
-        # Call Google Distance Matrix API
-        url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-        params = {
-            'origins': origins_str,
-            'destinations': destinations_str,
-            'key': api_key,
-            'mode': 'driving',
-            'units': 'metric',
-            'avoid': 'tolls'
-        }
-        
-        response = requests.get(url, params=params, timeout=15)
-        
-        if response.status_code == 200:
-            return jsonify(response.json()), 200
-        else:
-            return jsonify({"error": "Distance matrix service unavailable"}), 503
-            
-    except requests.RequestException as e:
-        return jsonify({"error": "Failed to connect to distance matrix service"}), 503
\ No newline at end of file
+    return jsonify(matrix), 200
+
+@maps_bp.route('/cache-stats', methods=['GET'])
+@token_required
+def get_cache_stats():
+    """Hit/miss counters for the maps response caches"""
+    return jsonify({
+        "reverse_geocode": geocode_cache.stats(),
+        "offline_geocoder": offline_geocoder.stats(),
+        "directions": directions_cache.stats(),
+        "autocomplete": autocomplete_index.stats(),
+        "distance_matrix": distance_matrix.cache.stats(),
+        "landmark_matrix": landmark_matrix.stats()
+    }), 200
+
+@maps_bp.route('/client-stats', methods=['GET'])
+@token_required
+def get_client_stats():
+    """Request, retry and latency metrics for calls made to Google Maps"""
+    return jsonify(maps_client.stats()), 200
@@ -2,6 +2,12 @@
 
 from flask import Blueprint, request, jsonify
 from ..utils.jwt_utils import token_required
+from ..utils.validation import validate_body
+from .schemas import CompleteProfileBody, UpdateProfileBody
+from ..models.ride_model import Ride
+from ..models.user_model import User
+from ..models.profile_model import UserProfile
+from ..models.stats_model import UserStats
 from .. import mongo
 from bson.objectid import ObjectId
 import datetime
@@ -43,21 +49,17 @@ def check_profile_completion():
 
 @profiles_bp.route('/complete', methods=['POST'])
 @token_required
+@validate_body(CompleteProfileBody)
 def complete_profile():
     """Complete or update user profile"""
     user_id = request.current_user['user_id']
     user_role = request.current_user['role']
-    data = request.get_json()
-    
-    # Validate phone number
-    phone_number = data.get('phone_number')
-    if not phone_number or len(phone_number) != 10 or not phone_number.isdigit():
-        return jsonify({"error": "Valid 10-digit phone number is required"}), 400
+    data = request.payload
     
     # Prepare profile data
     profile_data = {
         "user_id": ObjectId(user_id),
-        "phone_number": phone_number,
+        "phone_number": data['phone_number'],
         "emergency_contact": data.get('emergency_contact'),
         "college_id": data.get('college_id'),
         "updated_at": datetime.datetime.utcnow()
@@ -92,6 +94,13 @@ def complete_profile():
         result = mongo.db.user_profiles.insert_one(profile_data)
         message = "Profile completed successfully!"
     
+    # Keep the vehicle details shown in nearby searches current
+    if user_role == 'driver':
+        Ride.sync_driver_snapshot(user_id, {
+            "vehicle_model": profile_data['vehicle_model'],
+            "vehicle_color": profile_data['vehicle_color']
+        })
+    
     if hasattr(result, 'modified_count') and result.modified_count > 0:
         return jsonify({
             "message": message,
@@ -112,12 +121,12 @@ def get_profile():
     user_id = request.current_user['user_id']
     
     # Get user basic info
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+    user = User.loader().load(ObjectId(user_id))
     if not user:
         return jsonify({"error": "User not found"}), 404
     
     # Get profile info
-    profile = mongo.db.user_profiles.find_one({"user_id": ObjectId(user_id)})
+    profile = UserProfile.loader().load(ObjectId(user_id))
     
     response_data = {
         "user": {
@@ -135,10 +144,11 @@ def get_profile():
 
 @profiles_bp.route('/update', methods=['PUT'])
 @token_required
+@validate_body(UpdateProfileBody)
 def update_profile():
     """Update specific profile fields"""
     user_id = request.current_user['user_id']
-    data = request.get_json()
+    data = request.payload
     
     if not data:
         return jsonify({"error": "No data provided"}), 400
@@ -148,12 +158,6 @@ def update_profile():
     if not existing_profile:
         return jsonify({"error": "Profile not found. Please complete profile first."}), 404
     
-    # Validate phone number if provided
-    if 'phone_number' in data:
-        phone_number = data['phone_number']
-        if not phone_number or len(phone_number) != 10 or not phone_number.isdigit():
-            return jsonify({"error": "Valid 10-digit phone number is required"}), 400
-    
     # Prepare update data
     update_data = {"updated_at": datetime.datetime.utcnow()}
     
@@ -173,6 +177,15 @@ def update_profile():
     )
     
     if result.modified_count > 0:
+        # Keep the vehicle details shown in nearby searches current
+        snapshot_fields = {
+            field: update_data[field]
+            for field in ['vehicle_model', 'vehicle_color']
+            if field in update_data
+        }
+        if snapshot_fields and request.current_user['role'] == 'driver':
+            Ride.sync_driver_snapshot(user_id, snapshot_fields)
+        
         return jsonify({"message": "Profile updated successfully!"}), 200
     else:
         return jsonify({"error": "No changes made or profile not found"}), 400
@@ -183,12 +196,12 @@ def get_driver_info(driver_id):
     """Get driver information for ride requests (public info only)"""
     try:
         # Get driver basic info
-        driver = mongo.db.users.find_one({"_id": ObjectId(driver_id)})
+        driver = User.loader().load(ObjectId(driver_id))
         if not driver or driver['role'] != 'driver':
             return jsonify({"error": "Driver not found"}), 404
         
         # Get driver profile
-        profile = mongo.db.user_profiles.find_one({"user_id": ObjectId(driver_id)})
+        profile = UserProfile.loader().load(ObjectId(driver_id))
         
         response_data = {
             "driver_id": driver_id,
@@ -215,82 +228,30 @@ def get_profile_statistics():
     user_id = request.current_user['user_id']
     user_role = request.current_user['role']
     
-    # Get basic user stats
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    # One read of the user's materialized stats, kept current by complete_ride
+    user_stats = UserStats.find_by_user_id(user_id) or {}
+    total_rides = user_stats.get('rides_completed', 0)
+    fare_total = user_stats.get('fare_total', 0)
+    rating_count = user_stats.get('rating_count', 0)
     
-    # Get ride history statistics
-    if user_role == 'driver':
-        # Driver statistics
-        driver_stats = mongo.db.ride_requests.aggregate([
-            {"$match": {"driver_id": ObjectId(user_id), "status": "completed"}},
-            {"$group": {
-                "_id": None,
-                "total_completed_rides": {"$sum": 1},
-                "total_earnings": {"$sum": "$estimated_fare"},
-                "average_fare": {"$avg": "$estimated_fare"}
-            }}
-        ])
-        driver_stats = list(driver_stats)
-        
-        stats = {
-            "total_rides": driver_stats[0]["total_completed_rides"] if driver_stats else 0,
-            "total_earnings": driver_stats[0]["total_earnings"] if driver_stats else 0,
-            "average_fare": round(driver_stats[0]["average_fare"], 2) if driver_stats else 0,
-            "average_rating": user.get('averageRating', 0),
-            "role": "driver"
-        }
-    else:
-        # Rider statistics
-        rider_stats = mongo.db.ride_requests.aggregate([
-            {"$match": {"rider_id": ObjectId(user_id), "status": "completed"}},
-            {"$group": {
-                "_id": None,
-                "total_completed_rides": {"$sum": 1},
-                "total_spent": {"$sum": "$estimated_fare"},
-                "average_fare": {"$avg": "$estimated_fare"}
-            }}
-        ])
-        rider_stats = list(rider_stats)
-        
-        stats = {
-            "total_rides": rider_stats[0]["total_completed_rides"] if rider_stats else 0,
-            "total_spent": rider_stats[0]["total_spent"] if rider_stats else 0,
-            "average_fare": round(rider_stats[0]["average_fare"], 2) if rider_stats else 0,
-            "average_rating": user.get('averageRating', 0),
-            "role": "rider"
-        }
+    stats = {
+        "total_rides": total_rides,
+        "total_earnings" if user_role == 'driver' else "total_spent": fare_total,
+        "average_fare": round(fare_total / total_rides, 2) if total_rides else 0,
+        "average_rating": round(user_stats['rating_sum'] / rating_count, 2) if rating_count else 0,
+        "total_distance_km": round(user_stats.get('distance_km_total', 0), 2),
+        "role": user_role
+    }
     
-    # Get recent ride history (last 5 rides)
-    recent_rides_pipeline = [
-        {"$match": {
-            f"{'driver_id' if user_role == 'driver' else 'rider_id'}": ObjectId(user_id),
-            "status": "completed"
-        }},
-        {"$sort": {"completed_at": -1}},
-        {"$limit": 5},
-        {"$lookup": {
-            "from": "users",
-            "localField": f"{'rider_id' if user_role == 'driver' else 'driver_id'}",
-            "foreignField": "_id",
-            "as": "other_user"
-        }},
-        {"$unwind": "$other_user"}
+    stats['recent_rides'] = [
+        {
+            "date": ride['completed_at'].strftime("%Y-%m-%d %H:%M") if ride.get('completed_at') else 'Unknown',
+            "other_user": ride['other_user'],
+            "pickup": ride['pickup'],
+            "destination": ride['destination'],
+            "fare": ride.get('fare', 0)
+        }
+        for ride in user_stats.get('recent_rides', [])
     ]
     
-    recent_rides = list(mongo.db.ride_requests.aggregate(recent_rides_pipeline))
-    
-    formatted_recent_rides = []
-    for ride in recent_rides:
-        formatted_recent_rides.append({
-            "date": ride.get('completed_at').strftime("%Y-%m-%d %H:%M") if ride.get('completed_at') else 'Unknown',
-            "other_user": ride['other_user']['name'],
-            "pickup": ride['pickup_address'],
-            "destination": ride['destination_address'],
-            "fare": ride.get('estimated_fare', 0)
-        })
-    
-    stats['recent_rides'] = formatted_recent_rides
-    
     return jsonify(stats), 200
\ No newline at end of file
@@ -1,29 +1,117 @@
-from flask import Blueprint, request, jsonify
-from app.models.ride_model import Ride, RideRequest, PreBookRequest
+from flask import Blueprint, Response, current_app, request, jsonify
+from app.models.ride_model import Ride, RideRequest, RideHistory, RideTrajectory, PreBookRequest
+from app.models.ride_state_machine import RideStateMachine
 from app.models.user_model import User
-from app.utils.jwt_utils import token_required, role_required
-from app.utils.distance_utils import calculate_haversine_distance, calculate_smart_score, calculate_cost_sharing_fare
-from app import mongo
+from app.models.stats_model import UserStats
+from app.models.profile_model import UserProfile
+from app.utils.jwt_utils import token_required, stream_token_required, role_required, authenticate_token
+from app.utils.distance_utils import (
+    calculate_haversine_distance, calculate_cost_sharing_fare,
+    calculate_haversine_distances_batch, calculate_smart_scores_batch,
+    calculate_cost_sharing_fares_batch, calculate_prebook_scores_batch,
+    calculate_route_detours_batch, calculate_eta
+)
+from app.utils.route_utils import build_route_geojson, decode_polyline
+from app.utils.pool_scheduler import plan_pooled_insertion
+from app.utils.json_provider import dumps_bytes
+from app.utils.validation import validate_body, ValidationError
+from app.api.schemas import (
+    GoLiveBody, NearbyRidesBody, RideRequestBody, RespondBody, VerifyOtpBody, CompleteRideBody,
+    FareEstimateBody, LocationUpdateBody, ShareLocationBody, LocationMessage, PreBookRequestBody,
+    PreBookNearbyBody
+)
+from app import mongo, live_rides, ride_events, location_relay, location_buffer, trajectories, landmark_matrix, sock
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument
 import random
 import string
 import datetime
+import threading
 
 rides_bp = Blueprint('rides_bp', __name__)
 
+STATUS_MESSAGES = {
+    "pending": "New ride request received",
+    "accepted": "Driver accepted your request",
+    "rejected": "Your ride request was declined",
+    "started": "Your ride has started",
+    "completed": "Ride completed successfully",
+    "cancelled": "Ride request was cancelled"
+}
+
+def publish_request_status(ride_request, status, rider_extra=None):
+    """Push a ride request status change to both the rider and the driver over SSE"""
+    payload = {
+        "request_id": str(ride_request['_id']),
+        "status": status,
+        "message": STATUS_MESSAGES.get(status, "")
+    }
+    ride_events.publish(ride_request['rider_id'], 'status', dict(payload, **(rider_extra or {})))
+    ride_events.publish(ride_request['driver_id'], 'status', payload)
+
+def resolve_trip_distance(pickup_coords, destination_coords):
+    """
+    Distance of a rider's trip, from the landmark matrix when the trip is in it
+    ("road", or "estimated" for a matrix built with --estimate) and
+    straight-line otherwise. Every fare shown or charged is priced on this,
+    so the estimate a rider sees is the fare they are charged.
+    
+    Returns:
+        (distance_km, distance_source, matrix route or None)
+    """
+    route = landmark_matrix.lookup(pickup_coords, destination_coords)
+    if route:
+        return route['distance_m'] / 1000, route['source'], route
+    return calculate_haversine_distance(pickup_coords, destination_coords), "straight_line", None
+
+def latest_driver_location(driver_id, driver_ride=None):
+    """
+    (coordinates, updated_at) of a driver's newest known position, or None.
+    
+    A ping this worker buffered within the last flush interval is answered from
+    memory. Otherwise another worker may have received (and flushed) newer ones,
+    so the newer of the buffered and the stored position wins. driver_ride is
+    the driver's active ride if the caller has already read it.
+    """
+    latest_location = location_buffer.get_recent(driver_id)
+    if latest_location is not None:
+        return latest_location
+    
+    latest_location = location_buffer.get(driver_id)
+    if driver_ride is None:
+        driver_ride = mongo.db.rides.find_one(
+            {"driver_id": ObjectId(driver_id), "status": "active"},
+            {"current_location": 1, "location_updated_at": 1}
+        )
+    
+    if driver_ride and driver_ride.get('current_location'):
+        stored_at = driver_ride.get('location_updated_at')
+        if latest_location is None or (stored_at is not None and stored_at > latest_location[1]):
+            return driver_ride['current_location']['coordinates'], stored_at
+    return latest_location
+
+@rides_bp.route('/stream', methods=['GET'])
+@stream_token_required
+def stream_ride_events():
+    """Server-Sent Events stream of ride request status changes for the current user"""
+    user_id = request.current_user['user_id']
+    
+    return Response(
+        ride_events.stream(user_id),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Stop nginx from buffering the stream
+        }
+    )
+
 @rides_bp.route('/go-live', methods=['POST'])
 @token_required
 @role_required('driver')
+@validate_body(GoLiveBody)
 def go_live():
     """Driver endpoint to go live and start accepting rides"""
-    data = request.get_json()
-    
-    required_fields = ['pickup_location', 'destination_location', 
-                      'pickup_address', 'destination_address']
-    
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Missing required fields"}), 400
-    
+    data = request.payload
     driver_id = request.current_user['user_id']
     
     # Check if driver is already live
@@ -31,15 +119,9 @@ def go_live():
     if existing_ride:
         return jsonify({"error": "You are already live. End current ride first."}), 409
     
-    # Validate coordinates
     pickup_coords = data['pickup_location']
     dest_coords = data['destination_location']
     
-    if not isinstance(pickup_coords, list) or len(pickup_coords) != 2:
-        return jsonify({"error": "Invalid pickup location format"}), 400
-    if not isinstance(dest_coords, list) or len(dest_coords) != 2:
-        return jsonify({"error": "Invalid destination location format"}), 400
-    
     # Create GeoJSON Point objects
     pickup_geojson = {
         "type": "Point",
@@ -51,18 +133,38 @@ def go_live():
         "coordinates": dest_coords
     }
     
-    # Create new ride
+    seats_available = data['seats_available']
+    
+    # Store the route (from a Directions overview polyline or a coordinate list) for corridor matching
+    route_coords = data.get('route')
+    if data.get('route_polyline'):
+        try:
+            route_coords = decode_polyline(data['route_polyline'])
+        except (TypeError, IndexError):
+            return jsonify({"error": "Invalid route polyline"}), 400
+    
+    route_geojson = build_route_geojson(
+        pickup_coords, dest_coords, route_coords,
+        current_app.config['ROUTE_SIMPLIFY_TOLERANCE_M']
+    )
+    
+    # Create new ride with the driver's details embedded for fast searches
     new_ride = Ride(
         driver_id=driver_id,
         pickup_location=pickup_geojson,
         destination_location=dest_geojson,
         pickup_address=data['pickup_address'],
         destination_address=data['destination_address'],
-        seats_available=data.get('seats_available', 1)
+        seats_available=seats_available,
+        driver_snapshot=Ride.build_driver_snapshot(driver_id),
+        route=route_geojson
     )
     
     result = new_ride.save()
     
+    # Make the ride visible to /nearby searches straight away
+    live_rides.upsert(dict(new_ride.__dict__, _id=result.inserted_id))
+    
     return jsonify({
         "message": "You are now live!",
         "ride_id": str(result.inserted_id)
@@ -81,28 +183,68 @@ def go_offline():
     
     # Update ride status
     Ride.update_status(ride['_id'], 'completed')
+    live_rides.remove(ride['_id'])
+    location_buffer.forget(driver_id)
+    
+    # Keep the partial path of any ride still in progress; its fare distance is left as it was
+    for request_id, rider_id, trajectory in trajectories.finish_driver(driver_id):
+        if rider_id is not None and len(trajectory) > 1:
+            RideTrajectory.save(request_id, driver_id, rider_id, trajectory, truncated=True)
     
-    # Update any pending requests to cancelled
-    mongo.db.ride_requests.update_many(
-        {"driver_id": ObjectId(driver_id), "status": "pending"},
-        {"$set": {"status": "cancelled", "updated_at": datetime.datetime.utcnow()}}
+    # Cancel any pending requests, letting each of their riders know
+    cancelled_requests = RideStateMachine.transition_all(
+        'cancel', {"driver_id": ObjectId(driver_id), "status": "pending"}, {"rider_id": 1, "driver_id": 1}
     )
+    for cancelled_request in cancelled_requests:
+        publish_request_status(cancelled_request, 'cancelled')
     
     return jsonify({"message": "You are now offline"}), 200
 
+def find_rides_along_route(rider_coords, destination_coords, corridor_width_km, max_detour_km):
+    """
+    Corridor search: active rides whose route passes within corridor_width_km of
+    the rider's pickup, keeping those with a detour of at most max_detour_km.
+    
+    Returns:
+        (rides, detour_km list, route efficiency score list), rides carrying a
+        "distance" field in meters from the rider to the driver
+    """
+    # Answered from the in-memory index, which holds live positions and every ride's route
+    live_rides.ensure_loaded(Ride.find_active_rides)
+    candidates = [
+        ride for ride in live_rides.find_along_route(rider_coords, corridor_width_km)
+        if ride.get('seats_available', 1) > 0
+    ]
+    if not candidates:
+        return [], [], []
+    
+    # Measure from where the driver is now if they have shared it, else their starting point
+    driver_starts = [
+        (ride.get('current_location') or ride['pickup_location'])['coordinates']
+        for ride in candidates
+    ]
+    detours, efficiency_scores = calculate_route_detours_batch(
+        rider_coords, destination_coords, driver_starts,
+        [ride['destination_location']['coordinates'] for ride in candidates]
+    )
+    
+    rides, kept_detours, kept_scores = [], [], []
+    for ride, detour_km, efficiency_score in zip(candidates, detours.tolist(), efficiency_scores.tolist()):
+        if detour_km <= max_detour_km:
+            rides.append(ride)
+            kept_detours.append(detour_km)
+            kept_scores.append(efficiency_score)
+    
+    return rides, kept_detours, kept_scores
+
 @rides_bp.route('/nearby', methods=['POST'])
 @token_required
 @role_required('rider')
+@validate_body(NearbyRidesBody)
 def find_nearby_rides():
     """Find nearby drivers for riders using geospatial search"""
-    data = request.get_json()
-    
-    if 'current_location' not in data:
-        return jsonify({"error": "Current location required"}), 400
-    
+    data = request.payload
     rider_coords = data['current_location']
-    if not isinstance(rider_coords, list) or len(rider_coords) != 2:
-        return jsonify({"error": "Invalid location format"}), 400
     
     # Create GeoJSON point for rider location
     rider_location = {
@@ -110,41 +252,62 @@ def find_nearby_rides():
         "coordinates": rider_coords
     }
     
-    # Find nearby rides
-    max_distance = data.get('max_distance_km', 15)
-    nearby_rides = Ride.find_nearby_rides(rider_location, max_distance)
+    corridor_mode = data.get('mode') == 'corridor'
+    if corridor_mode:
+        # Drivers whose route passes near the rider, ranked by how far out of their way they'd go
+        if 'destination_location' not in data:
+            return jsonify({"error": "Destination location required for corridor search"}), 400
+        nearby_rides, detours, efficiency_scores = find_rides_along_route(
+            rider_coords,
+            data['destination_location'],
+            data.get('corridor_width_km', current_app.config['CORRIDOR_WIDTH_KM']),
+            data.get('max_detour_km', current_app.config['CORRIDOR_MAX_DETOUR_KM'])
+        )
+    else:
+        # Find nearby rides from the in-memory index (loaded from MongoDB on cold start)
+        max_distance = data['max_distance_km']
+        live_rides.ensure_loaded(Ride.find_active_rides)
+        nearby_rides = [
+            ride for ride in live_rides.find_nearby(rider_location['coordinates'], max_distance)
+            if ride.get('seats_available', 1) > 0
+        ]
+    
+    # Score every candidate in one vectorized pass
+    smart_scores = calculate_smart_scores_batch(
+        [ride['distance'] for ride in nearby_rides],
+        [ride['driver_snapshot'].get('rating', 0) for ride in nearby_rides]
+    )
     
-    # Calculate smart scores and prepare response
-    rides_with_scores = []
-    for ride in nearby_rides:
-        driver_info = ride['driver_info']
-        
-        # Calculate smart score
-        smart_score = calculate_smart_score(
-            distance_meters=ride['distance'],
-            driver_rating=driver_info.get('averageRating', 0)
+    # Calculate cost-sharing fare (rider's pickup to destination)
+    rider_destination = data.get('destination_location', rider_coords)
+    
+    if rider_destination != rider_coords:
+        trip_distance = resolve_trip_distance(rider_coords, rider_destination)[0]
+        suggested_fares = [calculate_cost_sharing_fare(trip_distance)] * len(nearby_rides)
+    elif nearby_rides:
+        # Fallback to each driver's route distance
+        trip_distances = calculate_haversine_distances_batch(
+            [ride['pickup_location']['coordinates'] for ride in nearby_rides],
+            [ride['destination_location']['coordinates'] for ride in nearby_rides]
         )
-        
-        # Calculate cost-sharing fare (rider's pickup to destination)
-        rider_pickup = rider_coords
-        rider_destination = data.get('destination_location', rider_coords)
-        
-        if rider_destination != rider_coords:
-            trip_distance = calculate_haversine_distance(rider_pickup, rider_destination)
-            suggested_fare = calculate_cost_sharing_fare(trip_distance)
-        else:
-            # Fallback to driver's route distance
-            pickup_coords = ride['pickup_location']['coordinates']
-            dest_coords = ride['destination_location']['coordinates']
-            trip_distance = calculate_haversine_distance(pickup_coords, dest_coords)
-            suggested_fare = calculate_cost_sharing_fare(trip_distance)
+        suggested_fares = calculate_cost_sharing_fares_batch(trip_distances).tolist()
+    else:
+        suggested_fares = []
+    
+    rides_with_scores = []
+    for ride, smart_score, suggested_fare in zip(nearby_rides, smart_scores.tolist(), suggested_fares):
+        driver_snapshot = ride['driver_snapshot']
         
         rides_with_scores.append({
             "ride_id": str(ride['_id']),
             "driver": {
-                "name": driver_info['name'],
-                "rating": driver_info.get('averageRating', 0),
-                "phone": "Hidden until ride accepted"  # Privacy protection
+                "name": driver_snapshot.get('name', 'Unknown'),
+                "rating": driver_snapshot.get('rating', 0),
+                "phone": "Hidden until ride accepted",  # Privacy protection
+                "vehicle": {
+                    "model": driver_snapshot.get('vehicle_model'),
+                    "color": driver_snapshot.get('vehicle_color')
+                }
             },
             "pickup_address": ride['pickup_address'],
             "destination_address": ride['destination_address'],
@@ -156,8 +319,15 @@ def find_nearby_rides():
             "seats_available": ride['seats_available']
         })
     
-    # Sort by smart score
-    rides_with_scores.sort(key=lambda x: x['smart_score'], reverse=True)
+    if corridor_mode:
+        # Least detour first, smart score breaks ties
+        for ride_data, detour_km, efficiency_score in zip(rides_with_scores, detours, efficiency_scores):
+            ride_data['detour_km'] = round(detour_km, 2)
+            ride_data['route_efficiency'] = efficiency_score
+        rides_with_scores.sort(key=lambda x: (x['detour_km'], -x['smart_score']))
+    else:
+        # Sort by smart score
+        rides_with_scores.sort(key=lambda x: x['smart_score'], reverse=True)
     
     return jsonify({
         "nearby_rides": rides_with_scores,
@@ -167,73 +337,23 @@ def find_nearby_rides():
 @rides_bp.route('/request', methods=['POST'])
 @token_required
 @role_required('rider')
+@validate_body(RideRequestBody)
 def request_ride():
     """Rider requests a specific ride"""
-    data = request.get_json()
-    
-    # Debug logging
-    print(f"Received ride request data: {data}")
-    print(f"Data keys: {list(data.keys()) if data else 'None'}")
-    
-    required_fields = ['ride_id', 'pickup_location', 'destination_location',
-                      'pickup_address', 'destination_address']
-    
-    # Check each field individually for better debugging
-    missing_fields = []
-    for field in required_fields:
-        if field not in data:
-            missing_fields.append(field)
-        else:
-            print(f"Field '{field}': {data[field]}")
-    
-    if missing_fields:
-        print(f"Missing fields: {missing_fields}")
-        return jsonify({"error": f"Missing required fields: {missing_fields}"}), 400
-    
-    # Validate data types and values
-    if not isinstance(data['pickup_location'], list) or len(data['pickup_location']) != 2:
-        print(f"Invalid pickup_location format: {data['pickup_location']}")
-        return jsonify({"error": "Invalid pickup_location format. Expected [longitude, latitude]"}), 400
-    
-    if not isinstance(data['destination_location'], list) or len(data['destination_location']) != 2:
-        print(f"Invalid destination_location format: {data['destination_location']}")
-        return jsonify({"error": "Invalid destination_location format. Expected [longitude, latitude]"}), 400
-    
-    if not data['pickup_address'] or not data['pickup_address'].strip():
-        print(f"Empty pickup_address: '{data['pickup_address']}'")
-        return jsonify({"error": "pickup_address cannot be empty"}), 400
-    
-    if not data['destination_address'] or not data['destination_address'].strip():
-        print(f"Empty destination_address: '{data['destination_address']}'")
-        return jsonify({"error": "destination_address cannot be empty"}), 400
-    
+    data = request.payload
     rider_id = request.current_user['user_id']
     
     # Validate ride exists and is active
-    print(f"Looking for ride with ID: {data['ride_id']}")
-    try:
-        ride = mongo.db.rides.find_one({
-            "_id": ObjectId(data['ride_id']),
-            "status": "active"
-        })
-        print(f"Found ride: {ride is not None}")
-        if ride:
-            print(f"Ride status: {ride.get('status')}")
-    except Exception as e:
-        print(f"Error converting ride_id to ObjectId: {e}")
-        return jsonify({"error": "Invalid ride_id format"}), 400
+    ride = mongo.db.rides.find_one({
+        "_id": ObjectId(data['ride_id']),
+        "status": "active"
+    })
     
     if not ride:
         return jsonify({"error": "Ride not found or no longer available"}), 404
     
-    # Check for existing requests from this rider to any driver
-    existing_request = mongo.db.ride_requests.find_one({
-        "rider_id": ObjectId(rider_id),
-        "status": {"$in": ["pending", "accepted"]}
-    })
-    
-    if existing_request:
-        return jsonify({"error": "You already have an active ride request"}), 409
+    if ride.get('seats_available', 1) < 1:
+        return jsonify({"error": "This ride is full"}), 409
     
     # Create GeoJSON points
     pickup_geojson = {
@@ -246,8 +366,8 @@ def request_ride():
         "coordinates": data['destination_location']
     }
     
-    # Calculate fare for this specific request
-    trip_distance = calculate_haversine_distance(data['pickup_location'], data['destination_location'])
+    # Calculate fare for this specific request, on the same distance /fare-estimate quoted
+    trip_distance, distance_source, _ = resolve_trip_distance(data['pickup_location'], data['destination_location'])
     calculated_fare = calculate_cost_sharing_fare(trip_distance)
     
     # Create ride request
@@ -258,10 +378,18 @@ def request_ride():
         destination_location=dest_geojson,
         pickup_address=data['pickup_address'],
         destination_address=data['destination_address'],
-        estimated_fare=calculated_fare
+        estimated_fare=calculated_fare,
+        distance_km=round(trip_distance, 2),
+        distance_source=distance_source
     )
     
+    # The insert itself enforces one open request per rider, even for concurrent requests
     result = ride_request.save()
+    if result is None:
+        return jsonify({"error": "You already have an active ride request"}), 409
+    
+    # Tell the driver straight away instead of waiting for their next poll
+    publish_request_status(dict(ride_request.__dict__, _id=result.inserted_id), 'pending')
     
     return jsonify({
         "message": "Ride requested successfully!",
@@ -297,50 +425,45 @@ def get_request_status(request_id):
     """Get status of a specific ride request"""
     rider_id = request.current_user['user_id']
     
-    # Find the request with driver info
-    pipeline = [
-        {
-            "$match": {
-                "_id": ObjectId(request_id),
-                "rider_id": ObjectId(rider_id)
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "driver_id",
-                "foreignField": "_id",
-                "as": "driver_info"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "user_profiles",
-                "localField": "driver_id",
-                "foreignField": "user_id",
-                "as": "driver_profile"
-            }
-        },
-        {
-            "$unwind": "$driver_info"
-        }
-    ]
+    request_info = mongo.db.ride_requests.find_one({
+        "_id": ObjectId(request_id),
+        "rider_id": ObjectId(rider_id)
+    })
     
-    request_data = list(mongo.db.ride_requests.aggregate(pipeline))
+    if not request_info:
+        # Finished requests are moved to ride_history after a while
+        history = RideHistory.find_by_request_id(request_id)
+        if not history or str(history['rider_id']) != rider_id:
+            return jsonify({"error": "Request not found"}), 404
+        return jsonify({
+            "request_id": request_id,
+            "status": history['status'],
+            "driver": {
+                "name": history['driver']['name'],
+                "phone": 'Not available',
+                "rating": history['driver']['rating']
+            },
+            "pickup_address": history['pickup_address'],
+            "destination_address": history['destination_address'],
+            "estimated_fare": history.get('final_fare', 0),
+            "created_at": history['requested_at'].isoformat(),
+            "updated_at": (history.get('updated_at') or history['requested_at']).isoformat()
+        }), 200
     
-    if not request_data:
+    # Driver details come from the request-scoped loaders (one query per collection)
+    driver_info = User.loader().load(request_info['driver_id']) if request_info else None
+    if not driver_info:
         return jsonify({"error": "Request not found"}), 404
     
-    request_info = request_data[0]
-    driver_profile = request_info.get('driver_profile', [{}])[0] if request_info.get('driver_profile') else {}
+    driver_profile = UserProfile.loader().load(request_info['driver_id']) or {}
     
     response_data = {
         "request_id": request_id,
         "status": request_info['status'],
         "driver": {
-            "name": request_info['driver_info']['name'],
+            "name": driver_info['name'],
             "phone": driver_profile.get('phone_number', 'Not available'),
-            "rating": request_info['driver_info'].get('averageRating', 0)
+            "rating": driver_info.get('averageRating', 0)
         },
         "pickup_address": request_info['pickup_address'],
         "destination_address": request_info['destination_address'],
@@ -373,13 +496,17 @@ def cancel_ride_request(request_id):
     """Cancel ride request"""
     rider_id = request.current_user['user_id']
     
-    result = mongo.db.ride_requests.update_one(
-        {"_id": ObjectId(request_id), "rider_id": ObjectId(rider_id), 
-         "status": {"$in": ["pending", "accepted"]}},
-        {"$set": {"status": "cancelled", "updated_at": datetime.datetime.utcnow()}}
+    cancelled_request = RideStateMachine.transition(
+        request_id, 'cancel',
+        match={"rider_id": ObjectId(rider_id)},
+        projection={"rider_id": 1, "driver_id": 1, "status": 1},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count > 0:
+    if cancelled_request:
+        publish_request_status(cancelled_request, 'cancelled')
+        if cancelled_request['status'] == 'accepted':
+            release_pooled_seat(cancelled_request['driver_id'], request_id)
         return jsonify({"message": "Ride cancelled successfully"}), 200
     else:
         return jsonify({"error": "Cannot cancel ride"}), 400
@@ -389,45 +516,53 @@ def cancel_ride_request(request_id):
 @token_required
 @role_required('rider')
 def get_my_requests():
-    """Get all ride requests for the logged-in rider"""
+    """
+    Get the logged-in rider's ride requests, newest first.
+    
+    Live requests are merged with the most recent RIDE_HISTORY_RECENT_LIMIT
+    archived ones, so "total" counts what is listed: every request still in
+    ride_requests plus at most that many from ride_history, not the rider's
+    whole history.
+    """
     rider_id = request.current_user['user_id']
     
-    pipeline = [
-        {
-            "$match": {
-                "rider_id": ObjectId(rider_id)
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "driver_id",
-                "foreignField": "_id",
-                "as": "driver_info"
-            }
-        },
-        {
-            "$unwind": "$driver_info"
-        },
-        {
-            "$sort": {"created_at": -1}
-        }
-    ]
+    requests = list(mongo.db.ride_requests.find({"rider_id": ObjectId(rider_id)}).sort("created_at", -1))
     
-    requests = list(mongo.db.ride_requests.aggregate(pipeline))
+    # Each driver is fetched once, however many requests went to them
+    drivers = User.loader().load_many(req['driver_id'] for req in requests)
     
-    formatted_requests = []
-    for req in requests:
-        formatted_requests.append({
+    listed = []
+    for req, driver_info in zip(requests, drivers):
+        if not driver_info:
+            continue
+        listed.append((req['created_at'], {
             "request_id": str(req['_id']),
             "status": req['status'],
-            "driver_name": req['driver_info']['name'],
+            "driver_name": driver_info['name'],
             "pickup_address": req['pickup_address'],
             "destination_address": req['destination_address'],
             "estimated_fare": req.get('estimated_fare', 0),
             "created_at": req['created_at'].strftime("%Y-%m-%d %H:%M"),
             "otp": req.get('otp') if req['status'] == 'accepted' else None
-        })
+        }))
+    
+    # Older finished requests live in ride_history, with the driver's name embedded
+    for record in RideHistory.get_user_ride_history(
+            rider_id, 'rider', current_app.config['RIDE_HISTORY_RECENT_LIMIT']):
+        listed.append((record['requested_at'], {
+            "request_id": str(record['request_id']),
+            "status": record['status'],
+            "driver_name": record['driver']['name'],
+            "pickup_address": record['pickup_address'],
+            "destination_address": record['destination_address'],
+            "estimated_fare": record.get('final_fare', 0),
+            "created_at": record['requested_at'].strftime("%Y-%m-%d %H:%M"),
+            "otp": None
+        }))
+    
+    # Cancelled requests stay in ride_requests until their TTL, so the two sources interleave
+    listed.sort(key=lambda item: item[0], reverse=True)
+    formatted_requests = [entry for _, entry in listed]
     
     return jsonify({
         "requests": formatted_requests,
@@ -441,50 +576,28 @@ def get_ride_requests():
     """Get all pending ride requests for the driver"""
     driver_id = request.current_user['user_id']
     
-    # Find requests with rider information
-    pipeline = [
-        {
-            "$match": {
-                "driver_id": ObjectId(driver_id),
-                "status": "pending"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "rider_id", 
-                "foreignField": "_id",
-                "as": "rider_info"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "user_profiles",
-                "localField": "rider_id",
-                "foreignField": "user_id", 
-                "as": "rider_profile"
-            }
-        },
-        {
-            "$unwind": "$rider_info"
-        },
-        {
-            "$sort": {"created_at": -1}
-        }
-    ]
+    requests = list(mongo.db.ride_requests.find({
+        "driver_id": ObjectId(driver_id),
+        "status": "pending"
+    }).sort("created_at", -1))
     
-    requests = list(mongo.db.ride_requests.aggregate(pipeline))
+    # Rider details for every request in one query per collection
+    rider_ids = [req['rider_id'] for req in requests]
+    UserProfile.loader().prime(rider_ids)
+    riders = User.loader().load_many(rider_ids)
     
     formatted_requests = []
-    for req in requests:
-        rider_profile = req.get('rider_profile', [{}])[0] if req.get('rider_profile') else {}
+    for req, rider_info in zip(requests, riders):
+        if not rider_info:
+            continue
+        rider_profile = UserProfile.loader().load(req['rider_id']) or {}
         
         formatted_requests.append({
             "request_id": str(req['_id']),
             "rider": {
-                "name": req['rider_info']['name'],
+                "name": rider_info['name'],
                 "phone": rider_profile.get('phone_number', 'Not available'),
-                "rating": req['rider_info'].get('averageRating', 0)
+                "rating": rider_info.get('averageRating', 0)
             },
             "pickup_address": req['pickup_address'],
             "destination_address": req['destination_address'],
@@ -497,88 +610,151 @@ def get_ride_requests():
         "total": len(formatted_requests)
     }), 200
 
+def add_to_pool(driver_id, ride_request):
+    """
+    Reserve a seat on the driver's live ride and insert the rider's pickup and
+    drop-off into its stop schedule (cheapest insertion within the detour budget).
+    
+    Returns:
+        (updated ride, None) on success, or (None, error message)
+    """
+    pickup_coords = ride_request['pickup_location']['coordinates']
+    dropoff_coords = ride_request['destination_location']['coordinates']
+    
+    # Optimistic concurrency: retry if another accept changed the schedule meanwhile
+    for _ in range(3):
+        ride = Ride.find_by_driver_id(driver_id)
+        if not ride:
+            return None, "Go live before accepting ride requests"
+        if ride.get('seats_available', 1) < 1:
+            return None, "No seats left on this ride"
+        
+        latest_location = latest_driver_location(driver_id, ride)
+        start_coords = latest_location[0] if latest_location else ride['pickup_location']['coordinates']
+        
+        plan = plan_pooled_insertion(
+            start_coords, ride['destination_location']['coordinates'], ride.get('stops', []),
+            ride_request['_id'], pickup_coords, dropoff_coords,
+            current_app.config['POOL_DETOUR_BUDGET_KM']
+        )
+        if plan is None:
+            return None, "Picking up this rider would exceed your detour budget"
+        
+        updated_ride = Ride.reserve_seat(ride['_id'], ride.get('schedule_version', 0), plan[0])
+        if updated_ride:
+            live_rides.update_ride_fields(driver_id, {"seats_available": updated_ride['seats_available']})
+            return updated_ride, None
+    
+    return None, "Your ride changed while accepting, please try again"
+
+def release_pooled_seat(driver_id, request_id):
+    """Free a pooled rider's seat when their ride ends or is cancelled"""
+    updated_ride = Ride.release_seat(driver_id, request_id)
+    if updated_ride:
+        live_rides.update_ride_fields(driver_id, {"seats_available": updated_ride['seats_available']})
+
+def format_stops(stops):
+    return [
+        {
+            "request_id": str(stop['request_id']),
+            "type": stop['type'],
+            "coordinates": stop['coordinates']
+        }
+        for stop in stops
+    ]
+
 @rides_bp.route('/requests/<request_id>/respond', methods=['POST'])
 @token_required
 @role_required('driver')
+@validate_body(RespondBody)
 def respond_to_request(request_id):
     """Driver accepts or rejects a ride request"""
-    data = request.get_json()
-    
-    if 'action' not in data or data['action'] not in ['accept', 'reject']:
-        return jsonify({"error": "Invalid action. Use 'accept' or 'reject'"}), 400
+    data = request.payload
+    driver_id = request.current_user['user_id']
     
-    # Find the request
-    ride_request = RideRequest.find_by_id(request_id)
-    if not ride_request:
+    if not ObjectId.is_valid(request_id):
         return jsonify({"error": "Request not found"}), 404
     
-    # Verify it's for this driver
-    driver_id = request.current_user['user_id']
-    if str(ride_request['driver_id']) != driver_id:
-        return jsonify({"error": "Unauthorized"}), 403
-    
-    if ride_request['status'] != 'pending':
-        return jsonify({"error": "Request is no longer pending"}), 400
+    # Claim the request in one conditional update; a concurrent accept or cancel loses cleanly
+    otp = ''.join(random.choices(string.digits, k=4))
+    ride_request = RideStateMachine.transition(
+        request_id, data['action'],
+        match={"driver_id": ObjectId(driver_id)},
+        set_fields={"otp": otp} if data['action'] == 'accept' else None
+    )
+    if not ride_request:
+        return respond_failure(request_id, driver_id)
     
     if data['action'] == 'accept':
-        # Generate 4-digit OTP
-        otp = ''.join(random.choices(string.digits, k=4))
-        RideRequest.update_status(request_id, 'accepted', otp)
+        # Take a seat and fit the rider into the pooled schedule; give the request back if that fails
+        pooled_ride, error = add_to_pool(driver_id, ride_request)
+        if error:
+            RideStateMachine.transition(
+                request_id, 'unaccept', match={"otp": otp}, set_fields={"otp": None}, projection={"_id": 1}
+            )
+            return jsonify({"error": error}), 409
         
-        # Reject all other pending requests for this rider
-        mongo.db.ride_requests.update_many(
-            {
-                "rider_id": ride_request['rider_id'],
-                "status": "pending",
-                "_id": {"$ne": ObjectId(request_id)}
-            },
-            {
-                "$set": {
-                    "status": "cancelled",
-                    "updated_at": datetime.datetime.utcnow()
-                }
-            }
-        )
+        # Only the rider needs the OTP pushed - they read it out to the driver
+        publish_request_status(ride_request, 'accepted', rider_extra={"otp": otp})
         
         return jsonify({
             "message": "Ride request accepted!",
             "otp": otp,
             "note": "Share this OTP with the rider to start the trip",
-            "rider_phone": ride_request.get('rider_phone', 'Not available')
+            "rider_phone": ride_request.get('rider_phone', 'Not available'),
+            "seats_available": pooled_ride['seats_available'],
+            "stops": format_stops(pooled_ride['stops'])
         }), 200
     else:
-        RideRequest.update_status(request_id, 'rejected')
+        publish_request_status(ride_request, 'rejected')
         return jsonify({"message": "Ride request rejected"}), 200
 
+def respond_failure(request_id, driver_id):
+    """Error response for a respond that did not apply (only read on this slow path)"""
+    ride_request = mongo.db.ride_requests.find_one({"_id": ObjectId(request_id)}, {"driver_id": 1})
+    if not ride_request:
+        return jsonify({"error": "Request not found"}), 404
+    if str(ride_request['driver_id']) != driver_id:
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify({"error": "Request is no longer pending"}), 400
+
 @rides_bp.route('/verify-otp', methods=['POST'])
 @token_required
 @role_required('driver')
+@validate_body(VerifyOtpBody)
 def verify_otp():
     """Verify OTP and start the ride"""
-    data = request.get_json()
-    
-    required_fields = ['request_id', 'otp']
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Missing required fields"}), 400
+    data = request.payload
     
     driver_id = request.current_user['user_id']
     
-    # Find the accepted request
-    ride_request = mongo.db.ride_requests.find_one({
-        "_id": ObjectId(data['request_id']),
-        "driver_id": ObjectId(driver_id),
-        "status": "accepted"
-    })
+    # Start the ride only if it is accepted, this driver's, and the OTP matches
+    ride_request = RideStateMachine.transition(
+        data['request_id'], 'start',
+        match={"driver_id": ObjectId(driver_id), "otp": data['otp']},
+        projection={"rider_id": 1, "driver_id": 1}
+    )
     
     if not ride_request:
-        return jsonify({"error": "Request not found or not accepted"}), 404
-    
-    # Verify OTP
-    if ride_request.get('otp') != data['otp']:
+        accepted = mongo.db.ride_requests.find_one({
+            "_id": ObjectId(data['request_id']),
+            "driver_id": ObjectId(driver_id),
+            "status": "accepted"
+        }, {"_id": 1})
+        if not accepted:
+            return jsonify({"error": "Request not found or not accepted"}), 404
         return jsonify({"error": "Invalid OTP"}), 400
     
-    # Update request status to started
-    RideRequest.update_status(data['request_id'], 'started')
+    publish_request_status(ride_request, 'started')
+    
+    # The rider is on board - their pickup is no longer a pending stop
+    Ride.complete_pickup(driver_id, data['request_id'])
+    
+    # Record the driver's path from here, starting at their last known position
+    trajectories.start(
+        data['request_id'], driver_id, *(location_buffer.get(driver_id) or ()),
+        rider_id=ride_request['rider_id']
+    )
     
     return jsonify({
         "message": "OTP verified! Ride has started.",
@@ -588,59 +764,99 @@ def verify_otp():
 @rides_bp.route('/complete-ride', methods=['POST'])
 @token_required
 @role_required('driver')
+@validate_body(CompleteRideBody)
 def complete_ride():
     """Complete the active ride"""
-    data = request.get_json()
-    
-    if 'request_id' not in data:
-        return jsonify({"error": "Request ID required"}), 400
+    data = request.payload
     
     driver_id = request.current_user['user_id']
     
-    # Find the active request
-    ride_request = mongo.db.ride_requests.find_one({
-        "_id": ObjectId(data['request_id']),
-        "driver_id": ObjectId(driver_id),
-        "status": "started"
-    })
+    # Complete the started ride in one conditional update
+    ride_request = RideStateMachine.transition(
+        data['request_id'], 'complete', match={"driver_id": ObjectId(driver_id)}
+    )
     
     if not ride_request:
         return jsonify({"error": "Active ride not found"}), 404
     
-    # Update request status to completed
-    RideRequest.update_status(data['request_id'], 'completed')
+    publish_request_status(ride_request, 'completed')
+    release_pooled_seat(driver_id, data['request_id'])
+    
+    # Persist the recorded path and replace the straight-line estimate with the real
+    # distance, unless the path hit the point cap and is missing its end
+    trajectory = trajectories.finish(data['request_id'])
+    if trajectory is not None and len(trajectory) > 1:
+        RideTrajectory.save(data['request_id'], driver_id, ride_request['rider_id'], trajectory)
+    if trajectory is not None and len(trajectory) > 1 and not trajectory.truncated:
+        RideRequest.set_actual_distance(data['request_id'], trajectory.distance_km)
+        ride_request['distance_km'] = round(trajectory.distance_km, 2)
+    
+    # Both users are read once, by whichever of the rating update or the stats needs them first
+    User.loader().prime([ride_request['rider_id'], ride_request['driver_id']])
     
     # Update both rider and driver ratings if provided
-    rating_data = data.get('ratings', {})
+    rating_data = data['ratings']
     if rating_data.get('rider_rating'):
         User.update_rating(ride_request['rider_id'], rating_data['rider_rating'])
     
+    # Add the ride to both users' materialized statistics
+    rider_info, driver_info = User.loader().load_many([ride_request['rider_id'], ride_request['driver_id']])
+    UserStats.record_completed_ride(
+        ride_request,
+        rider_name=(rider_info or {}).get('name', 'Unknown'),
+        driver_name=(driver_info or {}).get('name', 'Unknown'),
+        rider_rating=rating_data.get('rider_rating')
+    )
+    
     return jsonify({
         "message": "Ride completed successfully!",
         "final_fare": ride_request.get('estimated_fare', 0)
     }), 200
 
+@rides_bp.route('/trajectory/<request_id>', methods=['GET'])
+@token_required
+def get_ride_trajectory(request_id):
+    """Get the recorded GPS path of a completed ride"""
+    user_id = ObjectId(request.current_user['user_id'])
+    
+    record = mongo.db.ride_trajectories.find_one(
+        {"request_id": ObjectId(request_id), "$or": [{"rider_id": user_id}, {"driver_id": user_id}]},
+        {"data": 0}
+    )
+    if not record:
+        return jsonify({"error": "Trajectory not found"}), 404
+    
+    points = RideTrajectory.get_points(request_id)
+    
+    return jsonify({
+        "request_id": request_id,
+        "distance_km": record['distance_km'],
+        "point_count": record['point_count'],
+        "points": [
+            {"coordinates": coords, "timestamp": timestamp.isoformat()}
+            for coords, timestamp in points
+        ]
+    }), 200
+
 @rides_bp.route('/fare-estimate', methods=['POST'])
 @token_required
+@validate_body(FareEstimateBody)
 def estimate_fare():
     """Calculate fare estimate using cost-sharing model"""
-    data = request.get_json()
-    
-    required_fields = ['pickup_location', 'destination_location']
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Missing pickup or destination location"}), 400
-    
+    data = request.payload
     pickup_coords = data['pickup_location']
     dest_coords = data['destination_location']
     
-    # Calculate distance
-    distance_km = calculate_haversine_distance(pickup_coords, dest_coords)
+    # Road distance for trips in the precomputed landmark matrix, straight-line otherwise
+    distance_km, distance_source, route = resolve_trip_distance(pickup_coords, dest_coords)
     
     # Cost-sharing fare calculation
     estimated_fare = calculate_cost_sharing_fare(distance_km)
     
     return jsonify({
         "distance_km": round(distance_km, 2),
+        "distance_source": distance_source,
+        "eta_minutes": calculate_eta(distance_km, duration_s=route['duration_s'] if route else None),
         "estimated_fare": estimated_fare,
         "fare_breakdown": {
             "base_fare": 15,
@@ -658,31 +874,39 @@ def get_active_ride():
     user_role = request.current_user['role']
     
     if user_role == 'driver':
-        # Find active ride as driver
-        active_request = mongo.db.ride_requests.find_one({
-            "driver_id": ObjectId(user_id),
-            "status": {"$in": ["accepted", "started"]}
-        })
+        # A pooled ride can have several accepted or started requests
+        active_requests = RideRequest.get_active_requests_for_driver(user_id)
         
-        if active_request:
-            # Get rider info
-            rider_info = mongo.db.users.find_one({"_id": active_request['rider_id']})
-            rider_profile = mongo.db.user_profiles.find_one({"user_id": active_request['rider_id']})
+        if active_requests:
+            rider_ids = [req['rider_id'] for req in active_requests]
+            UserProfile.loader().prime(rider_ids)
+            User.loader().prime(rider_ids)
             
-            return jsonify({
-                "has_active_ride": True,
-                "ride_info": {
+            pooled_requests = []
+            for active_request in active_requests:
+                rider_info = User.loader().load(active_request['rider_id']) or {}
+                rider_profile = UserProfile.loader().load(active_request['rider_id'])
+                pooled_requests.append({
                     "request_id": str(active_request['_id']),
                     "status": active_request['status'],
                     "rider": {
-                        "name": rider_info['name'],
+                        "name": rider_info.get('name', 'Unknown'),
                         "phone": rider_profile.get('phone_number', 'Not available') if rider_profile else 'Not available'
                     },
                     "pickup_address": active_request['pickup_address'],
                     "destination_address": active_request['destination_address'],
                     "estimated_fare": active_request.get('estimated_fare', 0),
                     "otp": active_request.get('otp') if active_request['status'] == 'accepted' else None
-                }
+                })
+            
+            ride = Ride.find_by_driver_id(user_id) or {}
+            
+            return jsonify({
+                "has_active_ride": True,
+                "ride_info": pooled_requests[0],
+                "pooled_requests": pooled_requests,
+                "stops": format_stops(ride.get('stops', [])),
+                "seats_available": ride.get('seats_available', 0)
             }), 200
     else:
         # Find active ride as rider
@@ -693,8 +917,7 @@ def get_active_ride():
         
         if active_request:
             # Get driver info
-            driver_info = mongo.db.users.find_one({"_id": active_request['driver_id']})
-            driver_profile = mongo.db.user_profiles.find_one({"user_id": active_request['driver_id']})
+            driver_info = User.loader().load(active_request['driver_id'])
             
             return jsonify({
                 "has_active_ride": True,
@@ -719,36 +942,26 @@ def get_active_ride():
 @rides_bp.route('/update-location', methods=['POST'])
 @token_required
 @role_required('driver')
+@validate_body(LocationUpdateBody)
 def update_driver_location():
     """Update driver's current location during active ride"""
-    data = request.get_json()
-    
-    if 'current_location' not in data:
-        return jsonify({"error": "Current location required"}), 400
-    
-    current_coords = data['current_location']
-    if not isinstance(current_coords, list) or len(current_coords) != 2:
-        return jsonify({"error": "Invalid location format"}), 400
-    
+    current_coords = request.payload['current_location']
     driver_id = request.current_user['user_id']
+    location_updated_at = datetime.datetime.utcnow()
     
-    # Update active ride with current location
-    result = mongo.db.rides.update_one(
-        {"driver_id": ObjectId(driver_id), "status": "active"},
-        {
-            "$set": {
-                "current_location": {
-                    "type": "Point",
-                    "coordinates": current_coords
-                },
-                "location_updated_at": datetime.datetime.utcnow()
-            }
-        }
-    )
-    
-    if result.matched_count == 0:
+    # Check the driver is live from memory; only ask MongoDB if this worker hasn't seen the ride
+    live_rides.ensure_loaded(Ride.find_active_rides)
+    if not live_rides.get_by_driver(driver_id) and not Ride.find_by_driver_id(driver_id):
         return jsonify({"error": "No active ride found"}), 404
     
+    # Buffer the position; it is written to MongoDB in the next batched flush
+    location_buffer.record(driver_id, current_coords, location_updated_at)
+    
+    # Keep the live index in step so riders see the driver's real position
+    live_rides.update_driver_location(driver_id, current_coords, location_updated_at)
+    location_relay.publish_driver_location(driver_id, current_coords, location_updated_at)
+    trajectories.append_for_driver(driver_id, current_coords, location_updated_at)
+    
     return jsonify({"message": "Location updated successfully"}), 200
 
 @rides_bp.route('/driver-location/<request_id>', methods=['GET'])
@@ -768,34 +981,22 @@ def get_driver_location(request_id):
     if not request_data:
         return jsonify({"error": "Active ride not found"}), 404
     
-    # Get driver's current location from rides collection
-    driver_ride = mongo.db.rides.find_one({
-        "driver_id": request_data['driver_id'],
-        "status": "active"
-    })
-    
     response_data = {"status": request_data['status']}
     
-    if driver_ride and 'current_location' in driver_ride:
-        response_data['driver_location'] = driver_ride['current_location']['coordinates']
-        response_data['location_updated_at'] = driver_ride.get('location_updated_at')
+    latest_location = latest_driver_location(request_data['driver_id'])
+    if latest_location:
+        response_data['driver_location'], response_data['location_updated_at'] = latest_location
     
     return jsonify(response_data), 200
 
 @rides_bp.route('/share-rider-location', methods=['POST'])
 @token_required
 @role_required('rider')
+@validate_body(ShareLocationBody)
 def share_rider_location():
     """Share rider's current location with driver during active ride"""
-    data = request.get_json()
-    
-    if 'request_id' not in data or 'current_location' not in data:
-        return jsonify({"error": "request_id and current_location required"}), 400
-    
+    data = request.payload
     current_coords = data['current_location']
-    if not isinstance(current_coords, list) or len(current_coords) != 2:
-        return jsonify({"error": "Invalid location format"}), 400
-    
     rider_id = request.current_user['user_id']
     
     # Find the active ride request
@@ -809,24 +1010,89 @@ def share_rider_location():
         return jsonify({"error": "Active ride not found"}), 404
     
     # Update rider location in the ride request
-    result = mongo.db.ride_requests.update_one(
-        {"_id": ObjectId(data['request_id'])},
-        {
-            "$set": {
-                "rider_current_location": {
-                    "type": "Point",
-                    "coordinates": current_coords
-                },
-                "rider_location_updated_at": datetime.datetime.utcnow()
-            }
-        }
-    )
+    location_updated_at = datetime.datetime.utcnow()
+    result = RideRequest.update_rider_location(data['request_id'], current_coords, location_updated_at)
     
     if result.matched_count == 0:
         return jsonify({"error": "Failed to update location"}), 500
     
+    location_relay.publish(data['request_id'], 'rider', current_coords, location_updated_at)
+    
     return jsonify({"message": "Location shared successfully"}), 200
 
+def _forward_locations(ws, subscription, role):
+    """Send the other party's positions down a live location socket until it closes"""
+    while True:
+        message = subscription.get()
+        if message is None:  # Connection closed
+            return
+        
+        _event_type, data = message
+        if data['role'] == role:
+            continue  # Don't echo a user's own position back to them
+        
+        try:
+            ws.send(dumps_bytes(data).decode('utf-8'))
+        except Exception:
+            return
+
+@sock.route('/live/<request_id>', bp=rides_bp)
+def live_location_channel(ws, request_id):
+    """
+    WebSocket relaying driver and rider positions for an accepted ride request.
+    Connect with ?token=<jwt>; send {"type": "location", "coordinates": [lng, lat]}
+    and receive the other party's positions in the same shape (plus role and updated_at).
+    """
+    # Browsers cannot set headers on WebSocket connections, so the token comes in the query
+    current_user = authenticate_token(request.args.get('token', ''))
+    if current_user is None:
+        ws.close(reason=1008, message='Token is invalid or expired')
+        return
+    
+    if not ObjectId.is_valid(request_id):
+        ws.close(reason=1008, message='Invalid request id')
+        return
+    
+    user_id = ObjectId(current_user['user_id'])
+    ride_request = mongo.db.ride_requests.find_one({
+        "_id": ObjectId(request_id),
+        "status": {"$in": ["accepted", "started"]},
+        "$or": [{"rider_id": user_id}, {"driver_id": user_id}]
+    })
+    
+    if not ride_request:
+        ws.close(reason=1008, message='Active ride not found')
+        return
+    
+    role = 'driver' if ride_request['driver_id'] == user_id else 'rider'
+    driver_id = ride_request['driver_id']
+    
+    subscription = location_relay.join(request_id, driver_id)
+    forwarder = threading.Thread(target=_forward_locations, args=(ws, subscription, role), daemon=True)
+    forwarder.start()
+    
+    try:
+        while True:
+            try:
+                coords = LocationMessage.decode(ws.receive())['coordinates']
+            except ValidationError as e:
+                ws.send(dumps_bytes({"type": "error", "error": str(e)}).decode('utf-8'))
+                continue
+            
+            location_updated_at = datetime.datetime.utcnow()
+            
+            # Relay first, then persist in the background
+            if role == 'driver':
+                live_rides.update_driver_location(driver_id, coords, location_updated_at)
+                location_relay.publish_driver_location(driver_id, coords, location_updated_at)
+                location_buffer.record(driver_id, coords, location_updated_at)
+                trajectories.append_for_driver(driver_id, coords, location_updated_at)
+            else:
+                location_relay.publish(request_id, 'rider', coords, location_updated_at)
+                location_relay.persist(RideRequest.update_rider_location, request_id, coords, location_updated_at)
+    finally:
+        location_relay.leave(request_id, driver_id, subscription)
+
 
 # ===============================
 # PRE-BOOKING ENDPOINTS (PHASE 3)
@@ -835,23 +1101,12 @@ def share_rider_location():
 @rides_bp.route('/prebook/request', methods=['POST'])
 @token_required
 @role_required('rider')
+@validate_body(PreBookRequestBody)
 def create_prebook_request():
     """Rider creates a future ride request"""
-    data = request.get_json()
-    
-    required_fields = ['pickup_location', 'destination_location', 
-                      'pickup_address', 'destination_address', 'requested_datetime']
-    
-    if not all(field in data for field in required_fields):
-        return jsonify({"error": "Missing required fields"}), 400
-    
+    data = request.payload
     rider_id = request.current_user['user_id']
-    
-    # Parse requested datetime
-    try:
-        requested_dt = datetime.datetime.fromisoformat(data['requested_datetime'].replace('Z', '+00:00'))
-    except:
-        return jsonify({"error": "Invalid datetime format. Use ISO format."}), 400
+    requested_dt = data['requested_datetime']
     
     # Validate future datetime
     if requested_dt <= datetime.datetime.now(datetime.timezone.utc):
@@ -882,7 +1137,7 @@ def create_prebook_request():
     }
     
     # Calculate estimated fare
-    trip_distance = calculate_haversine_distance(data['pickup_location'], data['destination_location'])
+    trip_distance = resolve_trip_distance(data['pickup_location'], data['destination_location'])[0]
     estimated_fare = calculate_cost_sharing_fare(trip_distance)
     
     # Create pre-booking request
@@ -894,7 +1149,7 @@ def create_prebook_request():
         destination_address=data['destination_address'],
         requested_datetime=requested_dt,
         max_fare=data.get('max_fare'),
-        notes=data.get('notes', '')
+        notes=data['notes']
     )
     
     # Save estimated fare
@@ -912,16 +1167,11 @@ def create_prebook_request():
 @rides_bp.route('/prebook/nearby', methods=['POST'])
 @token_required
 @role_required('driver')
+@validate_body(PreBookNearbyBody)
 def find_nearby_prebook_requests():
     """Driver finds nearby pre-booking requests"""
-    data = request.get_json()
-    
-    if 'driver_location' not in data:
-        return jsonify({"error": "Driver location required"}), 400
-    
+    data = request.payload
     driver_coords = data['driver_location']
-    if not isinstance(driver_coords, list) or len(driver_coords) != 2:
-        return jsonify({"error": "Invalid location format"}), 400
     
     # Create GeoJSON point for driver location
     driver_location = {
@@ -930,25 +1180,26 @@ def find_nearby_prebook_requests():
     }
     
     # Find nearby requests (based on rider's home location)
-    max_distance = data.get('max_distance_km', 25)
+    max_distance = data['max_distance_km']
     nearby_requests = PreBookRequest.find_nearby_requests(driver_location, max_distance)
     
+    # Calculate time until each ride
+    now = datetime.datetime.utcnow()
+    times_until = [req['requested_datetime'] - now for req in nearby_requests]
+    hours_until_list = [int(time_until.total_seconds() / 3600) for time_until in times_until]
+    
+    # Calculate smart scores for pre-booking (time + distance + rating) in one pass
+    smart_scores = calculate_prebook_scores_batch(
+        [req['distance_to_rider_home'] for req in nearby_requests],
+        hours_until_list,
+        [req['rider_info'].get('averageRating', 0) for req in nearby_requests]
+    )
+    
     # Format response
     formatted_requests = []
-    for req in nearby_requests:
+    for req, time_until, hours_until, smart_score in zip(
+            nearby_requests, times_until, hours_until_list, smart_scores.tolist()):
         rider_info = req['rider_info']
-        rider_profile = req.get('rider_profile', [{}])[0] if req.get('rider_profile') else {}
-        
-        # Calculate time until ride
-        time_until = req['requested_datetime'] - datetime.datetime.utcnow()
-        hours_until = int(time_until.total_seconds() / 3600)
-        
-        # Calculate smart score for pre-booking (time + distance + rating)
-        distance_score = max(0, 100 - (req['distance_to_rider_home'] / 1000) * 5)  # Distance component
-        time_score = max(0, min(50, hours_until * 2))  # Time component (more points for sooner rides)
-        rating_score = rider_info.get('averageRating', 0) * 10  # Rating component
-        
-        smart_score = min(100, distance_score + time_score + rating_score)
         
         formatted_requests.append({
             "request_id": str(req['_id']),
@@ -966,7 +1217,7 @@ def find_nearby_prebook_requests():
             "estimated_fare": req.get('estimated_fare', 0),
             "max_fare": req.get('max_fare'),
             "notes": req.get('notes', ''),
-            "smart_score": round(smart_score),
+            "smart_score": smart_score,
             "created_at": req['created_at'].isoformat()
         })
     
@@ -994,13 +1245,14 @@ def accept_prebook_request(request_id):
     if not prebook_req:
         return jsonify({"error": "Request not found or no longer available"}), 404
     
-    # Check if driver already accepted this time slot
+    # Check if driver already accepted this time slot (same window the batch matcher uses)
+    conflict_window = datetime.timedelta(minutes=current_app.config['PREBOOK_CONFLICT_WINDOW_MINUTES'])
     conflict_check = mongo.db.prebook_requests.find_one({
         "matched_driver_id": ObjectId(driver_id),
         "status": "matched",
         "requested_datetime": {
-            "$gte": prebook_req['requested_datetime'] - datetime.timedelta(hours=1),
-            "$lte": prebook_req['requested_datetime'] + datetime.timedelta(hours=1)
+            "$gte": prebook_req['requested_datetime'] - conflict_window,
+            "$lte": prebook_req['requested_datetime'] + conflict_window
         }
     })
     
@@ -1011,8 +1263,9 @@ def accept_prebook_request(request_id):
     PreBookRequest.update_status(request_id, "matched", driver_id)
     
     # Get rider info for response
-    rider_info = mongo.db.users.find_one({"_id": prebook_req['rider_id']})
-    rider_profile = mongo.db.user_profiles.find_one({"user_id": prebook_req['rider_id']})
+    UserProfile.loader().prime([prebook_req['rider_id']])
+    rider_info = User.loader().load(prebook_req['rider_id']) or {}
+    rider_profile = UserProfile.loader().load(prebook_req['rider_id'])
     
     return jsonify({
         "message": "Pre-booking request accepted!",
@@ -1033,38 +1286,17 @@ def get_my_prebook_requests():
     """Get rider's pre-booking requests"""
     rider_id = request.current_user['user_id']
     
-    # Get requests with driver info (if matched)
-    pipeline = [
-        {
-            "$match": {"rider_id": ObjectId(rider_id)}
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "matched_driver_id",
-                "foreignField": "_id",
-                "as": "driver_info"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "user_profiles",
-                "localField": "matched_driver_id",
-                "foreignField": "user_id",
-                "as": "driver_profile"
-            }
-        },
-        {
-            "$sort": {"requested_datetime": 1}
-        }
-    ]
+    requests = list(mongo.db.prebook_requests.find({"rider_id": ObjectId(rider_id)}).sort("requested_datetime", 1))
     
-    requests = list(mongo.db.prebook_requests.aggregate(pipeline))
+    # Matched drivers' details in one query per collection
+    driver_ids = [req.get('matched_driver_id') for req in requests]
+    UserProfile.loader().prime(driver_ids)
+    User.loader().prime(driver_ids)
     
     formatted_requests = []
     for req in requests:
-        driver_info = req.get('driver_info', [{}])[0] if req.get('driver_info') else None
-        driver_profile = req.get('driver_profile', [{}])[0] if req.get('driver_profile') else {}
+        driver_info = User.loader().load(req.get('matched_driver_id'))
+        driver_profile = UserProfile.loader().load(req.get('matched_driver_id')) or {}
         
         request_data = {
             "request_id": str(req['_id']),
@@ -1099,50 +1331,28 @@ def get_my_accepted_prebooks():
     """Get driver's accepted pre-bookings"""
     driver_id = request.current_user['user_id']
     
-    # Get accepted requests with rider info
-    pipeline = [
-        {
-            "$match": {
-                "matched_driver_id": ObjectId(driver_id),
-                "status": "matched"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "rider_id",
-                "foreignField": "_id",
-                "as": "rider_info"
-            }
-        },
-        {
-            "$lookup": {
-                "from": "user_profiles",
-                "localField": "rider_id",
-                "foreignField": "user_id",
-                "as": "rider_profile"
-            }
-        },
-        {
-            "$unwind": "$rider_info"
-        },
-        {
-            "$sort": {"requested_datetime": 1}
-        }
-    ]
+    requests = list(mongo.db.prebook_requests.find({
+        "matched_driver_id": ObjectId(driver_id),
+        "status": "matched"
+    }).sort("requested_datetime", 1))
     
-    requests = list(mongo.db.prebook_requests.aggregate(pipeline))
+    # Rider details in one query per collection
+    rider_ids = [req['rider_id'] for req in requests]
+    UserProfile.loader().prime(rider_ids)
+    riders = User.loader().load_many(rider_ids)
     
     formatted_requests = []
-    for req in requests:
-        rider_profile = req.get('rider_profile', [{}])[0] if req.get('rider_profile') else {}
+    for req, rider_info in zip(requests, riders):
+        if not rider_info:
+            continue
+        rider_profile = UserProfile.loader().load(req['rider_id']) or {}
         
         formatted_requests.append({
             "request_id": str(req['_id']),
             "rider": {
-                "name": req['rider_info']['name'],
+                "name": rider_info['name'],
                 "phone": rider_profile.get('phone_number', 'Not available'),
-                "rating": req['rider_info'].get('averageRating', 0)
+                "rating": rider_info.get('averageRating', 0)
             },
             "pickup_address": req['pickup_address'],
             "destination_address": req['destination_address'],
@@ -1157,6 +1367,40 @@ def get_my_accepted_prebooks():
         "total": len(formatted_requests)
     }), 200
 
+@rides_bp.route('/prebook/proposals', methods=['GET'])
+@token_required
+@role_required('driver')
+def get_my_prebook_proposals():
+    """Get the pre-bookings the batch matcher proposed for this driver (accept via /prebook/accept)"""
+    driver_id = request.current_user['user_id']
+    
+    proposals = PreBookRequest.find_proposals_for_driver(driver_id)
+    riders = User.loader().load_many(req['rider_id'] for req in proposals)
+    
+    formatted_requests = []
+    for req, rider_info in zip(proposals, riders):
+        rider_info = rider_info or {}
+        
+        formatted_requests.append({
+            "request_id": str(req['_id']),
+            "rider": {
+                "name": rider_info.get('name', 'Unknown'),
+                "rating": rider_info.get('averageRating', 0)
+            },
+            "pickup_address": req['pickup_address'],
+            "destination_address": req['destination_address'],
+            "pickup_coordinates": req['pickup_location']['coordinates'],
+            "requested_datetime": req['requested_datetime'].isoformat(),
+            "estimated_fare": req.get('estimated_fare', 0),
+            "notes": req.get('notes', ''),
+            "proposed_at": req['proposed_at'].isoformat()
+        })
+    
+    return jsonify({
+        "proposals": formatted_requests,
+        "total": len(formatted_requests)
+    }), 200
+
 @rides_bp.route('/prebook/cancel/<request_id>', methods=['POST'])
 @token_required
 def cancel_prebook_request(request_id):
@@ -0,0 +1,161 @@
+"""
+Request body schemas for the API blueprints, applied with
+@validate_body(...) from app.utils.validation. Each view reads the cleaned
+body from request.payload.
+"""
+
+from app.utils.validation import (
+    Schema, String, Number, Boolean, Coordinates, Place, ObjectIdString,
+    DateTime, ListOf, Nested
+)
+
+# ---------- Auth ----------
+
+class RegisterBody(Schema):
+    email = String(max_length=254)
+    password = String(max_length=128, strip=False)
+    name = String(max_length=100)
+    homeAddress = String()
+    coordinates = Coordinates(error="Invalid coordinates format. Expected [longitude, latitude]")
+    role = String(choices=('rider', 'driver'))
+
+
+class LoginBody(Schema):
+    email = String(max_length=254, error="Missing email or password")
+    password = String(max_length=128, strip=False, error="Missing email or password")
+
+
+# ---------- Maps ----------
+
+class ReverseGeocodeBody(Schema):
+    lat = Number(minimum=-90, maximum=90)
+    lng = Number(minimum=-180, maximum=180)
+    refine = Boolean(default=False)
+
+
+class AutocompleteBody(Schema):
+    input = String(max_length=200, error="Input query required")
+
+
+class PlaceDetailsBody(Schema):
+    place_id = String(max_length=300, error="Place ID required")
+
+
+class DirectionsBody(Schema):
+    origin = Place()
+    destination = Place()
+
+
+class DistanceMatrixBody(Schema):
+    origins = ListOf(Place(), min_items=1, max_items=25)
+    destinations = ListOf(Place(), min_items=1, max_items=25)
+
+
+# ---------- Profiles ----------
+
+PHONE_NUMBER = r'\d{10}'
+
+
+class CompleteProfileBody(Schema):
+    phone_number = String(pattern=PHONE_NUMBER, error="Valid 10-digit phone number is required")
+    emergency_contact = String(required=False, max_length=100)
+    college_id = String(required=False, max_length=50)
+    # Required for drivers; checked in the view since it depends on the role
+    vehicle_model = String(required=False, max_length=50)
+    vehicle_color = String(required=False, max_length=30)
+    vehicle_plate = String(required=False, max_length=20)
+    driving_experience_years = Number(required=False, minimum=0, maximum=60, integer=True)
+    preferred_routes = ListOf(String(max_length=200), required=False, max_items=20)
+
+
+class UpdateProfileBody(Schema):
+    phone_number = String(required=False, pattern=PHONE_NUMBER, error="Valid 10-digit phone number is required")
+    emergency_contact = String(required=False, max_length=100)
+    college_id = String(required=False, max_length=50)
+    vehicle_model = String(required=False, max_length=50)
+    vehicle_color = String(required=False, max_length=30)
+    vehicle_plate = String(required=False, max_length=20)
+    driving_experience_years = Number(required=False, minimum=0, maximum=60, integer=True)
+    preferred_routes = ListOf(String(max_length=200), required=False, max_items=20)
+
+
+# ---------- Rides ----------
+
+class GoLiveBody(Schema):
+    pickup_location = Coordinates()
+    destination_location = Coordinates()
+    pickup_address = String()
+    destination_address = String()
+    seats_available = Number(minimum=1, maximum=8, integer=True, default=1)
+    # Either a Directions overview polyline or a [[longitude, latitude], ...] list
+    route_polyline = String(required=False, max_length=100000)
+    route = ListOf(Coordinates(), required=False, max_items=5000)
+
+
+class NearbyRidesBody(Schema):
+    current_location = Coordinates()
+    mode = String(required=False, choices=('radius', 'corridor'))
+    destination_location = Coordinates(required=False)
+    max_distance_km = Number(minimum=0.1, maximum=100, default=15)
+    corridor_width_km = Number(required=False, minimum=0.05, maximum=10)
+    max_detour_km = Number(required=False, minimum=0, maximum=50)
+
+
+class RideRequestBody(Schema):
+    ride_id = ObjectIdString(error="Invalid ride_id format")
+    pickup_location = Coordinates()
+    destination_location = Coordinates()
+    pickup_address = String()
+    destination_address = String()
+
+
+class RespondBody(Schema):
+    action = String(choices=('accept', 'reject'), error="Invalid action. Use 'accept' or 'reject'")
+
+
+class VerifyOtpBody(Schema):
+    request_id = ObjectIdString()
+    otp = String(max_length=10)
+
+
+class RatingsBody(Schema):
+    rider_rating = Number(required=False, minimum=1, maximum=5)
+
+
+class CompleteRideBody(Schema):
+    request_id = ObjectIdString(error="Request ID required")
+    ratings = Nested(RatingsBody, default={})
+
+
+class FareEstimateBody(Schema):
+    pickup_location = Coordinates()
+    destination_location = Coordinates()
+
+
+class LocationUpdateBody(Schema):
+    current_location = Coordinates()
+
+
+class ShareLocationBody(Schema):
+    request_id = ObjectIdString()
+    current_location = Coordinates()
+
+
+class LocationMessage(Schema):
+    """A position sent over the live location WebSocket."""
+    coordinates = Coordinates()
+
+
+class PreBookRequestBody(Schema):
+    pickup_location = Coordinates()
+    destination_location = Coordinates()
+    pickup_address = String()
+    destination_address = String()
+    requested_datetime = DateTime(error="Invalid datetime format. Use ISO format.")
+    max_fare = Number(required=False, minimum=0, maximum=10000)
+    notes = String(min_length=0, max_length=500, default='')
+
+
+class PreBookNearbyBody(Schema):
+    driver_location = Coordinates()
+    max_distance_km = Number(minimum=0.1, maximum=100, default=25)
@@ -2,6 +2,7 @@ from flask import current_app
 from bson.objectid import ObjectId
 import datetime
 from .. import mongo
+from ..utils.dataloader import request_loader
 
 class UserProfile:
     """
@@ -36,6 +37,19 @@ class UserProfile:
         """Find profile by user ID"""
         return mongo.db.user_profiles.find_one({"user_id": ObjectId(user_id)})
     
+    @staticmethod
+    def find_by_user_ids(user_ids):
+        """Profiles for a list of user ObjectIds in one query, as a dict keyed by user_id."""
+        return {
+            profile['user_id']: profile
+            for profile in mongo.db.user_profiles.find({"user_id": {"$in": list(user_ids)}})
+        }
+    
+    @staticmethod
+    def loader():
+        """Request-scoped DataLoader over profiles by user_id (see app.utils.dataloader)."""
+        return request_loader('user_profiles', UserProfile.find_by_user_ids)
+    
     @staticmethod
     def update_profile(user_id, profile_data):
         """Update existing profile"""
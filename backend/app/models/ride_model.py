@@ -1,21 +1,44 @@
 from flask import current_app
+from bson.binary import Binary
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
 import datetime
 from .. import mongo
+from ..utils.trajectory import decode_trajectory
+from .ride_state_machine import RideStateMachine
 
 class Ride:
     """
     The Ride model for handling active rides and ride requests.
     This represents when a driver "goes live" and is available for rides.
     """
+    # Fields returned by nearby searches (everything the /nearby response needs)
+    NEARBY_PROJECTION = {
+        "driver_id": 1,
+        "driver_snapshot": 1,
+        "pickup_location": 1,
+        "destination_location": 1,
+        "pickup_address": 1,
+        "destination_address": 1,
+        "seats_available": 1,
+        "current_location": 1,
+        "location_updated_at": 1,
+        "distance": 1
+    }
+
     def __init__(self, driver_id, pickup_location, destination_location, 
-                 pickup_address, destination_address, seats_available=1):
+                 pickup_address, destination_address, seats_available=1,
+                 driver_snapshot=None, route=None):
         self.driver_id = ObjectId(driver_id)
         self.pickup_location = pickup_location  # GeoJSON Point
         self.destination_location = destination_location  # GeoJSON Point
         self.pickup_address = pickup_address  # Human readable address
         self.destination_address = destination_address  # Human readable address
         self.seats_available = seats_available
+        self.driver_snapshot = driver_snapshot  # Denormalized name/rating/vehicle for searches
+        self.route = route  # Simplified GeoJSON LineString from pickup to destination
+        self.stops = []  # Pooled riders' pickups and drop-offs, in driving order
+        self.schedule_version = 0  # Bumped on every change to stops, for optimistic updates
         self.status = "active"  # active, completed, cancelled
         self.created_at = datetime.datetime.utcnow()
         self.updated_at = datetime.datetime.utcnow()
@@ -25,11 +48,54 @@ class Ride:
         ride_data = self.__dict__.copy()
         return mongo.db.rides.insert_one(ride_data)
     
+    @staticmethod
+    def build_driver_snapshot(driver_id):
+        """
+        Build the compact driver details embedded in a ride document,
+        so nearby searches never need to join users/user_profiles.
+        """
+        driver = mongo.db.users.find_one(
+            {"_id": ObjectId(driver_id)},
+            {"name": 1, "averageRating": 1}
+        ) or {}
+        profile = mongo.db.user_profiles.find_one(
+            {"user_id": ObjectId(driver_id)},
+            {"vehicle_model": 1, "vehicle_color": 1}
+        ) or {}
+        
+        return {
+            "name": driver.get('name', 'Unknown'),
+            "rating": driver.get('averageRating', 0),
+            "vehicle_model": profile.get('vehicle_model'),
+            "vehicle_color": profile.get('vehicle_color')
+        }
+    
+    @staticmethod
+    def sync_driver_snapshot(driver_id, fields=None):
+        """
+        Keep the driver snapshot on active rides in sync after a profile or rating change.
+        
+        Args:
+            driver_id: The driver whose details changed
+            fields: Optional dict of snapshot fields to set; rebuilt from scratch if omitted
+        """
+        from .. import live_rides
+        
+        if fields is None:
+            fields = Ride.build_driver_snapshot(driver_id)
+        
+        mongo.db.rides.update_many(
+            {"driver_id": ObjectId(driver_id), "status": "active"},
+            {"$set": {f"driver_snapshot.{key}": value for key, value in fields.items()}}
+        )
+        live_rides.update_driver_snapshot(driver_id, fields)
+    
     @staticmethod
     def find_nearby_rides(rider_location, max_distance_km=15):
         """
         Find nearby active rides using MongoDB's geospatial query.
-        Enhanced with better driver information and availability checking.
+        Driver details come from the embedded driver_snapshot, so this is a
+        single-collection query with no joins.
         """
         pipeline = [
             {
@@ -38,39 +104,34 @@ class Ride:
                     "distanceField": "distance",  # Add distance to results
                     "maxDistance": max_distance_km * 1000,  # Convert km to meters
                     "spherical": True,  # Use spherical geometry (Earth is round!)
-                    "query": {"status": "active"}  # Only active rides
-                }
-            },
-            {
-                "$lookup": {  # Join with users collection to get driver details
-                    "from": "users",
-                    "localField": "driver_id",
-                    "foreignField": "_id",
-                    "as": "driver_info"
-                }
-            },
-            {
-                "$lookup": {  # Join with user_profiles for additional driver info
-                    "from": "user_profiles",
-                    "localField": "driver_id",
-                    "foreignField": "user_id",
-                    "as": "driver_profile"
+                    "query": {"status": "active", "seats_available": {"$gt": 0}}  # Only rides with free seats
                 }
             },
             {
-                "$unwind": "$driver_info"  # Convert array to object
-            },
-            {
-                "$addFields": {
-                    "driver_info.phone_number": {
-                        "$arrayElemAt": ["$driver_profile.phone_number", 0]
-                    }
-                }
+                "$project": Ride.NEARBY_PROJECTION
             }
         ]
         
         return list(mongo.db.rides.aggregate(pipeline))
-    
+
+    @staticmethod
+    def find_active_rides():
+        """
+        Load every active ride for the in-memory live ride index.
+        Rides created before driver snapshots existed get one filled in here.
+        """
+        rides = list(mongo.db.rides.find({"status": "active"}, dict(Ride.NEARBY_PROJECTION, route=1)))
+        
+        for ride in rides:
+            if not ride.get('driver_snapshot'):
+                ride['driver_snapshot'] = Ride.build_driver_snapshot(ride['driver_id'])
+                mongo.db.rides.update_one(
+                    {"_id": ride['_id']},
+                    {"$set": {"driver_snapshot": ride['driver_snapshot']}}
+                )
+        
+        return rides
+
     @staticmethod
     def find_by_driver_id(driver_id):
         """Find active ride by driver ID"""
@@ -92,6 +153,92 @@ class Ride:
             }
         )
     
+    @staticmethod
+    def reserve_seat(ride_id, schedule_version, stops):
+        """
+        Atomically take one seat and store the new stop schedule.
+        Fails (returns None) if no seat is left or the schedule changed since it was read.
+        """
+        return mongo.db.rides.find_one_and_update(
+            {
+                "_id": ObjectId(ride_id),
+                "status": "active",
+                "seats_available": {"$gte": 1},
+                "schedule_version": schedule_version if schedule_version else {"$in": [0, None]}
+            },
+            {
+                "$set": {"stops": stops, "updated_at": datetime.datetime.utcnow()},
+                "$inc": {"seats_available": -1, "schedule_version": 1}
+            },
+            projection={"seats_available": 1, "stops": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def release_seat(driver_id, request_id):
+        """
+        Give back a pooled rider's seat and drop their remaining stops.
+        Only a rider who still has a drop-off on the schedule holds a seat, so this is safe to repeat.
+        """
+        return mongo.db.rides.find_one_and_update(
+            {
+                "driver_id": ObjectId(driver_id),
+                "status": "active",
+                "stops": {"$elemMatch": {"request_id": ObjectId(request_id), "type": "dropoff"}}
+            },
+            {
+                "$pull": {"stops": {"request_id": ObjectId(request_id)}},
+                "$inc": {"seats_available": 1, "schedule_version": 1},
+                "$set": {"updated_at": datetime.datetime.utcnow()}
+            },
+            projection={"seats_available": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def complete_pickup(driver_id, request_id):
+        """Remove a rider's pickup stop once they are on board"""
+        return mongo.db.rides.update_one(
+            {"driver_id": ObjectId(driver_id), "status": "active"},
+            {
+                "$pull": {"stops": {"request_id": ObjectId(request_id), "type": "pickup"}},
+                "$inc": {"schedule_version": 1}
+            }
+        )
+    
+    @staticmethod
+    def bulk_update_current_locations(updates):
+        """
+        Write many drivers' latest positions in one round trip.
+        A position never overwrites a newer one (e.g. flushed by another worker).
+        
+        Args:
+            updates: List of (driver_id, coordinates, updated_at) tuples
+        """
+        operations = [
+            UpdateOne(
+                {
+                    "driver_id": ObjectId(driver_id),
+                    "status": "active",
+                    "$or": [
+                        {"location_updated_at": {"$exists": False}},
+                        {"location_updated_at": {"$lt": updated_at}}
+                    ]
+                },
+                {
+                    "$set": {
+                        "current_location": {
+                            "type": "Point",
+                            "coordinates": coordinates
+                        },
+                        "location_updated_at": updated_at
+                    }
+                }
+            )
+            for driver_id, coordinates, updated_at in updates
+        ]
+        return mongo.db.rides.bulk_write(operations, ordered=False)
+    
     @staticmethod
     def get_driver_current_ride(driver_id):
         """Get driver's current active ride with full details"""
@@ -127,7 +274,8 @@ class RideRequest:
     Enhanced RideRequest model for when riders request rides from drivers.
     """
     def __init__(self, rider_id, driver_id, pickup_location, destination_location,
-                 pickup_address, destination_address, estimated_fare=0):
+                 pickup_address, destination_address, estimated_fare=0, distance_km=0,
+                 distance_source="straight_line"):
         self.rider_id = ObjectId(rider_id)
         self.driver_id = ObjectId(driver_id)
         self.pickup_location = pickup_location
@@ -135,6 +283,8 @@ class RideRequest:
         self.pickup_address = pickup_address
         self.destination_address = destination_address
         self.estimated_fare = estimated_fare
+        self.distance_km = distance_km  # Fare distance, replaced by the GPS distance on completion
+        self.distance_source = distance_source  # road, straight_line, then gps once completed
         self.status = "pending"  # pending, accepted, rejected, started, completed, cancelled
         self.created_at = datetime.datetime.utcnow()
         self.updated_at = datetime.datetime.utcnow()
@@ -143,9 +293,8 @@ class RideRequest:
         self.completed_at = None  # When ride is completed
         
     def save(self):
-        """Save ride request to database"""
-        request_data = self.__dict__.copy()
-        return mongo.db.ride_requests.insert_one(request_data)
+        """Save ride request to database; None if the rider already has an open request"""
+        return RideStateMachine.open_request(self)
     
     @staticmethod
     def find_by_driver_id(driver_id, status_filter=None):
@@ -177,24 +326,27 @@ class RideRequest:
         return mongo.db.ride_requests.find_one({"_id": ObjectId(request_id)})
     
     @staticmethod
-    def update_status(request_id, new_status, otp=None):
-        """Update ride request status with optional OTP and timestamps"""
-        update_data = {
-            "status": new_status,
-            "updated_at": datetime.datetime.utcnow()
-        }
-        
-        if otp:
-            update_data["otp"] = otp
-        
-        if new_status == "started":
-            update_data["started_at"] = datetime.datetime.utcnow()
-        elif new_status == "completed":
-            update_data["completed_at"] = datetime.datetime.utcnow()
-            
+    def set_actual_distance(request_id, distance_km):
+        """Record the distance actually travelled, measured from the ride's trajectory"""
         return mongo.db.ride_requests.update_one(
             {"_id": ObjectId(request_id)},
-            {"$set": update_data}
+            {"$set": {"distance_km": round(distance_km, 2), "distance_source": "gps"}}
+        )
+    
+    @staticmethod
+    def update_rider_location(request_id, coordinates, updated_at):
+        """Store the rider's latest shared position on a ride request"""
+        return mongo.db.ride_requests.update_one(
+            {"_id": ObjectId(request_id)},
+            {
+                "$set": {
+                    "rider_current_location": {
+                        "type": "Point",
+                        "coordinates": coordinates
+                    },
+                    "rider_location_updated_at": updated_at
+                }
+            }
         )
     
     @staticmethod
@@ -206,33 +358,12 @@ class RideRequest:
         })
     
     @staticmethod
-    def get_active_request_for_driver(driver_id):
-        """Get any active request for a driver (accepted or started)"""
-        return mongo.db.ride_requests.find_one({
+    def get_active_requests_for_driver(driver_id):
+        """Get all of a driver's active requests (accepted or started) - pooled rides can have several"""
+        return list(mongo.db.ride_requests.find({
             "driver_id": ObjectId(driver_id),
             "status": {"$in": ["accepted", "started"]}
-        })
-    
-    @staticmethod
-    def cancel_pending_requests_for_rider(rider_id, exclude_request_id=None):
-        """Cancel all pending requests for a rider, optionally excluding one"""
-        query = {
-            "rider_id": ObjectId(rider_id),
-            "status": "pending"
-        }
-        
-        if exclude_request_id:
-            query["_id"] = {"$ne": ObjectId(exclude_request_id)}
-        
-        return mongo.db.ride_requests.update_many(
-            query,
-            {
-                "$set": {
-                    "status": "cancelled",
-                    "updated_at": datetime.datetime.utcnow()
-                }
-            }
-        )
+        }).sort("created_at", 1))
     
     @staticmethod
     def get_request_with_user_details(request_id):
@@ -285,29 +416,49 @@ class RideRequest:
         return result[0] if result else None
 
 class RideHistory:
-    """Model for storing completed ride history and analytics"""
+    """
+    Archive of finished ride requests (the cold side of ride_requests).
+    
+    Completed and rejected requests are moved here in batches by
+    archive_rides.py once they have been terminal for RIDE_ARCHIVE_AFTER_MINUTES,
+    with the rider's and driver's details embedded so history pages need no joins.
+    Cancelled requests are not archived; a TTL index removes them from ride_requests.
+    """
+    ARCHIVED_STATUSES = ("completed", "rejected")
     
     @staticmethod
-    def create_history_record(request_id):
-        """Create a history record when ride is completed"""
-        request_data = RideRequest.get_request_with_user_details(request_id)
-        if not request_data:
-            return None
-        
+    def build_record(request_data, rider, driver, driver_profile):
+        """History document for a terminal request, with the users' details as they were"""
         history_record = {
-            "request_id": ObjectId(request_id),
+            "request_id": request_data["_id"],
+            "status": request_data["status"],
             "rider_id": request_data["rider_id"],
             "driver_id": request_data["driver_id"],
+            "rider": {
+                "name": rider.get("name", "Unknown"),
+                "rating": rider.get("averageRating", 0)
+            },
+            "driver": {
+                "name": driver.get("name", "Unknown"),
+                "rating": driver.get("averageRating", 0),
+                "vehicle_model": driver_profile.get("vehicle_model"),
+                "vehicle_color": driver_profile.get("vehicle_color")
+            },
             "pickup_address": request_data["pickup_address"],
             "destination_address": request_data["destination_address"],
+            "pickup_location": request_data.get("pickup_location"),
+            "destination_location": request_data.get("destination_location"),
             "final_fare": request_data.get("estimated_fare", 0),
             "distance_km": request_data.get("distance_km", 0),
+            "distance_source": request_data.get("distance_source", "straight_line"),
+            "requested_at": request_data.get("created_at"),
             "started_at": request_data.get("started_at"),
             "completed_at": request_data.get("completed_at"),
+            "updated_at": request_data.get("updated_at"),
             "total_duration": None,  # Calculate if both timestamps exist
             "rider_rating": None,  # To be updated when ratings are submitted
             "driver_rating": None,
-            "created_at": datetime.datetime.utcnow()
+            "archived_at": datetime.datetime.utcnow()
         }
         
         # Calculate duration if both timestamps exist
@@ -315,37 +466,68 @@ class RideHistory:
             duration = request_data["completed_at"] - request_data["started_at"]
             history_record["total_duration"] = duration.total_seconds() / 60  # Duration in minutes
         
-        return mongo.db.ride_history.insert_one(history_record)
+        return history_record
     
     @staticmethod
-    def get_user_ride_history(user_id, role="rider", limit=10):
-        """Get ride history for a user (either as rider or driver)"""
-        field_name = f"{role}_id"
+    def archive_batch(older_than, batch_size):
+        """
+        Move up to batch_size requests that became terminal before older_than
+        from ride_requests into ride_history.
         
-        pipeline = [
-            {
-                "$match": {field_name: ObjectId(user_id)}
-            },
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "rider_id" if role == "driver" else "driver_id",
-                    "foreignField": "_id",
-                    "as": "other_user"
-                }
-            },
-            {
-                "$unwind": "$other_user"
-            },
-            {
-                "$sort": {"completed_at": -1}
-            },
-            {
-                "$limit": limit
-            }
-        ]
+        Safe to repeat or run concurrently: records are upserted by request_id,
+        and only requests whose record is in place are deleted.
         
-        return list(mongo.db.ride_history.aggregate(pipeline))
+        Returns:
+            Number of requests archived
+        """
+        requests = list(mongo.db.ride_requests.find({
+            "status": {"$in": list(RideHistory.ARCHIVED_STATUSES)},
+            "updated_at": {"$lt": older_than}
+        }).sort("updated_at", 1).limit(batch_size))
+        if not requests:
+            return 0
+        
+        # Both sides' details for the whole batch, one query per collection
+        user_ids = list({req["rider_id"] for req in requests} | {req["driver_id"] for req in requests})
+        users = {
+            user["_id"]: user
+            for user in mongo.db.users.find({"_id": {"$in": user_ids}}, {"name": 1, "averageRating": 1})
+        }
+        profiles = {
+            profile["user_id"]: profile
+            for profile in mongo.db.user_profiles.find(
+                {"user_id": {"$in": user_ids}}, {"user_id": 1, "vehicle_model": 1, "vehicle_color": 1}
+            )
+        }
+        
+        mongo.db.ride_history.bulk_write([
+            UpdateOne(
+                {"request_id": req["_id"]},
+                {"$setOnInsert": RideHistory.build_record(
+                    req, users.get(req["rider_id"], {}), users.get(req["driver_id"], {}),
+                    profiles.get(req["driver_id"], {})
+                )},
+                upsert=True
+            )
+            for req in requests
+        ], ordered=False)
+        
+        mongo.db.ride_requests.delete_many({
+            "_id": {"$in": [req["_id"] for req in requests]},
+            "status": {"$in": list(RideHistory.ARCHIVED_STATUSES)}
+        })
+        return len(requests)
+    
+    @staticmethod
+    def find_by_request_id(request_id):
+        return mongo.db.ride_history.find_one({"request_id": ObjectId(request_id)})
+    
+    @staticmethod
+    def get_user_ride_history(user_id, role="rider", limit=10):
+        """Get ride history for a user (either as rider or driver); the other user's details are embedded"""
+        return list(mongo.db.ride_history.find(
+            {f"{role}_id": ObjectId(user_id)}
+        ).sort("requested_at", -1).limit(limit))
     
     @staticmethod
     def get_ride_statistics(user_id, role="rider"):
@@ -377,6 +559,44 @@ class RideHistory:
             "avg_rating": 0
         }
     
+class RideTrajectory:
+    """
+    GPS path of a completed ride, stored as one compact delta-encoded blob
+    per ride. Summary fields sit next to the blob so history and statistics
+    queries never need to decode the points. "truncated" marks a path that hit
+    the recorder's point cap, or one saved when the driver went offline
+    mid-ride.
+    """
+    ENCODING = "delta-varint-v1"
+    
+    @staticmethod
+    def save(request_id, driver_id, rider_id, trajectory, truncated=False):
+        """Persist a finished TrajectoryBuffer"""
+        record = {
+            "request_id": ObjectId(request_id),
+            "driver_id": ObjectId(driver_id),
+            "rider_id": ObjectId(rider_id),
+            "encoding": RideTrajectory.ENCODING,
+            "point_count": len(trajectory),
+            "distance_km": round(trajectory.distance_km, 3),
+            "started_at": trajectory.started_at,
+            "ended_at": trajectory.ended_at,
+            "truncated": truncated or trajectory.truncated,
+            "data": Binary(trajectory.encode()),
+            "created_at": datetime.datetime.utcnow()
+        }
+        return mongo.db.ride_trajectories.replace_one(
+            {"request_id": record["request_id"]}, record, upsert=True
+        )
+    
+    @staticmethod
+    def get_points(request_id):
+        """Decode a ride's stored path into a list of ([lng, lat], datetime) tuples"""
+        record = mongo.db.ride_trajectories.find_one(
+            {"request_id": ObjectId(request_id)}, {"data": 1}
+        )
+        return decode_trajectory(bytes(record["data"])) if record else None
+
 
 class PreBookRequest:
     """
@@ -418,43 +638,43 @@ class PreBookRequest:
         }
         return mongo.db.prebook_requests.insert_one(request_data)
     
-@staticmethod
-def find_nearby_requests(driver_location, max_distance_km=20):
-    pipeline = [
-        {
-            "$geoNear": {
-                "near": driver_location,
-                "distanceField": "distance_to_rider_home",
-                "maxDistance": max_distance_km * 1000,
-                "spherical": True,
-                "query": {
-                    "status": "open",
-                    "requested_datetime": {"$gt": datetime.datetime.utcnow()}
+    @staticmethod
+    def find_nearby_requests(driver_location, max_distance_km=20):
+        """Find open future pre-booking requests near a driver"""
+        pipeline = [
+            {
+                "$geoNear": {
+                    "near": driver_location,
+                    "distanceField": "distance_to_rider_home",
+                    "maxDistance": max_distance_km * 1000,
+                    "spherical": True,
+                    "query": {
+                        "status": "open",
+                        "requested_datetime": {"$gt": datetime.datetime.utcnow()}
+                    }
                 }
-            }
-        },
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "rider_id",
-                "foreignField": "_id",
-                "as": "rider_info"
-            }
-        },
-        {"$unwind": "$rider_info"},
-        {
-            "$lookup": {
-                "from": "user_profiles",
-                "localField": "rider_id",
-                "foreignField": "user_id",
-                "as": "rider_profile"
-            }
-        },
-        {"$sort": {"requested_datetime": 1}}
-    ]
+            },
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "rider_id",
+                    "foreignField": "_id",
+                    "as": "rider_info"
+                }
+            },
+            {"$unwind": "$rider_info"},
+            {
+                "$lookup": {
+                    "from": "user_profiles",
+                    "localField": "rider_id",
+                    "foreignField": "user_id",
+                    "as": "rider_profile"
+                }
+            },
+            {"$sort": {"requested_datetime": 1}}
+        ]
     
-    return list(mongo.db.prebook_requests.aggregate(pipeline))
-
+        return list(mongo.db.prebook_requests.aggregate(pipeline))
 
     @staticmethod
     def find_by_rider_id(rider_id, status_filter=None):
@@ -465,6 +685,86 @@ def find_nearby_requests(driver_location, max_distance_km=20):
         
         return list(mongo.db.prebook_requests.find(query).sort("requested_datetime", 1))
     
+    @staticmethod
+    def find_open_in_window(window_start, window_end):
+        """Open pre-booking requests for rides in a time window, with the rider's rating"""
+        pipeline = [
+            {
+                "$match": {
+                    "status": "open",
+                    "requested_datetime": {"$gte": window_start, "$lte": window_end}
+                }
+            },
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "rider_id",
+                    "foreignField": "_id",
+                    "as": "rider_info"
+                }
+            },
+            {
+                "$project": {
+                    "pickup_location": 1,
+                    "requested_datetime": 1,
+                    "rider_rating": {"$ifNull": [{"$arrayElemAt": ["$rider_info.averageRating", 0]}, 0]}
+                }
+            }
+        ]
+        
+        return list(mongo.db.prebook_requests.aggregate(pipeline))
+    
+    @staticmethod
+    def find_matched_in_window(window_start, window_end):
+        """Drivers' already matched pre-bookings in a time window (for conflict checks)"""
+        return list(mongo.db.prebook_requests.find(
+            {
+                "status": "matched",
+                "requested_datetime": {"$gte": window_start, "$lte": window_end}
+            },
+            {"matched_driver_id": 1, "requested_datetime": 1}
+        ))
+    
+    @staticmethod
+    def save_proposals(request_ids, proposals):
+        """
+        Replace the proposed matches for a set of open requests in one bulk write.
+        
+        Args:
+            request_ids: IDs of every request considered in the run (their old proposals are cleared)
+            proposals: List of (request_id, driver_id, cost) tuples
+        """
+        now = datetime.datetime.utcnow()
+        operations = [
+            UpdateMany(
+                {"_id": {"$in": list(request_ids)}, "status": "open"},
+                {"$unset": {"proposed_driver_id": "", "proposal_cost": "", "proposed_at": ""}}
+            )
+        ]
+        operations.extend(
+            UpdateOne(
+                {"_id": ObjectId(request_id), "status": "open"},
+                {
+                    "$set": {
+                        "proposed_driver_id": ObjectId(driver_id),
+                        "proposal_cost": round(cost, 2),
+                        "proposed_at": now
+                    }
+                }
+            )
+            for request_id, driver_id, cost in proposals
+        )
+        return mongo.db.prebook_requests.bulk_write(operations, ordered=True)
+    
+    @staticmethod
+    def find_proposals_for_driver(driver_id):
+        """Open pre-booking requests the batch matcher proposed for a driver"""
+        return list(mongo.db.prebook_requests.find({
+            "proposed_driver_id": ObjectId(driver_id),
+            "status": "open",
+            "requested_datetime": {"$gt": datetime.datetime.utcnow()}
+        }).sort("requested_datetime", 1))
+    
     @staticmethod
     def update_status(request_id, new_status, driver_id=None):
         """Update pre-booking request status"""
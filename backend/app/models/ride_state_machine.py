@@ -0,0 +1,136 @@
+from flask import current_app
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import datetime
+from .. import mongo
+
+class RideStateMachine:
+    """
+    The legal status changes of a ride request.
+
+    Every transition is a single conditional find_one_and_update: the filter
+    names the statuses it may leave from (plus any ownership or OTP check),
+    so of two concurrent attempts only one can match, and the winner gets the
+    updated document back without a separate read.
+
+    While a request is open (pending or accepted) it carries open_rider_id,
+    which has a unique partial index, so a rider can never hold two open
+    requests however many are sent at once. The index is ensured on the
+    first open_request in each process, so it does not depend on
+    setup_database.py having been re-run.
+
+    Cancelled requests get an expires_at, after which a TTL index deletes
+    them; completed and rejected ones are moved to ride_history instead
+    (see RideHistory.archive_batch).
+    """
+    # event -> (statuses it may leave from, status it moves to)
+    TRANSITIONS = {
+        "accept": (("pending",), "accepted"),
+        "reject": (("pending",), "rejected"),
+        "cancel": (("pending", "accepted"), "cancelled"),
+        "start": (("accepted",), "started"),
+        "complete": (("started",), "completed"),
+        # Compensates an accept whose seat reservation failed afterwards
+        "unaccept": (("accepted",), "pending"),
+    }
+    OPEN_STATUSES = ("pending", "accepted")
+    TERMINAL_STATUSES = ("rejected", "cancelled", "completed")
+    TIMESTAMP_FIELDS = {"started": "started_at", "completed": "completed_at"}
+    _lock_index_ready = False
+
+    @classmethod
+    def ensure_lock_index(cls):
+        """Create the unique partial index behind open_rider_id, once per process."""
+        if not cls._lock_index_ready:
+            # Same spec as setup_database.py, so this is a no-op where it already exists
+            mongo.db.ride_requests.create_index(
+                [("open_rider_id", 1)], unique=True,
+                partialFilterExpression={"open_rider_id": {"$exists": True}}
+            )
+            cls._lock_index_ready = True
+
+    @classmethod
+    def open_request(cls, ride_request):
+        """
+        Insert a new pending RideRequest, taking the rider's open-request lock.
+        Returns the InsertOneResult, or None if the rider already has an open request.
+        """
+        cls.ensure_lock_index()
+
+        # Open requests from before the lock existed carry no open_rider_id
+        if mongo.db.ride_requests.find_one(
+                {"rider_id": ride_request.rider_id, "status": {"$in": list(cls.OPEN_STATUSES)},
+                 "open_rider_id": {"$exists": False}},
+                {"_id": 1}):
+            return None
+
+        request_data = ride_request.__dict__.copy()
+        request_data["open_rider_id"] = request_data["rider_id"]
+        try:
+            return mongo.db.ride_requests.insert_one(request_data)
+        except DuplicateKeyError:
+            return None
+
+    @classmethod
+    def _update(cls, event, extra_fields=None):
+        target = cls.TRANSITIONS[event][1]
+        now = datetime.datetime.utcnow()
+        fields = {"status": target, "updated_at": now}
+        if target in cls.TIMESTAMP_FIELDS:
+            fields[cls.TIMESTAMP_FIELDS[target]] = now
+        if target == "cancelled":
+            ttl_hours = current_app.config.get('CANCELLED_REQUEST_TTL_HOURS', 24)
+            fields["expires_at"] = now + datetime.timedelta(hours=ttl_hours)
+        fields.update(extra_fields or {})
+
+        update = {"$set": fields}
+        if target not in cls.OPEN_STATUSES:
+            # Leaving the open states releases the rider's lock
+            update["$unset"] = {"open_rider_id": ""}
+        return update
+
+    @classmethod
+    def transition(cls, request_id, event, match=None, set_fields=None,
+                   projection=None, return_document=ReturnDocument.AFTER):
+        """
+        Apply event to one request in a single round trip.
+
+        Args:
+            match: Extra conditions, e.g. {"driver_id": ...} or {"otp": ...}
+            set_fields: Extra fields to set along with the new status
+            return_document: ReturnDocument.BEFORE to get the status it left from
+
+        Returns:
+            The request document, or None if it was not in a state (or not
+            owned as required) to take this event
+        """
+        sources = cls.TRANSITIONS[event][0]
+        query = {"_id": ObjectId(request_id), "status": {"$in": list(sources)}}
+        query.update(match or {})
+
+        return mongo.db.ride_requests.find_one_and_update(
+            query, cls._update(event, set_fields), projection=projection, return_document=return_document
+        )
+
+    @classmethod
+    def transition_all(cls, event, match, projection=None):
+        """
+        Apply event to every request matching match that is in a state to take it,
+        one find_one_and_update at a time, so each request returned is exactly
+        one this call moved (including any created while it runs).
+
+        Returns:
+            List of the updated request documents
+        """
+        query = {"status": {"$in": list(cls.TRANSITIONS[event][0])}}
+        query.update(match)
+
+        updated = []
+        while True:
+            ride_request = mongo.db.ride_requests.find_one_and_update(
+                query, cls._update(event), projection=projection, return_document=ReturnDocument.AFTER
+            )
+            if ride_request is None:
+                return updated
+            updated.append(ride_request)
@@ -0,0 +1,78 @@
+from flask import current_app
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+import datetime
+from .. import mongo
+
+class UserStats:
+    """
+    Per-user ride statistics, kept up to date as rides complete so the
+    profile statistics page is a single read by _id (the user's id).
+
+    Counters are only ever changed with $inc: rides_completed, fare_total,
+    distance_km_total and rating_sum / rating_count (ratings received).
+    recent_rides holds the newest USER_STATS_RECENT_RIDES completed rides,
+    kept sorted and capped by $push with $sort and $slice.
+    """
+    COUNTERS = ("rides_completed", "fare_total", "distance_km_total", "rating_sum", "rating_count")
+
+    @staticmethod
+    def recent_limit():
+        return current_app.config.get('USER_STATS_RECENT_RIDES', 5)
+
+    @staticmethod
+    def recent_ride(ride_request, other_user_name):
+        """The recent_rides entry for a completed request, as seen by one side of it"""
+        return {
+            "request_id": ride_request['_id'],
+            "completed_at": ride_request.get('completed_at'),
+            "other_user": other_user_name,
+            "pickup": ride_request['pickup_address'],
+            "destination": ride_request['destination_address'],
+            "fare": ride_request.get('estimated_fare', 0)
+        }
+
+    @staticmethod
+    def update_operation(user_id, role, increments, recent_rides=(), recent_limit=5):
+        """One upserting UpdateOne adding increments and recent_rides to a user's stats"""
+        update = {
+            "$inc": increments,
+            "$set": {"role": role, "updated_at": datetime.datetime.utcnow()}
+        }
+        if recent_rides:
+            update["$push"] = {"recent_rides": {
+                "$each": list(recent_rides),
+                "$sort": {"completed_at": -1},
+                "$slice": recent_limit
+            }}
+        return UpdateOne({"_id": ObjectId(user_id)}, update, upsert=True)
+
+    @staticmethod
+    def record_completed_ride(ride_request, rider_name, driver_name, rider_rating=None):
+        """
+        Add a completed ride to both the rider's and the driver's stats,
+        in one round trip.
+        """
+        fare = ride_request.get('estimated_fare', 0) or 0
+        distance_km = ride_request.get('distance_km', 0) or 0
+        limit = UserStats.recent_limit()
+
+        rider_increments = {"rides_completed": 1, "fare_total": fare, "distance_km_total": distance_km}
+        if rider_rating:
+            rider_increments.update(rating_sum=rider_rating, rating_count=1)
+
+        return mongo.db.user_stats.bulk_write([
+            UserStats.update_operation(
+                ride_request['rider_id'], 'rider', rider_increments,
+                [UserStats.recent_ride(ride_request, driver_name)], limit
+            ),
+            UserStats.update_operation(
+                ride_request['driver_id'], 'driver',
+                {"rides_completed": 1, "fare_total": fare, "distance_km_total": distance_km},
+                [UserStats.recent_ride(ride_request, rider_name)], limit
+            )
+        ], ordered=False)
+
+    @staticmethod
+    def find_by_user_id(user_id):
+        return mongo.db.user_stats.find_one({"_id": ObjectId(user_id)})
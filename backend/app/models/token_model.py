@@ -0,0 +1,34 @@
+from bson.objectid import ObjectId
+import datetime
+from .. import mongo
+
+class RevokedToken:
+    """
+    Revoked JWT IDs (jti). Each document expires with the token it revokes,
+    via a TTL index on expires_at, so the collection only ever holds tokens
+    that would otherwise still be valid.
+    """
+
+    @staticmethod
+    def revoke(jti, user_id, exp):
+        """Record a token as revoked until its exp (epoch seconds)."""
+        return mongo.db.revoked_tokens.update_one(
+            {"jti": jti},
+            {"$setOnInsert": {
+                "jti": jti,
+                "user_id": ObjectId(user_id),
+                "expires_at": datetime.datetime.utcfromtimestamp(exp),
+                "revoked_at": datetime.datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    @staticmethod
+    def find_revoked_since(since=None):
+        """Unexpired revocations, optionally only those recorded at or after since"""
+        query = {"expires_at": {"$gt": datetime.datetime.utcnow()}}
+        if since is not None:
+            query["revoked_at"] = {"$gte": since}
+        return list(mongo.db.revoked_tokens.find(
+            query, {"_id": 0, "jti": 1, "expires_at": 1, "revoked_at": 1}
+        ))
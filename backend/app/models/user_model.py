@@ -2,6 +2,7 @@ from flask import current_app
 from bson.objectid import ObjectId
 import datetime
 from .. import mongo
+from ..utils.dataloader import request_loader
 
 class User:
     """
@@ -42,11 +43,45 @@ class User:
         """Finds a user by their ObjectId."""
         return mongo.db.users.find_one({"_id": ObjectId(user_id)})
     
+    @staticmethod
+    def find_by_ids(user_ids):
+        """Users for a list of ObjectIds in one query, as a dict keyed by _id."""
+        return {user['_id']: user for user in mongo.db.users.find({"_id": {"$in": list(user_ids)}})}
+    
+    @staticmethod
+    def loader():
+        """Request-scoped DataLoader over users by _id (see app.utils.dataloader)."""
+        return request_loader('users', User.find_by_ids)
+    
+    @staticmethod
+    def find_drivers_for_matching():
+        """All drivers with the fields the pre-booking matcher needs"""
+        return list(mongo.db.users.find(
+            {"role": "driver", "homeLocation.coordinates": {"$exists": True}},
+            {"homeLocation": 1, "averageRating": 1}
+        ))
+    
+    @staticmethod
+    def find_saved_places(user_id):
+        """The user's saved places (currently their home address) for autocomplete"""
+        user = mongo.db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {"home_address_text": 1, "homeLocation": 1}
+        )
+        if not user or not user.get('home_address_text'):
+            return []
+        return [{
+            "name": "Home",
+            "address": user['home_address_text'],
+            "coordinates": user['homeLocation']['coordinates']
+        }]
+    
     @staticmethod
     def update_rating(user_id, new_rating):
         """Update user's average rating"""
         try:
-            user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+            # Through the request's loader, so a handler that also needs this user reads it once
+            user = User.loader().load(ObjectId(user_id))
             if not user:
                 return False
             
@@ -66,6 +101,11 @@ class User:
                 {"_id": ObjectId(user_id)},
                 {"$set": {"averageRating": round(new_avg, 2), "totalRides": new_total}}
             )
+            
+            # Live rides carry a copy of the driver's rating for nearby searches
+            if user.get('role') == 'driver':
+                from .ride_model import Ride
+                Ride.sync_driver_snapshot(user_id, {"rating": round(new_avg, 2)})
             return True
         except:
             return False
\ No newline at end of file
@@ -0,0 +1,289 @@
+import heapq
+import re
+import threading
+from collections import OrderedDict
+
+from .cache import LRUCache
+from .distance_utils import get_popular_destinations
+
+# Ranking: saved places first, then popular destinations, then provider results
+SOURCE_RANK = {'saved': 3, 'popular': 2, 'provider': 1}
+
+# Provider statuses whose predictions are indexed
+INDEXED_STATUSES = ('OK', 'ZERO_RESULTS')
+
+REQUEST_PARAMS = {
+    'components': 'country:in',  # Restrict to India
+    'types': 'establishment|geocode'
+}
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_query(text):
+    """Lower-case words of a place name or query, punctuation removed."""
+    return _NON_WORD.sub(' ', str(text).lower()).split()
+
+
+def _matches(words, query_words):
+    """True if every query word is a prefix of some word of the place."""
+    return all(any(word.startswith(q) for word in words) for q in query_words)
+
+
+class _Node:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()  # Every place with a word starting with this node's prefix
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, the others wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [done event, result, exception]
+
+    def do(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+
+        if not leader:
+            call[0].wait()
+        else:
+            try:
+                call[1] = function()
+            except Exception as e:
+                call[2] = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call[0].set()
+
+        if call[2] is not None:
+            raise call[2]
+        return call[1]
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class AutocompleteIndex:
+    """
+    Server-side prefix trie for /api/maps/autocomplete.
+
+    Every word of a place's description is indexed, so "hebb" and "bus st"
+    both find "Hebbal Bus Stop". The trie is seeded with the popular
+    destinations and grows with every provider answer (least recently seen
+    provider places are evicted past AUTOCOMPLETE_MAX_ENTRIES). Users' saved
+    places are matched per request and never shared between users.
+
+    A query is answered locally when it yields AUTOCOMPLETE_MIN_LOCAL_RESULTS
+    places or the same query was already sent upstream; otherwise one
+    provider call is made, shared by every concurrent request for that query.
+    """
+
+    def __init__(self, maps_client):
+        self.maps_client = maps_client
+        self.max_entries = 20000
+        self.max_results = 5
+        self.min_local_results = 3
+        self._lock = threading.RLock()
+        self._root = _Node()
+        self._places = {}  # place key -> place
+        self._provider_keys = OrderedDict()  # provider place keys, least recently seen first
+        self._answered = OrderedDict()  # normalized queries already sent upstream
+        self._flight = SingleFlight()
+        self.saved_places = LRUCache(max_entries=5000, ttl_seconds=600)  # user_id -> saved places
+        self._stats = {"local_hits": 0, "provider_calls": 0, "coalesced": 0}
+        for place in get_popular_destinations():
+            self._add(f"popular:{place['name']}", {
+                "description": f"{place['name']}, {place['address']}",
+                "coordinates": place['coordinates'],
+                "structured_formatting": {"main_text": place['name'], "secondary_text": place['address']}
+            }, 'popular')
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('AUTOCOMPLETE_MAX_ENTRIES', self.max_entries)
+        self.max_results = app.config.get('AUTOCOMPLETE_MAX_RESULTS', self.max_results)
+        self.min_local_results = app.config.get('AUTOCOMPLETE_MIN_LOCAL_RESULTS', self.min_local_results)
+        self.saved_places = LRUCache(
+            self.saved_places.max_entries,
+            app.config.get('AUTOCOMPLETE_SAVED_PLACES_TTL_SECONDS', self.saved_places.ttl_seconds)
+        )
+
+    # -------------------------
+    # Trie maintenance
+    # -------------------------
+
+    def _add(self, key, prediction, source, position=0):
+        with self._lock:
+            place = self._places.get(key)
+            if place is not None:
+                place["seen"] += 1
+                place["position"] = min(place["position"], position)
+                if source == 'provider':
+                    self._provider_keys.move_to_end(key)
+                return
+
+            words = normalize_query(prediction['description'])
+            self._places[key] = {
+                "prediction": prediction, "source": source, "words": words,
+                "seen": 1, "position": position
+            }
+            for word in set(words):
+                node = self._root
+                for char in word:
+                    node = node.children.setdefault(char, _Node())
+                    node.ids.add(key)
+
+            if source == 'provider':
+                self._provider_keys[key] = True
+                while len(self._provider_keys) > self.max_entries:
+                    self._remove(self._provider_keys.popitem(last=False)[0])
+
+    def _remove(self, key):
+        place = self._places.pop(key)
+        for word in set(place["words"]):
+            node = self._root
+            path = []
+            for char in word:
+                path.append((node, char))
+                node = node.children[char]
+                node.ids.discard(key)
+            # Prune branches no place uses any more
+            for parent, char in reversed(path):
+                if parent.children[char].ids:
+                    break
+                del parent.children[char]
+
+    def _candidates(self, query_words):
+        """Keys of indexed places matching every query word as a word prefix."""
+        sets = []
+        for word in query_words:
+            node = self._root
+            for char in word:
+                node = node.children.get(char)
+                if node is None:
+                    return set()
+            sets.append(node.ids)
+        sets.sort(key=len)
+        candidates = set(sets[0])
+        for ids in sets[1:]:
+            candidates &= ids
+        return candidates
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def lookup(self, query, saved_places=(), force=False):
+        """
+        Ranked local suggestions for a query.
+
+        Args:
+            query: Text typed so far
+            saved_places: The user's saved places, dicts with name, address and coordinates
+            force: Answer from the trie even if it would count as a miss
+
+        Returns:
+            Google-shaped autocomplete response, or None on a miss
+        """
+        query_words = normalize_query(query)
+        if not query_words:
+            return None
+        normalized = ' '.join(query_words)
+
+        matches = []
+        for place in saved_places:
+            description = f"{place['name']}, {place['address']}"
+            words = normalize_query(description)
+            if _matches(words, query_words):
+                matches.append({
+                    "prediction": {
+                        "description": description,
+                        "coordinates": place['coordinates'],
+                        "structured_formatting": {"main_text": place['name'], "secondary_text": place['address']}
+                    },
+                    "source": 'saved', "words": words, "seen": 1, "position": 0
+                })
+
+        with self._lock:
+            matches.extend(self._places[key] for key in self._candidates(query_words))
+            answered = normalized in self._answered
+            if answered:
+                self._answered.move_to_end(normalized)
+
+        if not force and not answered and len(matches) < self.min_local_results:
+            return None
+
+        def rank(place):
+            # Within a source: descriptions starting with the query, then how often the
+            # provider returned the place, its best provider position, shorter names
+            return (SOURCE_RANK[place["source"]], ' '.join(place["words"]).startswith(normalized),
+                    place["seen"], -place["position"], -len(place["prediction"]["description"]))
+
+        best = heapq.nlargest(self.max_results, matches, key=rank)
+        if not force:
+            self._count("local_hits")
+        return {
+            "status": "OK" if best else "ZERO_RESULTS",
+            "source": "local",
+            "predictions": [dict(place["prediction"], source=place["source"]) for place in best]
+        }
+
+    def fetch(self, query):
+        """
+        Ask the provider for a query and index its predictions. Concurrent
+        calls for the same normalized query share one upstream request.
+
+        Returns:
+            Provider response dict, or None if the provider answered with an HTTP error
+
+        Raises:
+            requests.RequestException if the provider could not be reached
+        """
+        normalized = ' '.join(normalize_query(query))
+        is_leader = []
+
+        def call():
+            is_leader.append(True)
+            self._count("provider_calls")
+            response = self.maps_client.get('autocomplete', dict(REQUEST_PARAMS, input=query))
+            if response.status_code != 200:
+                return None
+
+            data = response.json()
+            if data.get('status') in INDEXED_STATUSES:
+                for position, prediction in enumerate(data.get('predictions', [])):
+                    if prediction.get('place_id') and prediction.get('description'):
+                        self._add(f"place:{prediction['place_id']}", prediction, 'provider', position)
+                with self._lock:
+                    self._answered[normalized] = True
+                    while len(self._answered) > self.max_entries:
+                        self._answered.popitem(last=False)
+            return data
+
+        data = self._flight.do(normalized, call)
+        if not is_leader:
+            self._count("coalesced")
+        return data
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["places"] = len(self._places)
+            stats["answered_queries"] = len(self._answered)
+        stats["in_flight"] = len(self._flight)
+        return stats
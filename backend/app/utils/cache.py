@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache where every entry also expires after ttl_seconds.
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """
+    Persistent key/value store on a local SQLite file, so cached provider
+    responses survive restarts and are shared between workers on one host.
+    Values are stored as JSON with an absolute expiry timestamp.
+    """
+
+    def __init__(self, path, table):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        # Opened lazily so app start-up never touches the disk
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """Return the stored value, or None if missing or expired."""
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl_seconds)
+            )
+            conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            conn.commit()
+
+    def purge_expired(self):
+        """Delete expired rows. Returns the number of rows removed."""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+            return cursor.rowcount
+
+
+class TieredCache:
+    """
+    Two-tier cache: an in-memory LRU in front of an optional SQLite store.
+    Disk hits are promoted into memory. Hit/miss counters are kept per tier.
+
+    Configured from the Flask config with init_app, using keys prefixed by
+    config_prefix (e.g. GEOCODE_CACHE_TTL_SECONDS).
+    """
+
+    def __init__(self, name, config_prefix, max_entries=5000, ttl_seconds=3600):
+        self.name = name
+        self.config_prefix = config_prefix
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.store = None
+        self.ttl_seconds = ttl_seconds
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+
+    def init_app(self, app):
+        prefix = self.config_prefix
+        self.ttl_seconds = app.config.get(f'{prefix}_TTL_SECONDS', self.ttl_seconds)
+        self.memory = LRUCache(
+            app.config.get(f'{prefix}_MAX_ENTRIES', self.memory.max_entries),
+            self.ttl_seconds
+        )
+
+        cache_dir = app.config.get('CACHE_DIR')
+        if cache_dir and app.config.get(f'{prefix}_PERSIST', True):
+            self.store = SQLiteStore(os.path.join(cache_dir, f'{self.name}.sqlite'), self.name)
+
+    def _count(self, counter):
+        with self._stats_lock:
+            self._stats[counter] += 1
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except sqlite3.Error as e:
+                print(f"Warning: {self.name} cache read failed: {e}")
+                value = None
+            if value is not None:
+                self._count("disk_hits")
+                self.memory.set(key, value)
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        self.memory.set(key, value, ttl)
+        self._count("sets")
+
+        if self.store is not None:
+            try:
+                self.store.set(key, value, ttl)
+            except sqlite3.Error as e:
+                print(f"Warning: {self.name} cache write failed: {e}")
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def stats(self):
+        """Hit/miss counters and hit rate for this cache."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0
+        stats["memory_entries"] = len(self.memory)
+        return stats
@@ -0,0 +1,77 @@
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider that keeps failing or answering slowly.
+
+    After failure_threshold consecutive failed or slow calls the breaker opens
+    and allow() returns False for reset_seconds, so callers serve a fallback
+    straight away. It then lets a single trial call through (half-open): a
+    success closes it again, a failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30, slow_call_seconds=3.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """True if a provider call may be made now."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self._stats["rejected"] += 1
+            return False
+
+    def record(self, success, elapsed_seconds=0.0):
+        """Report the outcome of a call made after allow(). Slow successes count as failures."""
+        slow = success and elapsed_seconds > self.slow_call_seconds
+        with self._lock:
+            if success and not slow:
+                self._stats["successes"] += 1
+                self._failures = 0
+                self._state = CLOSED
+                self._trial_in_flight = False
+                return
+
+            self._stats["slow_calls" if slow else "failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["opened"] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["state"] = self.state
+        return stats
@@ -0,0 +1,131 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from pymongo import monitoring
+
+
+class DataLoader:
+    """
+    Batches and memoizes key lookups against one collection.
+
+    Keys are queued with prime() and fetched together by the next load() or
+    load_many(), in one call to batch_fn; every result (including misses) is
+    remembered, so a key is never fetched twice. A handler that primes every
+    ID it needs up front therefore issues one query per collection.
+    """
+
+    def __init__(self, batch_fn):
+        """
+        Args:
+            batch_fn: Callable taking a list of keys and returning a dict of key -> document
+        """
+        self._batch_fn = batch_fn
+        self._cache = {}
+        self._queue = {}  # keys waiting for the next batch, in insertion order
+        self.batches = 0
+
+    def prime(self, keys):
+        """Queue keys for the next batch (None and already known keys are skipped)."""
+        for key in keys:
+            if key is not None and key not in self._cache and key not in self._queue:
+                self._queue[key] = True
+        return self
+
+    def dispatch(self):
+        if not self._queue:
+            return
+        keys, self._queue = list(self._queue), {}
+        found = self._batch_fn(keys)
+        self.batches += 1
+        for key in keys:
+            self._cache[key] = found.get(key)
+
+    def load(self, key):
+        """The document for key, or None."""
+        if key is None:
+            return None
+        if key not in self._cache:
+            self.prime([key])
+            self.dispatch()
+        return self._cache[key]
+
+    def load_many(self, keys):
+        """Documents for keys, in order (None where missing), fetched in at most one batch."""
+        keys = list(keys)
+        self.prime(keys)
+        self.dispatch()
+        return [self._cache.get(key) for key in keys]
+
+
+def request_loader(name, batch_fn):
+    """
+    The DataLoader called name for the current request (or app context),
+    created with batch_fn on first use. Outside a context a fresh, unshared
+    loader is returned.
+    """
+    if not has_app_context():
+        return DataLoader(batch_fn)
+    loaders = g.setdefault('_dataloaders', {})
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(batch_fn)
+    return loader
+
+
+class QueryCounter(monitoring.CommandListener):
+    """
+    Counts MongoDB commands per (command, collection) on the current thread,
+    for checking how many queries a handler issues. Register it before the
+    client is created (MONGO_COUNT_QUERIES=True makes create_app do so) and
+    wrap the code under test in count_queries() or assert_max_queries().
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def started(self, event):
+        counters = getattr(self._local, 'counters', None)
+        if counters:
+            collection = event.command.get(event.command_name)
+            key = (event.command_name, collection if isinstance(collection, str) else None)
+            for counter in counters:
+                counter[key] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    @contextmanager
+    def count_queries(self):
+        """Yields a Counter of (command name, collection) -> commands run inside the block."""
+        counter = Counter()
+        if not hasattr(self._local, 'counters'):
+            self._local.counters = []
+        self._local.counters.append(counter)
+        try:
+            yield counter
+        finally:
+            self._local.counters.remove(counter)
+
+    @contextmanager
+    def assert_max_queries(self, per_collection=1, commands=('find', 'aggregate'), collections=None):
+        """
+        Fail if any collection (of collections, if given) sees more than
+        per_collection of the given commands inside the block.
+        """
+        with self.count_queries() as counter:
+            yield counter
+        per = Counter()
+        for (command, collection), count in counter.items():
+            if command in commands and (collections is None or collection in collections):
+                per[collection] += count
+        over = {collection: count for collection, count in per.items() if count > per_collection}
+        if over:
+            raise AssertionError(f"More than {per_collection} queries per collection: {over}")
+
+
+query_counter = QueryCounter()
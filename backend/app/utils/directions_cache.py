@@ -0,0 +1,216 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+import requests
+
+from .cache import TieredCache
+from .circuit_breaker import CircuitBreaker
+from .distance_utils import calculate_haversine_distance, calculate_eta, quantize_coordinates
+from .route_utils import encode_polyline
+
+# Road distance is typically ~1.3x the straight line in Bengaluru
+ESTIMATE_ROAD_FACTOR = 1.3
+
+# Provider statuses that describe the route itself and are safe to cache
+CACHEABLE_STATUSES = ('OK', 'ZERO_RESULTS', 'NOT_FOUND')
+
+REQUEST_PARAMS = {
+    'mode': 'driving',
+    'alternatives': 'false',
+    'optimize': 'true'
+}
+
+
+def estimate_directions(origin, destination):
+    """
+    Straight-line stand-in for a Directions route, used when the provider is
+    unavailable: haversine distance scaled to road distance, the usual ETA and
+    a two-point polyline so the map can still draw something.
+    """
+    origin_coords = [float(origin['lng']), float(origin['lat'])]
+    destination_coords = [float(destination['lng']), float(destination['lat'])]
+    distance_km = calculate_haversine_distance(origin_coords, destination_coords) * ESTIMATE_ROAD_FACTOR
+    return {
+        'distance_m': distance_km * 1000,
+        'duration_s': calculate_eta(distance_km) * 60,
+        'start_address': '',
+        'end_address': '',
+        'polyline': encode_polyline([origin_coords, destination_coords])
+    }
+
+
+class DirectionsCache:
+    """
+    Directions lookups cached by quantized origin/destination and, optionally,
+    time-of-day bucket, in memory and on disk.
+
+    Entries younger than DIRECTIONS_CACHE_FRESH_SECONDS are served as-is.
+    Older ones are still served immediately while a background refresh runs
+    (stale-while-revalidate). Refreshes for the same key are coalesced. On a
+    miss the caller waits at most DIRECTIONS_FALLBACK_AFTER_SECONDS for Google
+    and otherwise gets a fallback while the fetch finishes in the background.
+    A circuit breaker skips the provider entirely after repeated failures or
+    slow calls.
+    """
+
+    def __init__(self, maps_client):
+        self.maps_client = maps_client
+        self.cache = TieredCache('directions', 'DIRECTIONS_CACHE',
+                                 max_entries=20000, ttl_seconds=30 * 24 * 60 * 60)
+        self.breaker = CircuitBreaker()
+        self.grid_deg = 0.001
+        self.fresh_seconds = 24 * 60 * 60
+        self.time_bucket_minutes = 0
+        self.fallback_after_seconds = 3.0
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = {}  # cache key -> Future
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "fetched": 0, "fallbacks": 0, "refreshes": 0}
+
+    def init_app(self, app):
+        self.cache.init_app(app)
+        self.grid_deg = app.config.get('DIRECTIONS_CACHE_GRID_DEG', self.grid_deg)
+        self.fresh_seconds = app.config.get('DIRECTIONS_CACHE_FRESH_SECONDS', self.fresh_seconds)
+        self.time_bucket_minutes = app.config.get('DIRECTIONS_CACHE_TIME_BUCKET_MINUTES', self.time_bucket_minutes)
+        self.fallback_after_seconds = app.config.get('DIRECTIONS_FALLBACK_AFTER_SECONDS', self.fallback_after_seconds)
+        self.breaker = CircuitBreaker(
+            failure_threshold=app.config.get('DIRECTIONS_BREAKER_FAILURES', 5),
+            reset_seconds=app.config.get('DIRECTIONS_BREAKER_RESET_SECONDS', 30),
+            slow_call_seconds=app.config.get('DIRECTIONS_SLOW_CALL_SECONDS', self.fallback_after_seconds)
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('DIRECTIONS_MAX_WORKERS', 4),
+            thread_name_prefix='directions'
+        )
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _location(self, location):
+        """(cache key, API parameter) for a {lat, lng} dict or a free-text address."""
+        if isinstance(location, dict):
+            lat, lng = quantize_coordinates(float(location['lat']), float(location['lng']), self.grid_deg)
+            return f"{lat},{lng}", f"{lat},{lng}"
+        text = str(location).strip()
+        return text.lower(), text
+
+    def _key(self, origin_key, destination_key):
+        key = f"{origin_key}|{destination_key}"
+        if self.time_bucket_minutes:
+            now = datetime.now()
+            key += f"|t{(now.hour * 60 + now.minute) // self.time_bucket_minutes}"
+        return key
+
+    # -------------------------
+    # Provider calls
+    # -------------------------
+
+    def _fetch(self, key, origin_param, destination_param):
+        """One provider call. Caches and returns the entry, or None on failure."""
+        started = time.monotonic()
+        entry = None
+        try:
+            response = self.maps_client.get('directions', dict(
+                REQUEST_PARAMS, origin=origin_param, destination=destination_param
+            ))
+            data = response.json() if response.status_code == 200 else {}
+            status = data.get('status')
+            if status in CACHEABLE_STATUSES:
+                entry = {"fetched_at": time.time(), "route": None}
+                if status == 'OK' and data.get('routes'):
+                    route = data['routes'][0]
+                    leg = route['legs'][0]
+                    entry["route"] = {
+                        'distance': leg['distance']['text'],
+                        'distance_value': leg['distance']['value'],  # in meters
+                        'duration': leg['duration']['text'],
+                        'duration_value': leg['duration']['value'],  # in seconds
+                        'start_address': leg['start_address'],
+                        'end_address': leg['end_address'],
+                        'polyline': route['overview_polyline']['points']
+                    }
+                # Cached before leaving the in-flight table, so no caller sees neither
+                self.cache.set(key, entry)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Warning: directions fetch failed: {e}")
+        finally:
+            self.breaker.record(entry is not None, time.monotonic() - started)
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+        if entry is not None:
+            self._count("fetched")
+        return entry
+
+    def _submit(self, key, origin_param, destination_param):
+        """Start (or join) the background provider call for key. Returns its Future, or None without a thread pool."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            if self._executor is None:
+                future = None
+            else:
+                future = self._executor.submit(self._fetch, key, origin_param, destination_param)
+                self._in_flight[key] = future
+        return future
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def get(self, origin, destination):
+        """
+        Directions between two {lat, lng} dicts or addresses.
+
+        Returns:
+            (entry, source): entry is a dict with "route" (None when the provider
+            found no route), source is one of "cache", "stale" or "google";
+            or (None, None) when the provider is unavailable and nothing is cached
+        """
+        origin_key, origin_param = self._location(origin)
+        destination_key, destination_param = self._location(destination)
+        key = self._key(origin_key, destination_key)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            if time.time() - entry["fetched_at"] < self.fresh_seconds:
+                self._count("fresh_hits")
+                return entry, "cache"
+
+            # Serve the stale route now and refresh it for the next caller
+            self._count("stale_hits")
+            if self._executor is not None and key not in self._in_flight and self.breaker.allow():
+                self._count("refreshes")
+                self._submit(key, origin_param, destination_param)
+            return entry, "stale"
+
+        with self._lock:
+            future = self._in_flight.get(key)
+        if future is None and self.breaker.allow():
+            future = self._submit(key, origin_param, destination_param)
+            if future is None:
+                entry = self._fetch(key, origin_param, destination_param)
+
+        if future is not None:
+            try:
+                entry = future.result(timeout=self.fallback_after_seconds)
+            except FutureTimeoutError:
+                # Keeps running and fills the cache for the next request
+                entry = None
+
+        if entry is None:
+            self._count("fallbacks")
+            return None, None
+        return entry, "google"
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+        stats["cache"] = self.cache.stats()
+        stats["breaker"] = self.breaker.stats()
+        return stats
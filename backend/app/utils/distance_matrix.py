@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .cache import TieredCache
+from .distance_utils import quantize_coordinates
+
+# Google Distance Matrix limits per request
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+
+# Element statuses that are a property of the route itself and safe to cache
+CACHEABLE_STATUSES = ('OK', 'ZERO_RESULTS')
+
+REQUEST_PARAMS = {
+    'mode': 'driving',
+    'units': 'metric',
+    'avoid': 'tolls'
+}
+
+
+class CachedDistanceMatrix:
+    """
+    Distance Matrix lookups cached per origin/destination cell.
+
+    Coordinates are quantized to DISTANCE_MATRIX_CACHE_GRID_DEG, so every cell
+    of a requested grid is looked up on its own and only the missing cells are
+    fetched. Missing cells are grouped into rectangles, split to the provider's
+    per-request limits, fetched concurrently on a thread pool and reassembled
+    into Google's response shape.
+    """
+
+    def __init__(self, maps_client):
+        self.maps_client = maps_client
+        self.cache = TieredCache('distance_matrix', 'DISTANCE_MATRIX_CACHE',
+                                 max_entries=50000, ttl_seconds=7 * 24 * 60 * 60)
+        self.grid_deg = 0.001
+        self.max_elements = 100
+        self._executor = None
+
+    def init_app(self, app):
+        self.cache.init_app(app)
+        self.grid_deg = app.config.get('DISTANCE_MATRIX_CACHE_GRID_DEG', self.grid_deg)
+        self.max_elements = app.config.get('DISTANCE_MATRIX_MAX_ELEMENTS', self.max_elements)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('DISTANCE_MATRIX_MAX_WORKERS', 4),
+            thread_name_prefix='distance-matrix'
+        )
+
+    def _location(self, location):
+        """(cache key, API parameter) for a {lat, lng} dict or a free-text address."""
+        if isinstance(location, dict):
+            lat, lng = quantize_coordinates(float(location['lat']), float(location['lng']), self.grid_deg)
+            return f"{lat},{lng}", f"{lat},{lng}"
+        text = str(location).strip()
+        return text.lower(), text
+
+    # -------------------------
+    # Chunking
+    # -------------------------
+
+    def _plan_chunks(self, missing):
+        """
+        Split missing cells into provider-sized (origin indices, destination indices) blocks.
+        Origins missing the same destinations are grouped, so each block is exactly missing cells.
+        """
+        groups = {}
+        for origin, destinations in missing.items():
+            groups.setdefault(tuple(destinations), []).append(origin)
+
+        chunks = []
+        for destinations, origins in groups.items():
+            destination_step = min(len(destinations), MAX_DESTINATIONS, self.max_elements)
+            origin_step = max(1, min(MAX_ORIGINS, self.max_elements // destination_step))
+            for d in range(0, len(destinations), destination_step):
+                for o in range(0, len(origins), origin_step):
+                    chunks.append((origins[o:o + origin_step], list(destinations[d:d + destination_step])))
+        return chunks
+
+    def _fetch_chunk(self, origin_params, destination_params):
+        """One provider call. Returns the parsed response, or None on failure."""
+        params = dict(REQUEST_PARAMS, origins='|'.join(origin_params), destinations='|'.join(destination_params))
+        try:
+            response = self.maps_client.get('distance_matrix', params)
+        except requests.RequestException as e:
+            print(f"Warning: distance matrix chunk failed: {e}")
+            return None
+
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        return data if data.get('status') == 'OK' else None
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def get(self, origins, destinations):
+        """
+        Distance Matrix for origins x destinations, in Google's response shape.
+
+        Returns:
+            (response dict, number of cells fetched from the provider), or
+            (None, 0) when every provider call failed
+        """
+        origin_locations = [self._location(origin) for origin in origins]
+        destination_locations = [self._location(destination) for destination in destinations]
+
+        cells = {}
+        missing = {}  # origin index -> destination indices
+        for i, (origin_key, _) in enumerate(origin_locations):
+            for j, (destination_key, _) in enumerate(destination_locations):
+                cached = self.cache.get(f"{origin_key}|{destination_key}")
+                if cached is not None:
+                    cells[i, j] = cached
+                else:
+                    missing.setdefault(i, []).append(j)
+
+        chunks = self._plan_chunks(missing)
+        fetched = 0
+        if chunks:
+            results = list(self._map(
+                lambda chunk: self._fetch_chunk(
+                    [origin_locations[i][1] for i in chunk[0]],
+                    [destination_locations[j][1] for j in chunk[1]]
+                ),
+                chunks
+            ))
+            if all(result is None for result in results):
+                return None, 0
+
+            for (chunk_origins, chunk_destinations), result in zip(chunks, results):
+                if result is None:
+                    continue
+                for row, i, origin_address in zip(result['rows'], chunk_origins, result['origin_addresses']):
+                    for element, j, destination_address in zip(
+                            row['elements'], chunk_destinations, result['destination_addresses']):
+                        cell = {
+                            "element": element,
+                            "origin_address": origin_address,
+                            "destination_address": destination_address
+                        }
+                        cells[i, j] = cell
+                        fetched += 1
+                        if element.get('status') in CACHEABLE_STATUSES:
+                            self.cache.set(f"{origin_locations[i][0]}|{destination_locations[j][0]}", cell)
+
+        return self._assemble(cells, len(origins), len(destinations)), fetched
+
+    def _map(self, function, items):
+        if self._executor is None or len(items) == 1:
+            return map(function, items)
+        return self._executor.map(function, items)
+
+    @staticmethod
+    def _assemble(cells, origin_count, destination_count):
+        origin_addresses = [''] * origin_count
+        destination_addresses = [''] * destination_count
+        rows = []
+        for i in range(origin_count):
+            elements = []
+            for j in range(destination_count):
+                cell = cells.get((i, j))
+                if cell is None:
+                    elements.append({"status": "UNKNOWN_ERROR"})
+                    continue
+                elements.append(cell['element'])
+                origin_addresses[i] = origin_addresses[i] or cell['origin_address']
+                destination_addresses[j] = destination_addresses[j] or cell['destination_address']
+            rows.append({"elements": elements})
+
+        return {
+            "status": "OK",
+            "origin_addresses": origin_addresses,
+            "destination_addresses": destination_addresses,
+            "rows": rows
+        }
@@ -1,5 +1,10 @@
 import math
 
+import numpy as np
+
+# Radius of Earth in kilometers
+EARTH_RADIUS_KM = 6371.0
+
 def calculate_haversine_distance(coords1, coords2):
     """
     Calculate the great circle distance between two points on Earth using the Haversine formula.
@@ -23,12 +28,27 @@ def calculate_haversine_distance(coords1, coords2):
     a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
     c = 2 * math.asin(math.sqrt(a))
     
-    # Radius of Earth in kilometers
-    earth_radius_km = 6371.0
-    
-    distance = earth_radius_km * c
+    distance = EARTH_RADIUS_KM * c
     return distance
 
+def quantize_coordinates(lat, lng, grid_deg):
+    """
+    Snap a point to the centre of its grid cell, so nearby lookups share one cache key.
+    A grid of 0.0005 degrees is roughly 55 m at Bengaluru's latitude.
+    
+    Args:
+        lat: Latitude in degrees
+        lng: Longitude in degrees
+        grid_deg: Grid cell size in degrees
+    
+    Returns:
+        (latitude, longitude) tuple of the cell centre
+    """
+    precision = max(0, -math.floor(math.log10(grid_deg)) + 1)
+    snapped_lat = (math.floor(lat / grid_deg) + 0.5) * grid_deg
+    snapped_lng = (math.floor(lng / grid_deg) + 0.5) * grid_deg
+    return round(snapped_lat, precision), round(snapped_lng, precision)
+
 def calculate_smart_score(distance_meters, driver_rating, max_distance_m=15000):
     """
     Calculate the Smart Match Score (0-100) combining distance and driver rating.
@@ -66,6 +86,67 @@ def calculate_smart_score(distance_meters, driver_rating, max_distance_m=15000):
     total_score = distance_score + rating_score
     return min(100, max(0, round(total_score)))
 
+def calculate_haversine_distances_batch(coords1, coords2):
+    """
+    Vectorized Haversine distance for many coordinate pairs at once.
+    Either side may be a single [longitude, latitude] pair, which is broadcast
+    against the other.
+    
+    Args:
+        coords1: Array-like of shape (N, 2) or (2,) with [longitude, latitude] rows
+        coords2: Array-like of shape (N, 2) or (2,) with [longitude, latitude] rows
+    
+    Returns:
+        NumPy array of distances in kilometers (empty if either side has no rows)
+    """
+    points1 = np.radians(np.asarray(coords1, dtype=float))
+    points2 = np.radians(np.asarray(coords2, dtype=float))
+    
+    # An empty list arrives as shape (0,); give it the (0, 2) shape of "no rows"
+    if points1.size == 0:
+        points1 = points1.reshape(0, 2)
+    if points2.size == 0:
+        points2 = points2.reshape(0, 2)
+    
+    lon1, lat1 = points1[..., 0], points1[..., 1]
+    lon2, lat2 = points2[..., 0], points2[..., 1]
+    
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    
+    return EARTH_RADIUS_KM * c
+
+def calculate_smart_scores_batch(distances_meters, driver_ratings, max_distance_m=15000):
+    """
+    Vectorized version of calculate_smart_score for scoring every candidate in one call.
+    
+    Args:
+        distances_meters: Array-like of distances to drivers in meters
+        driver_ratings: Array-like of drivers' average ratings (0-5)
+        max_distance_m: Maximum search distance in meters
+    
+    Returns:
+        NumPy integer array of smart scores (0-100)
+    """
+    distances = np.asarray(distances_meters, dtype=float)
+    ratings = np.asarray(driver_ratings, dtype=float)
+    
+    distance_ratio = np.minimum(distances / max_distance_m, 1.0)
+    distance_score = 60 * (1 - distance_ratio) * (2 - distance_ratio)
+    
+    # Same rating bands as calculate_smart_score
+    rating_score = np.select(
+        [ratings >= 4.5, ratings >= 4.0, ratings >= 3.0],
+        [40.0, 35 + (ratings - 4.0) * 10, 20 + (ratings - 3.0) * 15],
+        default=np.maximum(0, ratings * 6.67)
+    )
+    
+    total_score = np.rint(distance_score + rating_score)
+    return np.clip(total_score, 0, 100).astype(int)
+
 def calculate_cost_sharing_fare(distance_km):
     """
     Calculate cost-effective fare for ride sharing.
@@ -108,6 +189,54 @@ def calculate_cost_sharing_fare(distance_km):
     
     return max(base_fare, int(final_fare))
 
+def calculate_cost_sharing_fares_batch(distances_km):
+    """
+    Vectorized version of calculate_cost_sharing_fare.
+    
+    Args:
+        distances_km: Array-like of distances in kilometers
+    
+    Returns:
+        NumPy integer array of fares in rupees
+    """
+    base_fare = 15
+    max_fare = 150
+    distances = np.asarray(distances_km, dtype=float)
+    
+    # Same sliding rate structure as the scalar version
+    rate = np.select([distances <= 5, distances <= 15], [8, 6], default=5)
+    total_fare = np.minimum(base_fare + distances * rate, max_fare)
+    
+    fares = np.maximum(base_fare, np.trunc(total_fare))
+    return np.where(distances <= 0, base_fare, fares).astype(int)
+
+def calculate_prebook_scores_batch(distances_meters, hours_until, rider_ratings):
+    """
+    Score pre-booking requests for a driver in one call.
+    
+    Formula (capped at 100):
+    - Distance component: 100 points minus 5 per km to the rider
+    - Time component (0-50 points): 2 points per hour until the ride
+    - Rating component: 10 points per rating star
+    
+    Args:
+        distances_meters: Array-like of distances to riders in meters
+        hours_until: Array-like of whole hours until each requested ride
+        rider_ratings: Array-like of riders' average ratings (0-5)
+    
+    Returns:
+        NumPy integer array of smart scores
+    """
+    distances = np.asarray(distances_meters, dtype=float)
+    hours = np.asarray(hours_until, dtype=float)
+    ratings = np.asarray(rider_ratings, dtype=float)
+    
+    distance_score = np.maximum(0, 100 - (distances / 1000) * 5)
+    time_score = np.clip(hours * 2, 0, 50)
+    rating_score = ratings * 10
+    
+    return np.rint(np.minimum(100, distance_score + time_score + rating_score)).astype(int)
+
 def calculate_fuel_cost_estimate(distance_km, fuel_efficiency_kmpl=40, fuel_price_per_liter=100):
     """
     Calculate actual fuel cost for transparency in cost-sharing.
@@ -232,18 +361,23 @@ def get_popular_destinations():
         }
     ]
 
-def calculate_eta(distance_km, traffic_factor=1.2, avg_speed_kmh=25):
+def calculate_eta(distance_km, traffic_factor=1.2, avg_speed_kmh=25, duration_s=None):
     """
     Calculate estimated time of arrival based on distance and traffic.
+    A known road duration (e.g. from the landmark matrix) is used as-is instead.
     
     Args:
         distance_km: Distance in kilometers
         traffic_factor: Traffic multiplier (1.0 = no traffic, 1.5 = heavy traffic)
         avg_speed_kmh: Average speed in km/h in city traffic
+        duration_s: Optional road duration in seconds for the trip
     
     Returns:
         ETA in minutes
     """
+    if duration_s is not None:
+        return max(5, round(duration_s / 60))
+    
     # Adjust speed based on traffic
     effective_speed = avg_speed_kmh / traffic_factor
     
@@ -284,4 +418,34 @@ def get_route_efficiency_score(pickup_coords, destination_coords, driver_pickup,
     else:
         efficiency_score = 50  # Default score
     
-    return round(efficiency_score)
\ No newline at end of file
+    return round(efficiency_score)
+
+def calculate_route_detours_batch(pickup_coords, destination_coords, driver_starts, driver_destinations):
+    """
+    Vectorized detour cost and get_route_efficiency_score for one rider against many drivers.
+    
+    Args:
+        pickup_coords: Rider's pickup [longitude, latitude]
+        destination_coords: Rider's destination [longitude, latitude]
+        driver_starts: Array-like (N, 2) of each driver's current or starting point
+        driver_destinations: Array-like (N, 2) of each driver's destination
+    
+    Returns:
+        (detour_km, efficiency_scores): extra kilometres each driver would drive to
+        carry the rider, and NumPy integer array of efficiency scores (0-100)
+    """
+    driver_direct_distance = calculate_haversine_distances_batch(driver_starts, driver_destinations)
+    
+    total_with_rider = (
+        calculate_haversine_distances_batch(driver_starts, pickup_coords)
+        + calculate_haversine_distance(pickup_coords, destination_coords)
+        + calculate_haversine_distances_batch(destination_coords, driver_destinations)
+    )
+    
+    detour_km = np.maximum(0, total_with_rider - driver_direct_distance)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efficiency_score = np.minimum(100, driver_direct_distance / total_with_rider * 100)
+    efficiency_score = np.where(driver_direct_distance > 0, efficiency_score, 50)
+    
+    return detour_km, np.rint(efficiency_score).astype(int)
@@ -0,0 +1,80 @@
+import queue
+import threading
+
+from .json_provider import dumps_bytes
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe hub for pushing ride events to connected users.
+
+    Each open Server-Sent Events connection gets its own bounded queue; a user
+    with several tabs open has several subscriptions. Events published for a
+    user with no open connection are simply dropped - clients re-read current
+    state over the REST endpoints when they (re)connect.
+    """
+
+    def __init__(self, max_queue_size=100, heartbeat_seconds=15):
+        self.max_queue_size = max_queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> list of queues
+
+    def init_app(self, app):
+        self.max_queue_size = app.config.get('SSE_MAX_QUEUE_SIZE', self.max_queue_size)
+        self.heartbeat_seconds = app.config.get('SSE_HEARTBEAT_SECONDS', self.heartbeat_seconds)
+
+    def subscribe(self, user_id):
+        subscription = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(str(user_id), []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(str(user_id), [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscribers.pop(str(user_id), None)
+
+    def publish(self, user_id, event_type, data):
+        """
+        Send an event to every open connection of a user.
+
+        Args:
+            user_id: Recipient user ID (str or ObjectId)
+            event_type: SSE event name, e.g. "status"
+            data: JSON-serializable payload
+        """
+        with self._lock:
+            subscriptions = list(self._subscribers.get(str(user_id), []))
+
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait((event_type, data))
+            except queue.Full:
+                # Slow or stalled client - drop rather than block the request thread
+                print(f"Warning: event queue full for user {user_id}, dropping {event_type} event")
+
+    def stream(self, user_id):
+        """
+        Generator yielding SSE-formatted messages for a user until the client disconnects.
+        Sends a comment line every heartbeat_seconds to keep proxies from closing the connection.
+        """
+        subscription = self.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event_type, data = subscription.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event_type}\ndata: {dumps_bytes(data).decode('utf-8')}\n\n"
+        finally:
+            self.unsubscribe(user_id, subscription)
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
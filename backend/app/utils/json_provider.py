@@ -0,0 +1,74 @@
+import dataclasses
+import uuid
+from decimal import Decimal
+
+import orjson
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+# Numpy scalars and arrays (from the vectorized scoring helpers) serialize natively;
+# int, float, datetime, UUID and enum dict keys are converted to strings
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value):
+    """Types orjson does not handle on its own."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stringify_keys(value):
+    """Copy of value with ObjectId dict keys (which orjson rejects) turned into strings."""
+    if isinstance(value, dict):
+        return {
+            str(key) if isinstance(key, ObjectId) else key: _stringify_keys(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_stringify_keys(item) for item in value]
+    return value
+
+
+def dumps_bytes(obj):
+    """Serialize obj to JSON bytes with the app's encoder (ObjectId, datetime, Decimal aware)."""
+    try:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        # orjson never passes dict keys through default, so ObjectId keys fail;
+        # only then pay for a copy with the keys converted
+        return orjson.dumps(_stringify_keys(obj), default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider built on orjson, used by jsonify and request.get_json.
+
+    MongoDB documents can be returned as-is: ObjectId becomes its hex string
+    (also when used as a dict key), datetime an ISO 8601 string (the same text
+    as datetime.isoformat() for the naive UTC values stored here) and Decimal
+    a number.
+    """
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # orjson already produces bytes; skip the str round trip of the base class
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -1,9 +1,11 @@
 import jwt
 import datetime
+import secrets
 from flask import current_app
 from functools import wraps
 from flask import request, jsonify
 from bson.objectid import ObjectId
+from .. import token_cache, revocations
 
 def generate_jwt_token(user_id, email, role):
     """
@@ -13,6 +15,7 @@ def generate_jwt_token(user_id, email, role):
         'user_id': str(user_id),
         'email': email,
         'role': role,
+        'jti': secrets.token_hex(16),  # Token ID, used to revoke it on logout
         'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24),  # Token expires in 24 hours
         'iat': datetime.datetime.utcnow()  # Issued at
     }
@@ -32,10 +35,33 @@ def verify_jwt_token(token):
     except jwt.InvalidTokenError:
         return None
 
-def token_required(f):
+def authenticate_token(token):
     """
-    Decorator to require JWT token for protected routes
+    The current_user dict for a valid, unrevoked token, or None.
+    Recently verified tokens are answered from the in-memory cache.
     """
+    cached = token_cache.get(token)
+    if cached is not None:
+        jti, current_user = cached
+    else:
+        payload = verify_jwt_token(token)
+        if payload is None:
+            return None
+        
+        jti = payload.get('jti')
+        current_user = {
+            'user_id': payload['user_id'],
+            'email': payload['email'],
+            'role': payload['role']
+        }
+        token_cache.put(token, payload['exp'], jti, current_user)
+    
+    # In-memory set lookup; tokens issued before jti existed cannot be revoked
+    if jti is not None and revocations.is_revoked(jti):
+        return None
+    return current_user
+
+def _require_token(f, allow_query_token):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -48,20 +74,20 @@ def token_required(f):
             except IndexError:
                 return jsonify({'error': 'Invalid token format'}), 401
         
+        if not token and allow_query_token:
+            token = request.args.get('token')
+        
         if not token:
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
-            payload = verify_jwt_token(token)
-            if payload is None:
+            current_user = authenticate_token(token)
+            if current_user is None:
                 return jsonify({'error': 'Token is invalid or expired'}), 401
             
             # Add user info to request context
-            request.current_user = {
-                'user_id': payload['user_id'],
-                'email': payload['email'],
-                'role': payload['role']
-            }
+            request.current_user = current_user
+            request.auth_token = token
             
         except Exception as e:
             return jsonify({'error': 'Token verification failed'}), 401
@@ -70,6 +96,20 @@ def token_required(f):
     
     return decorated
 
+def token_required(f):
+    """
+    Decorator to require JWT token for protected routes
+    """
+    return _require_token(f, allow_query_token=False)
+
+def stream_token_required(f):
+    """
+    token_required for EventSource streams, which cannot send headers:
+    the token may also be passed as ?token=. Use only on streaming routes,
+    since URLs end up in access logs.
+    """
+    return _require_token(f, allow_query_token=True)
+
 def role_required(required_role):
     """
     Decorator to require specific role for routes.
@@ -0,0 +1,233 @@
+import json
+import math
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .distance_utils import (
+    calculate_haversine_distance, calculate_haversine_distances_batch,
+    get_college_coordinates, get_popular_destinations
+)
+from .spatial_index import KM_PER_DEGREE
+
+# File layout (little-endian), each array starting on an 8-byte boundary:
+#   header: magic, version, landmark count L, node count N, flags (version 2 on)
+#   node coordinates      float64 (N, 2)   landmarks first, then zone centres
+#   from-landmark         float32 (L, N)   distance m, then duration s (NaN = unknown)
+#   to-landmark           float32 (N, L)   distance m, then duration s
+#   route offsets         uint32  (L*N + N*L + 1) into the route blob
+#   route blob            JSON {"polyline", "start_address", "end_address"} per pair
+MAGIC = b'LMX1'
+VERSION = 2
+HEADERS = {1: struct.Struct('<4sHHI'), 2: struct.Struct('<4sHHIH')}
+PREFIX = struct.Struct('<4sH')
+
+# Header flags
+FLAG_ESTIMATED = 1  # Distances and durations are offline estimates, not road data
+
+
+def build_matrix_nodes(grid_deg, radius_km):
+    """
+    Matrix nodes: the popular destinations, then the centres of a square grid
+    of zones within radius_km of campus.
+
+    Returns:
+        (list of [longitude, latitude], number of landmarks)
+    """
+    landmarks = [place['coordinates'] for place in get_popular_destinations()]
+    campus_lng, campus_lat = get_college_coordinates()
+
+    steps = int(math.ceil(radius_km / (grid_deg * KM_PER_DEGREE)))
+    zones = []
+    for row in range(-steps, steps + 1):
+        for col in range(-steps, steps + 1):
+            zone = [round(campus_lng + col * grid_deg, 6), round(campus_lat + row * grid_deg, 6)]
+            if calculate_haversine_distance(zone, [campus_lng, campus_lat]) <= radius_km:
+                zones.append(zone)
+
+    return landmarks + zones, len(landmarks)
+
+
+def _align(buffer):
+    buffer.extend(b'\0' * (-len(buffer) % 8))
+
+
+def write_landmark_matrix(path, nodes, landmark_count, routes, estimated=False):
+    """
+    Write a matrix file.
+
+    Args:
+        path: Output file
+        nodes: List of [longitude, latitude] (landmarks first)
+        landmark_count: Number of landmark nodes at the start of nodes
+        routes: Dict mapping (origin node, destination node) - where at least
+                one side is a landmark - to a dict with distance_m, duration_s
+                and optional polyline/start_address/end_address
+        estimated: Whether routes are offline estimates rather than road data
+    """
+    node_count = len(nodes)
+    from_landmark = np.full((2, landmark_count, node_count), np.nan, dtype='<f4')
+    to_landmark = np.full((2, node_count, landmark_count), np.nan, dtype='<f4')
+    payloads = [b''] * (2 * landmark_count * node_count)
+
+    for (origin, destination), route in routes.items():
+        if origin < landmark_count:
+            from_landmark[:, origin, destination] = (route['distance_m'], route['duration_s'])
+            slot = origin * node_count + destination
+        elif destination < landmark_count:
+            to_landmark[:, origin, destination] = (route['distance_m'], route['duration_s'])
+            slot = landmark_count * node_count + origin * landmark_count + destination
+        else:
+            continue
+
+        details = {key: route[key] for key in ('polyline', 'start_address', 'end_address') if route.get(key)}
+        if details:
+            payloads[slot] = json.dumps(details, separators=(',', ':')).encode('utf-8')
+
+    offsets = np.zeros(len(payloads) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(payload) for payload in payloads])
+
+    flags = FLAG_ESTIMATED if estimated else 0
+    buffer = bytearray(HEADERS[VERSION].pack(MAGIC, VERSION, landmark_count, node_count, flags))
+    for array in (np.asarray(nodes, dtype='<f8'), from_landmark, to_landmark, offsets):
+        _align(buffer)
+        buffer.extend(array.tobytes())
+    buffer.extend(b''.join(payloads))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(buffer)
+    os.replace(temp_path, path)
+
+
+class LandmarkMatrix:
+    """
+    Read-only, memory-mapped matrix of road distance, duration and route
+    polyline between popular destinations and a zone grid around campus.
+
+    A lookup snaps both ends to the nearest node (within LANDMARK_SNAP_RADIUS_KM)
+    and answers when one of them is a landmark, so fares, ETAs and directions
+    for common trips never reach Google. The file is built offline by
+    build_landmark_matrix.py; when it is missing every lookup misses. A matrix
+    built with --estimate is flagged as such, and its lookups report source
+    "estimated" instead of "road".
+    """
+
+    def __init__(self, snap_radius_km=0.5):
+        self.snap_radius_km = snap_radius_km
+        self._mmap = None
+        self.nodes = None
+        self.landmark_count = 0
+        self.estimated = False
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.snap_radius_km = app.config.get('LANDMARK_SNAP_RADIUS_KM', self.snap_radius_km)
+        path = app.config.get('LANDMARK_MATRIX_PATH')
+        if path and os.path.exists(path):
+            try:
+                self.open(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not load landmark matrix {path}: {e}")
+
+    def open(self, path):
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = PREFIX.unpack_from(data, 0)
+        if magic != MAGIC or version not in HEADERS:
+            data.close()
+            raise ValueError("not a landmark matrix file")
+
+        header = HEADERS[version]
+        landmark_count, node_count, *flags = header.unpack_from(data, 0)[2:]
+        flags = flags[0] if flags else 0
+        position = header.size
+
+        def take(dtype, shape):
+            nonlocal position
+            position += -position % 8
+            array = np.frombuffer(data, dtype=dtype, count=int(np.prod(shape)), offset=position).reshape(shape)
+            position += array.nbytes
+            return array
+
+        self.nodes = take('<f8', (node_count, 2))
+        self._from_landmark = take('<f4', (2, landmark_count, node_count))
+        self._to_landmark = take('<f4', (2, node_count, landmark_count))
+        self._offsets = take('<u4', (2 * landmark_count * node_count + 1,))
+        self._blob_start = position
+        self.landmark_count = landmark_count
+        self.estimated = bool(flags & FLAG_ESTIMATED)
+        self._mmap = data
+
+    @property
+    def loaded(self):
+        return self._mmap is not None
+
+    @property
+    def source(self):
+        """What the stored distances are: "road" data or "estimated" ones"""
+        return "estimated" if self.estimated else "road"
+
+    def _nearest_node(self, coords):
+        distances = calculate_haversine_distances_batch(self.nodes, coords)
+        # A landmark within reach wins over a closer zone centre, since only landmark pairs are stored
+        landmark = int(np.argmin(distances[:self.landmark_count])) if self.landmark_count else None
+        if landmark is not None and distances[landmark] <= self.snap_radius_km:
+            return landmark
+        node = int(np.argmin(distances))
+        return node if distances[node] <= self.snap_radius_km else None
+
+    def lookup(self, origin, destination, with_route=False):
+        """
+        Road distance and duration between two [longitude, latitude] points.
+
+        Returns:
+            Dict with distance_m, duration_s and source ("road" or "estimated"),
+            plus polyline, start_address and end_address when with_route is
+            set and known; None on a miss
+        """
+        if not self.loaded:
+            return None
+
+        origin_node = self._nearest_node(origin)
+        destination_node = self._nearest_node(destination) if origin_node is not None else None
+
+        result = None
+        if destination_node is not None:
+            if origin_node < self.landmark_count:
+                values = self._from_landmark[:, origin_node, destination_node]
+                slot = origin_node * len(self.nodes) + destination_node
+            elif destination_node < self.landmark_count:
+                values = self._to_landmark[:, origin_node, destination_node]
+                slot = self.landmark_count * len(self.nodes) + origin_node * self.landmark_count + destination_node
+            else:
+                values = None
+
+            if values is not None and not np.isnan(values).any():
+                result = {"distance_m": float(values[0]), "duration_s": float(values[1]), "source": self.source}
+                if with_route:
+                    start, end = int(self._offsets[slot]), int(self._offsets[slot + 1])
+                    if end > start:
+                        result.update(json.loads(self._mmap[self._blob_start + start:self._blob_start + end]))
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "loaded": self.loaded,
+            "source": self.source,
+            "nodes": len(self.nodes) if self.loaded else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+        }
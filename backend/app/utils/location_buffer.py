@@ -0,0 +1,116 @@
+import atexit
+import datetime
+import threading
+
+
+class LocationWriteBuffer:
+    """
+    Write-behind buffer for driver GPS pings.
+
+    Every ping replaces the driver's entry in an in-memory latest-location
+    store, which answers reads immediately. A background thread flushes the
+    drivers that moved since the last flush in one batch, so database writes
+    scale with drivers per flush window rather than with pings. Pending
+    positions are also flushed when the process exits.
+    """
+
+    def __init__(self, flush_interval_seconds=5):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._writer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._latest = {}   # driver_id -> (coordinates, updated_at)
+        self._pending = {}  # driver_id -> (coordinates, updated_at) not yet written
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app, writer):
+        """
+        Args:
+            app: The Flask app (reads LOCATION_FLUSH_INTERVAL_SECONDS)
+            writer: Callable taking a list of (driver_id, coordinates, updated_at)
+                    tuples and persisting them in one batch
+        """
+        self.flush_interval_seconds = app.config.get(
+            'LOCATION_FLUSH_INTERVAL_SECONDS', self.flush_interval_seconds
+        )
+        self._writer = writer
+        atexit.register(self.shutdown)
+
+    def _ensure_flusher(self):
+        # Started on first use so importing the app never spawns threads
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='location-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_seconds):
+            self.flush()
+
+    def record(self, driver_id, coordinates, updated_at):
+        """Store a driver's latest position; it is written to MongoDB on the next flush."""
+        entry = (coordinates, updated_at)
+        with self._lock:
+            self._latest[str(driver_id)] = entry
+            self._pending[str(driver_id)] = entry
+            self._ensure_flusher()
+
+    def get(self, driver_id):
+        """Return (coordinates, updated_at) for a driver's last known position, or None."""
+        with self._lock:
+            return self._latest.get(str(driver_id))
+
+    def get_recent(self, driver_id):
+        """
+        Like get, but only if the position is younger than one flush interval.
+
+        With several workers a driver's later pings may have gone to another
+        worker and been flushed from there; an entry this recent is at most
+        one flush behind them, an older one may be arbitrarily stale.
+        """
+        latest = self.get(driver_id)
+        if latest is None:
+            return None
+        age = datetime.datetime.utcnow() - latest[1]
+        return latest if age.total_seconds() < self.flush_interval_seconds else None
+
+    def forget(self, driver_id):
+        """Drop a driver that went offline (any pending position is still flushed)."""
+        with self._lock:
+            self._latest.pop(str(driver_id), None)
+
+    def flush(self):
+        """
+        Write all pending positions in one batch.
+
+        Returns:
+            Number of drivers written
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending or self._writer is None:
+                return 0
+
+            updates = [
+                (driver_id, coordinates, updated_at)
+                for driver_id, (coordinates, updated_at) in pending.items()
+            ]
+            try:
+                self._writer(updates)
+            except Exception as e:
+                print(f"Warning: failed to flush {len(updates)} driver locations: {e}")
+                # Put them back unless a newer ping arrived meanwhile
+                with self._lock:
+                    for driver_id, entry in pending.items():
+                        self._pending.setdefault(driver_id, entry)
+                return 0
+
+            return len(updates)
+
+    def shutdown(self):
+        self._stop.set()
+        self.flush()
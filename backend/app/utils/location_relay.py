@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .events import EventBroker
+
+
+class LocationRelay:
+    """
+    Relays live positions between the driver and rider of an accepted ride request.
+
+    Positions are fanned out through an in-process EventBroker keyed by
+    request ID, so the other party sees them as soon as they arrive. Writing
+    them to MongoDB is handed to a background worker and never blocks the relay.
+    """
+
+    def __init__(self):
+        self.broker = EventBroker()
+        self._lock = threading.Lock()
+        self._driver_channels = {}  # driver_id -> {request_id: open connection count}
+        self._executor = None
+
+    def init_app(self, app):
+        self.broker.init_app(app)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='location-writer')
+
+    # -------------------------
+    # Channel membership
+    # -------------------------
+
+    def join(self, request_id, driver_id):
+        """Open a connection on a ride request's channel. Returns its subscription queue."""
+        with self._lock:
+            channels = self._driver_channels.setdefault(str(driver_id), {})
+            channels[str(request_id)] = channels.get(str(request_id), 0) + 1
+        return self.broker.subscribe(request_id)
+
+    def leave(self, request_id, driver_id, subscription):
+        self.broker.unsubscribe(request_id, subscription)
+        with self._lock:
+            channels = self._driver_channels.get(str(driver_id), {})
+            remaining = channels.get(str(request_id), 0) - 1
+            if remaining > 0:
+                channels[str(request_id)] = remaining
+            else:
+                channels.pop(str(request_id), None)
+            if not channels:
+                self._driver_channels.pop(str(driver_id), None)
+
+        # Wake the connection's forwarding thread so it can exit
+        try:
+            subscription.put_nowait(None)
+        except Exception:
+            pass
+
+    # -------------------------
+    # Publishing
+    # -------------------------
+
+    def publish(self, request_id, role, coords, updated_at):
+        """Send a position from one party to everyone on the ride request's channel."""
+        self.broker.publish(request_id, 'location', {
+            "type": "location",
+            "role": role,
+            "coordinates": coords,
+            "updated_at": updated_at.isoformat()
+        })
+
+    def publish_driver_location(self, driver_id, coords, updated_at):
+        """Send a driver's position to every ride request channel they have open."""
+        with self._lock:
+            request_ids = list(self._driver_channels.get(str(driver_id), {}))
+        for request_id in request_ids:
+            self.publish(request_id, 'driver', coords, updated_at)
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+
+    def persist(self, write, *args):
+        """Run a MongoDB write on the background worker, logging (not raising) failures."""
+        def run():
+            try:
+                write(*args)
+            except Exception as e:
+                print(f"Warning: failed to persist live location: {e}")
+
+        if self._executor is None:
+            run()
+        else:
+            self._executor.submit(run)
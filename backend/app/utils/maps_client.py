@@ -0,0 +1,136 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Google Maps web service paths, relative to MAPS_API_BASE_URL
+ENDPOINT_PATHS = {
+    'geocode': '/maps/api/geocode/json',
+    'autocomplete': '/maps/api/place/autocomplete/json',
+    'place_details': '/maps/api/place/details/json',
+    'directions': '/maps/api/directions/json',
+    'distance_matrix': '/maps/api/distancematrix/json'
+}
+
+# Seconds to wait for each endpoint before giving up
+DEFAULT_TIMEOUTS = {
+    'geocode': 10,
+    'autocomplete': 10,
+    'place_details': 10,
+    'directions': 15,
+    'distance_matrix': 15
+}
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class MapsClient:
+    """
+    Shared HTTP client for the Google Maps proxy endpoints.
+
+    Keeps one pooled keep-alive Session per process so calls reuse TCP/TLS
+    connections, reads the API key once at start-up, retries transient
+    failures with jittered exponential backoff and records per-endpoint metrics.
+    Point MAPS_API_BASE_URL at a local fake server to stand in for Google in tests.
+    """
+
+    def __init__(self):
+        self.api_key = None
+        self.base_url = 'https://maps.googleapis.com'
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        self.max_retries = 2
+        self.backoff_base_seconds = 0.2
+        self.backoff_max_seconds = 2.0
+        self.session = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {}
+
+    def init_app(self, app):
+        self.api_key = app.config.get('GOOGLE_MAPS_API_KEY')
+        self.base_url = app.config.get('MAPS_API_BASE_URL', self.base_url).rstrip('/')
+        self.timeouts.update(app.config.get('MAPS_TIMEOUTS', {}))
+        self.max_retries = app.config.get('MAPS_MAX_RETRIES', self.max_retries)
+        self.backoff_base_seconds = app.config.get('MAPS_BACKOFF_BASE_SECONDS', self.backoff_base_seconds)
+        self.backoff_max_seconds = app.config.get('MAPS_BACKOFF_MAX_SECONDS', self.backoff_max_seconds)
+
+        adapter = HTTPAdapter(
+            pool_connections=app.config.get('MAPS_POOL_CONNECTIONS', 10),
+            pool_maxsize=app.config.get('MAPS_POOL_MAXSIZE', 20),
+            max_retries=0  # Retries are handled here so they can be counted
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.session = session
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff delay for the given retry attempt."""
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _record(self, endpoint, elapsed_ms, retries, failed):
+        with self._metrics_lock:
+            metrics = self._metrics.setdefault(endpoint, {
+                "requests": 0,
+                "failures": 0,
+                "retries": 0,
+                "total_latency_ms": 0.0,
+                "max_latency_ms": 0.0
+            })
+            metrics["requests"] += 1
+            metrics["retries"] += retries
+            metrics["total_latency_ms"] += elapsed_ms
+            metrics["max_latency_ms"] = max(metrics["max_latency_ms"], elapsed_ms)
+            if failed:
+                metrics["failures"] += 1
+
+    def get(self, endpoint, params):
+        """
+        Call a Google Maps web service endpoint.
+
+        Args:
+            endpoint: One of ENDPOINT_PATHS (e.g. 'geocode', 'directions')
+            params: Query parameters; the API key is added automatically
+
+        Returns:
+            The final requests.Response (callers check status_code as before)
+
+        Raises:
+            requests.RequestException if every attempt failed to connect
+        """
+        url = self.base_url + ENDPOINT_PATHS[endpoint]
+        params = dict(params, key=self.api_key)
+        timeout = self.timeouts.get(endpoint, 10)
+
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    break
+            except requests.RequestException:
+                if attempt >= self.max_retries:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    self._record(endpoint, elapsed_ms, attempt, failed=True)
+                    raise
+
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._record(endpoint, elapsed_ms, attempt, failed=response.status_code != 200)
+        return response
+
+    def stats(self):
+        """Per-endpoint request counts, failures, retries and latency."""
+        with self._metrics_lock:
+            stats = {endpoint: dict(metrics) for endpoint, metrics in self._metrics.items()}
+        for metrics in stats.values():
+            metrics["avg_latency_ms"] = round(metrics["total_latency_ms"] / metrics["requests"], 2)
+            metrics["total_latency_ms"] = round(metrics["total_latency_ms"], 2)
+            metrics["max_latency_ms"] = round(metrics["max_latency_ms"], 2)
+        return stats
@@ -0,0 +1,246 @@
+import math
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from .distance_utils import EARTH_RADIUS_KM
+from .spatial_index import KM_PER_DEGREE
+
+# File layout (little-endian), each array starting on an 8-byte boundary:
+#   header: magic, version, point count N, grid cell size, grid origin (lng, lat), columns, rows
+#   points         int32   (N, 2)   micro-degrees [lng, lat], sorted by grid cell
+#   kinds          uint8   (N)      index into KINDS
+#   localities     uint32  (N)      point index of the nearest locality (NO_LOCALITY if none)
+#   cell starts    uint32  (columns * rows + 1) first point of each cell
+#   name offsets   uint32  (N + 1)  into the name blob
+#   name blob      UTF-8 names
+MAGIC = b'PLC1'
+VERSION = 1
+HEADER = struct.Struct('<4sHIdddII')
+
+KINDS = ('locality', 'street', 'poi')
+NO_LOCALITY = 0xFFFFFFFF
+
+# Google result types reported for each kind
+KIND_TYPES = {
+    'locality': ['sublocality', 'political'],
+    'street': ['route'],
+    'poi': ['point_of_interest', 'establishment']
+}
+
+
+def _align(buffer):
+    buffer.extend(b'\0' * (-len(buffer) % 8))
+
+
+def _nearest(points, lng, lat):
+    """Index of and distance (m) to the nearest of points (degrees), equirectangular."""
+    x = (points[:, 0] - lng) * math.cos(math.radians(lat))
+    y = points[:, 1] - lat
+    squared = x * x + y * y
+    index = int(np.argmin(squared))
+    return index, math.radians(math.sqrt(squared[index])) * EARTH_RADIUS_KM * 1000
+
+
+def write_place_index(path, places, grid_deg=0.005):
+    """
+    Write a place index file.
+
+    Args:
+        path: Output file
+        places: List of dicts with name, kind (one of KINDS) and coordinates [longitude, latitude]
+        grid_deg: Grid cell size in degrees
+    """
+    coords = np.asarray([place['coordinates'] for place in places], dtype=float).reshape(-1, 2)
+    origin_lng, origin_lat = coords.min(axis=0) if len(coords) else (0.0, 0.0)
+    columns = int((coords[:, 0].max() - origin_lng) // grid_deg) + 1 if len(coords) else 1
+    rows = int((coords[:, 1].max() - origin_lat) // grid_deg) + 1 if len(coords) else 1
+
+    cell_x = ((coords[:, 0] - origin_lng) // grid_deg).astype(np.int64)
+    cell_y = ((coords[:, 1] - origin_lat) // grid_deg).astype(np.int64)
+    cells = cell_y * columns + cell_x
+    order = np.argsort(cells, kind='stable')
+    coords, cells = coords[order], cells[order]
+    places = [places[i] for i in order]
+
+    kinds = np.asarray([KINDS.index(place['kind']) for place in places], dtype='<u1')
+
+    # Each point remembers its nearest locality, so lookups can name the area without a second search
+    localities = np.full(len(places), NO_LOCALITY, dtype='<u4')
+    locality_indices = np.flatnonzero(kinds == KINDS.index('locality'))
+    if len(locality_indices):
+        for i, (lng, lat) in enumerate(coords):
+            nearest, _ = _nearest(coords[locality_indices], lng, lat)
+            localities[i] = locality_indices[nearest]
+
+    cell_starts = np.searchsorted(cells, np.arange(columns * rows + 1)).astype('<u4')
+
+    names = [place['name'].encode('utf-8') for place in places]
+    name_offsets = np.zeros(len(names) + 1, dtype='<u4')
+    name_offsets[1:] = np.cumsum([len(name) for name in names])
+
+    points = np.round(coords * 1e6).astype('<i4')
+    buffer = bytearray(HEADER.pack(MAGIC, VERSION, len(places), grid_deg, origin_lng, origin_lat, columns, rows))
+    for array in (points, kinds, localities, cell_starts, name_offsets):
+        _align(buffer)
+        buffer.extend(array.tobytes())
+    buffer.extend(b''.join(names))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(buffer)
+    os.replace(temp_path, path)
+
+
+def geocode_response(place):
+    """Google Geocoding-shaped response for an offline lookup result."""
+    lng, lat = place['coordinates']
+    return {
+        "status": "OK",
+        "source": "offline",
+        "results": [{
+            "formatted_address": ', '.join(part for part in (place['name'], place['locality']) if part),
+            "name": place['name'],
+            "types": KIND_TYPES[place['kind']],
+            "geometry": {"location": {"lat": lat, "lng": lng}},
+            "distance_m": place['distance_m']
+        }]
+    }
+
+
+class OfflineGeocoder:
+    """
+    Reverse geocoder over a local, memory-mapped place index (built ahead of
+    time by build_place_index.py from an OpenStreetMap extract).
+
+    Points are bucketed into a fixed grid, so a lookup only scans the cells
+    around the query. The file is opened on first use, keeping app start-up
+    fast; when it is missing every lookup misses and callers fall back to Google.
+    """
+
+    def __init__(self, max_distance_m=150):
+        self.max_distance_m = max_distance_m
+        self.path = None
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._load_failed = False
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_distance_m = app.config.get('OFFLINE_GEOCODE_MAX_DISTANCE_M', self.max_distance_m)
+        self.path = app.config.get('PLACE_INDEX_PATH')
+
+    def _load(self):
+        with self._lock:
+            if self._mmap is not None or self._load_failed:
+                return
+            if not self.path or not os.path.exists(self.path):
+                self._load_failed = True
+                return
+            try:
+                self.open(self.path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not load place index {self.path}: {e}")
+                self._load_failed = True
+
+    def open(self, path):
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, grid_deg, origin_lng, origin_lat, columns, rows = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            data.close()
+            raise ValueError("not a place index file")
+
+        position = HEADER.size
+
+        def take(dtype, count):
+            nonlocal position
+            position += -position % 8
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=position)
+            position += array.nbytes
+            return array
+
+        self._points = take('<i4', 2 * count).reshape(count, 2)
+        self._kinds = take('<u1', count)
+        self._localities = take('<u4', count)
+        self._cell_starts = take('<u4', columns * rows + 1)
+        self._name_offsets = take('<u4', count + 1)
+        self._names_start = position
+        self.grid_deg = grid_deg
+        self.origin = (origin_lng, origin_lat)
+        self.columns, self.rows = columns, rows
+        self._mmap = data
+
+    @property
+    def loaded(self):
+        return self._mmap is not None
+
+    def _name(self, index):
+        start, end = int(self._name_offsets[index]), int(self._name_offsets[index + 1])
+        return self._mmap[self._names_start + start:self._names_start + end].decode('utf-8')
+
+    def _candidates(self, lng, lat, reach):
+        """Point indices in the cells within reach cells of the query's cell."""
+        x = int((lng - self.origin[0]) // self.grid_deg)
+        y = int((lat - self.origin[1]) // self.grid_deg)
+        x0, x1 = max(x - reach, 0), min(x + reach, self.columns - 1)
+        if x0 > x1:
+            return np.empty(0, dtype=np.int64)
+        # Cells of one grid row are contiguous, so each row is a single slice
+        ranges = [
+            (int(self._cell_starts[row * self.columns + x0]), int(self._cell_starts[row * self.columns + x1 + 1]))
+            for row in range(max(y - reach, 0), min(y + reach, self.rows - 1) + 1)
+        ]
+        return np.concatenate([np.arange(start, end) for start, end in ranges]) if ranges else np.empty(0, dtype=np.int64)
+
+    def lookup(self, lat, lng):
+        """
+        Nearest named place to a point.
+
+        Returns:
+            Dict with name, kind, locality (or None), coordinates [lng, lat] and
+            distance_m, or None if nothing lies within OFFLINE_GEOCODE_MAX_DISTANCE_M
+        """
+        if self._mmap is None:
+            self._load()
+            if self._mmap is None:
+                return None
+
+        reach = max(1, int(math.ceil(self.max_distance_m / (self.grid_deg * KM_PER_DEGREE * 1000))))
+        candidates = self._candidates(lng, lat, reach)
+        if not len(candidates):
+            self.misses += 1
+            return None
+
+        points = self._points[candidates] / 1e6
+        nearest, distance_m = _nearest(points, lng, lat)
+        if distance_m > self.max_distance_m:
+            self.misses += 1
+            return None
+
+        index = int(candidates[nearest])
+        locality = int(self._localities[index])
+        self.hits += 1
+        return {
+            "name": self._name(index),
+            "kind": KINDS[self._kinds[index]],
+            "locality": self._name(locality) if locality not in (NO_LOCALITY, index) else None,
+            "coordinates": points[nearest].tolist(),
+            "distance_m": round(distance_m, 1)
+        }
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "loaded": self.loaded,
+            "places": len(self._kinds) if self.loaded else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0
+        }
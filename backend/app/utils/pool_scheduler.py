@@ -0,0 +1,66 @@
+import numpy as np
+
+from .distance_utils import calculate_haversine_distances_batch
+
+
+def route_length_km(points):
+    """Total haversine length of a path through [longitude, latitude] points."""
+    if len(points) < 2:
+        return 0.0
+    points = np.asarray(points, dtype=float)
+    return float(calculate_haversine_distances_batch(points[:-1], points[1:]).sum())
+
+
+def plan_pooled_insertion(start_coords, end_coords, stops, request_id,
+                          pickup_coords, dropoff_coords, detour_budget_km):
+    """
+    Insert a new rider's pickup and drop-off into a driver's stop sequence with
+    the cheapest-insertion heuristic: every (pickup edge, drop-off edge) pair
+    with the pickup first is tried, and the one adding the least distance wins.
+
+    Args:
+        start_coords: Driver's current position [longitude, latitude]
+        end_coords: Driver's destination [longitude, latitude]
+        stops: Remaining stops, in order: dicts with request_id, type ("pickup"
+               or "dropoff") and coordinates
+        request_id: ID of the request being inserted
+        pickup_coords: New rider's pickup [longitude, latitude]
+        dropoff_coords: New rider's destination [longitude, latitude]
+        detour_budget_km: Maximum extra distance the whole schedule may add to
+                          the driver's direct route
+
+    Returns:
+        (new stop list, total detour in km), or None if every insertion
+        exceeds the detour budget
+    """
+    route = [start_coords] + [stop['coordinates'] for stop in stops] + [end_coords]
+    nodes = np.asarray(route + [pickup_coords, dropoff_coords], dtype=float)
+    pickup, dropoff = len(route), len(route) + 1
+
+    # All pairwise distances in one vectorized call
+    dist = calculate_haversine_distances_batch(nodes[:, None, :], nodes[None, :, :])
+
+    edges = len(route) - 1
+    edge_length = dist[np.arange(edges), np.arange(1, edges + 1)]
+    # Extra distance from placing the pickup / drop-off alone inside each edge
+    pickup_cost = dist[:edges, pickup] + dist[pickup, 1:edges + 1] - edge_length
+    dropoff_cost = dist[:edges, dropoff] + dist[dropoff, 1:edges + 1] - edge_length
+    # Both in the same edge: start -> pickup -> drop-off -> end of edge
+    same_edge_cost = dist[:edges, pickup] + dist[pickup, dropoff] + dist[dropoff, 1:edges + 1] - edge_length
+
+    # cost[i, j] = pickup in edge i, drop-off in edge j; only j >= i is allowed
+    cost = pickup_cost[:, None] + dropoff_cost[None, :]
+    cost[np.arange(edges), np.arange(edges)] = same_edge_cost
+    cost[np.tril_indices(edges, -1)] = np.inf
+
+    pickup_edge, dropoff_edge = np.unravel_index(np.argmin(cost), cost.shape)
+    added_km = float(cost[pickup_edge, dropoff_edge])
+
+    detour_km = float(edge_length.sum()) + added_km - float(dist[0, edges])
+    if detour_km > detour_budget_km:
+        return None
+
+    new_stops = list(stops)
+    new_stops.insert(dropoff_edge, {"request_id": request_id, "type": "dropoff", "coordinates": dropoff_coords})
+    new_stops.insert(pickup_edge, {"request_id": request_id, "type": "pickup", "coordinates": pickup_coords})
+    return new_stops, round(detour_km, 3)
@@ -0,0 +1,129 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from .distance_utils import calculate_haversine_distances_batch
+
+# Cost of a pair that must never be matched (too far, or clashes with the driver's schedule)
+INFEASIBLE_COST = 1e9
+
+# Cost weights: one km of driving to the pickup is the unit
+DISTANCE_WEIGHT = 1.0         # per km from the driver's start point to the pickup
+URGENCY_WEIGHT = 0.25         # per hour until the ride, so sooner rides are matched first
+DRIVER_RATING_WEIGHT = 2.0    # per star below 5
+RIDER_RATING_WEIGHT = 1.0     # per star below 5
+
+
+def build_prebook_cost_matrix(pickup_coords, hours_until, rider_ratings,
+                              driver_coords, driver_ratings, max_distance_km=25):
+    """
+    Cost of assigning every pre-booking request to every driver (lower is better).
+
+    Args:
+        pickup_coords: (R, 2) array of request pickup [longitude, latitude]
+        hours_until: (R,) hours until each requested ride
+        rider_ratings: (R,) riders' average ratings (0-5)
+        driver_coords: (D, 2) array of driver start [longitude, latitude]
+        driver_ratings: (D,) drivers' average ratings (0-5)
+        max_distance_km: Pairs further apart than this are infeasible
+
+    Returns:
+        (R, D) float array of costs; infeasible pairs hold INFEASIBLE_COST
+    """
+    pickups = np.asarray(pickup_coords, dtype=float).reshape(-1, 1, 2)
+    drivers = np.asarray(driver_coords, dtype=float).reshape(1, -1, 2)
+    distances_km = calculate_haversine_distances_batch(pickups, drivers)
+
+    # Unrated users (0) are treated as neutral rather than worst
+    rider_ratings = np.asarray(rider_ratings, dtype=float)
+    driver_ratings = np.asarray(driver_ratings, dtype=float)
+    rider_penalty = 5 - np.where(rider_ratings > 0, rider_ratings, 4)
+    driver_penalty = 5 - np.where(driver_ratings > 0, driver_ratings, 4)
+
+    cost = (
+        DISTANCE_WEIGHT * distances_km
+        + URGENCY_WEIGHT * np.clip(np.asarray(hours_until, dtype=float), 0, None)[:, None]
+        + RIDER_RATING_WEIGHT * rider_penalty[:, None]
+        + DRIVER_RATING_WEIGHT * driver_penalty[None, :]
+    )
+    return np.where(distances_km > max_distance_km, INFEASIBLE_COST, cost)
+
+
+def block_time_conflicts(cost, request_times, driver_indices, busy_times, conflict_window_seconds):
+    """
+    Mark requests infeasible for drivers who are already busy within the conflict window.
+
+    Args:
+        cost: (R, D) cost matrix, modified in place
+        request_times: (R,) requested ride times as epoch seconds
+        driver_indices: (M,) column index of the driver for each busy slot
+        busy_times: (M,) epoch seconds of each busy slot
+        conflict_window_seconds: Rides closer together than this clash
+    """
+    if len(busy_times) == 0:
+        return cost
+
+    request_times = np.asarray(request_times, dtype=float)
+    clashes = np.abs(request_times[:, None] - np.asarray(busy_times, dtype=float)[None, :]) < conflict_window_seconds
+
+    # (R, M) clashes x (M, D) slot-to-driver map -> (R, D) count of clashing slots
+    slot_drivers = np.zeros((len(busy_times), cost.shape[1]))
+    slot_drivers[np.arange(len(busy_times)), driver_indices] = 1
+    blocked = (clashes.astype(float) @ slot_drivers) > 0
+
+    cost[blocked] = INFEASIBLE_COST
+    return cost
+
+
+def solve_prebook_assignment(cost, request_times, driver_capacity, conflict_window_seconds):
+    """
+    Assign requests to drivers, minimising total cost.
+
+    Each round solves an exact rectangular assignment (Hungarian method) between
+    the unmatched requests and the drivers with seats left, so every driver takes
+    at most one request per round. After a round, requests that clash in time with
+    a driver's new ride are blocked for that driver, and the next round runs, until
+    capacity runs out or nothing feasible is left.
+
+    Args:
+        cost: (R, D) cost matrix from build_prebook_cost_matrix (not modified)
+        request_times: (R,) requested ride times as epoch seconds
+        driver_capacity: (D,) number of further rides each driver can take
+        conflict_window_seconds: Rides closer together than this clash
+
+    Returns:
+        List of (request_index, driver_index, cost) tuples
+    """
+    cost = np.array(cost, dtype=float)
+    capacity = np.array(driver_capacity, dtype=int)
+    unmatched = np.ones(cost.shape[0], dtype=bool)
+    matches = []
+
+    while unmatched.any() and (capacity > 0).any():
+        rows = np.flatnonzero(unmatched)
+        cols = np.flatnonzero(capacity > 0)
+        sub_cost = cost[np.ix_(rows, cols)]
+
+        # Drop requests with no feasible driver left before solving
+        feasible_rows = (sub_cost < INFEASIBLE_COST).any(axis=1)
+        if not feasible_rows.any():
+            break
+        rows = rows[feasible_rows]
+        sub_cost = sub_cost[feasible_rows]
+
+        row_ind, col_ind = linear_sum_assignment(sub_cost)
+        feasible = sub_cost[row_ind, col_ind] < INFEASIBLE_COST
+        if not feasible.any():
+            break
+
+        matched_rows = rows[row_ind[feasible]]
+        matched_cols = cols[col_ind[feasible]]
+        matches.extend(zip(matched_rows.tolist(), matched_cols.tolist(),
+                           cost[matched_rows, matched_cols].tolist()))
+
+        unmatched[matched_rows] = False
+        capacity[matched_cols] -= 1
+        block_time_conflicts(cost, request_times, matched_cols,
+                             np.asarray(request_times, dtype=float)[matched_rows],
+                             conflict_window_seconds)
+
+    return matches
@@ -0,0 +1,113 @@
+import datetime
+import threading
+import time
+
+# Re-read this much history on every refresh, so revocations committed slightly
+# out of order by other workers are not skipped
+REFRESH_OVERLAP = datetime.timedelta(seconds=30)
+
+
+def _epoch(value):
+    """Epoch seconds for a naive UTC datetime as stored by MongoDB."""
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class RevocationList:
+    """
+    Per-worker set of revoked JWT IDs, so token_required can reject revoked
+    tokens with a set lookup instead of a database round-trip.
+
+    The set is loaded in full on first use, with callers arriving meanwhile
+    waiting for that load, and then refreshed incrementally by a background
+    thread every JWT_REVOCATION_REFRESH_SECONDS, reading only revocations
+    newer than the last one seen. Entries are dropped once
+    the token they revoke has expired. Revocations made by this worker are
+    applied immediately; other workers pick them up on their next refresh.
+    """
+
+    def __init__(self, refresh_interval_seconds=5):
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._loader = None
+        self._lock = threading.Lock()
+        self._revoked = {}  # jti -> token exp (epoch seconds)
+        self._cursor = None  # latest revoked_at seen
+        self._start_lock = threading.Lock()
+        self._loaded = threading.Event()  # Set once the initial full load has run
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {"refreshes": 0, "refresh_failures": 0, "rejected": 0}
+
+    def init_app(self, app, loader):
+        """
+        Args:
+            app: The Flask app (reads JWT_REVOCATION_REFRESH_SECONDS)
+            loader: Callable taking a revoked_at lower bound (or None for all) and
+                    returning documents with jti, expires_at and revoked_at
+        """
+        self.refresh_interval_seconds = app.config.get(
+            'JWT_REVOCATION_REFRESH_SECONDS', self.refresh_interval_seconds
+        )
+        self._loader = loader
+
+    def _ensure_refresher(self):
+        # Started on first use so importing the app never spawns threads or queries.
+        # Concurrent first callers queue on _start_lock until the full load is in.
+        with self._start_lock:
+            if self._loaded.is_set():
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, name='revocation-refresher', daemon=True)
+            self._thread.start()
+            self._loaded.set()
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval_seconds):
+            self.refresh()
+
+    def refresh(self):
+        """Fetch revocations recorded since the last refresh and drop expired ones."""
+        if self._loader is None:
+            return
+        with self._lock:
+            since = self._cursor - REFRESH_OVERLAP if self._cursor is not None else None
+        try:
+            documents = self._loader(since)
+        except Exception as e:
+            with self._lock:
+                self._stats["refresh_failures"] += 1
+            print(f"Warning: token revocation refresh failed: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for document in documents:
+                self._revoked[document['jti']] = _epoch(document['expires_at'])
+                if self._cursor is None or document['revoked_at'] > self._cursor:
+                    self._cursor = document['revoked_at']
+            if self._cursor is None:
+                self._cursor = datetime.datetime.utcnow()
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._stats["refreshes"] += 1
+
+    def add(self, jti, exp):
+        """Apply a revocation made by this worker without waiting for a refresh."""
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def is_revoked(self, jti):
+        if not self._loaded.is_set():
+            self._ensure_refresher()
+        with self._lock:
+            if jti in self._revoked:
+                self._stats["rejected"] += 1
+                return True
+        return False
+
+    def shutdown(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["revoked"] = len(self._revoked)
+        return stats
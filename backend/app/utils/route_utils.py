@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+
+from .distance_utils import EARTH_RADIUS_KM
+
+
+def decode_polyline(encoded):
+    """
+    Decode a Google encoded polyline (e.g. a Directions overview_polyline).
+
+    Returns:
+        List of [longitude, latitude] points
+    """
+    points = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append([lng / 1e5, lat / 1e5])
+    return points
+
+
+def encode_polyline(coordinates):
+    """
+    Encode [longitude, latitude] points as a Google encoded polyline.
+
+    Returns:
+        Encoded polyline string (same format as a Directions overview_polyline)
+    """
+    chunks = []
+    previous_lat = previous_lng = 0
+    for lng, lat in coordinates:
+        lat, lng = int(round(lat * 1e5)), int(round(lng * 1e5))
+        for delta in (lat - previous_lat, lng - previous_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous_lat, previous_lng = lat, lng
+    return ''.join(chunks)
+
+
+def simplify_route(coordinates, tolerance_m=30):
+    """
+    Drop route points that deviate less than tolerance_m from the simplified line
+    (Douglas-Peucker), so stored routes stay small.
+
+    Args:
+        coordinates: List of [longitude, latitude] points
+        tolerance_m: Maximum allowed deviation in meters
+
+    Returns:
+        Simplified list of [longitude, latitude] points (first and last always kept)
+    """
+    if len(coordinates) <= 2:
+        return [list(point) for point in coordinates]
+
+    # Work in a local flat projection (meters), accurate enough at city scale
+    points = np.radians(np.asarray(coordinates, dtype=float))
+    x = points[:, 0] * math.cos(points[:, 1].mean()) * EARTH_RADIUS_KM * 1000
+    y = points[:, 1] * EARTH_RADIUS_KM * 1000
+
+    keep = np.zeros(len(coordinates), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coordinates) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Perpendicular distance of every inner point from the start-end chord
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        inner_x, inner_y = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        chord = math.hypot(dx, dy)
+        if chord == 0:
+            deviations = np.hypot(inner_x, inner_y)
+        else:
+            deviations = np.abs(inner_x * dy - inner_y * dx) / chord
+
+        farthest = int(np.argmax(deviations))
+        if deviations[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return [list(coordinates[i]) for i in np.flatnonzero(keep)]
+
+
+def build_route_geojson(pickup_coords, destination_coords, route_coords=None, tolerance_m=30):
+    """
+    GeoJSON LineString for a driver's route. Falls back to the straight line
+    between pickup and destination when no route is known; None if the route
+    has no length.
+    """
+    coordinates = route_coords if route_coords and len(route_coords) >= 2 else [pickup_coords, destination_coords]
+
+    # 2dsphere indexes reject LineStrings with repeated consecutive vertices
+    simplified = []
+    for point in simplify_route(coordinates, tolerance_m):
+        if not simplified or point != simplified[-1]:
+            simplified.append(point)
+    if len(simplified) < 2:
+        return None
+
+    return {
+        "type": "LineString",
+        "coordinates": simplified
+    }
+
+
+def distance_to_route_km(point, route_coords):
+    """
+    Shortest distance from a point to a route polyline, in kilometres.
+
+    Args:
+        point: [longitude, latitude]
+        route_coords: List of [longitude, latitude] points (at least one)
+    """
+    # Local flat projection centred on the point, accurate enough at city scale
+    lng, lat = np.radians(point)
+    route = np.radians(np.asarray(route_coords, dtype=float))
+    x = (route[:, 0] - lng) * math.cos(lat) * EARTH_RADIUS_KM
+    y = (route[:, 1] - lat) * EARTH_RADIUS_KM
+    if len(route) == 1:
+        return float(math.hypot(x[0], y[0]))
+
+    # Closest point on every segment, clamped to the segment's ends
+    start_x, start_y = x[:-1], y[:-1]
+    dx, dy = np.diff(x), np.diff(y)
+    length_sq = dx * dx + dy * dy
+    t = np.clip(-(start_x * dx + start_y * dy) / np.where(length_sq > 0, length_sq, 1), 0, 1)
+    return float(np.min(np.hypot(start_x + t * dx, start_y + t * dy)))
@@ -0,0 +1,319 @@
+import math
+import threading
+import time
+
+from .distance_utils import calculate_haversine_distance
+from .route_utils import distance_to_route_km
+
+# Roughly how many kilometres one degree of latitude spans
+KM_PER_DEGREE = 111.32
+
+
+class LiveRideIndex:
+    """
+    Process-local uniform grid of active rides, used to answer "who is near me"
+    without running a $geoNear + $lookup pipeline on every rider poll.
+
+    Each ride is bucketed by its driver's current location (falling back to the
+    pickup location until the first GPS ping arrives). MongoDB stays the source
+    of truth: the index is loaded from it on cold start and re-synced every
+    LIVE_INDEX_RESYNC_SECONDS so that rides created by other workers show up.
+
+    Each ride's route (or the straight line from pickup to destination for
+    rides stored without one) is kept with its bounding box, so corridor
+    searches are answered here too.
+    """
+
+    def __init__(self, cell_size_deg=0.02, resync_seconds=30):
+        self.cell_size_deg = cell_size_deg
+        self.resync_seconds = resync_seconds
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()  # one thread queries MongoDB at a time
+        self._rides = {}       # ride_id -> ride document (with driver_snapshot)
+        self._cells = {}       # (cell_x, cell_y) -> set of ride_ids
+        self._ride_cell = {}   # ride_id -> (cell_x, cell_y)
+        self._by_driver = {}   # driver_id -> ride_id
+        self._routes = {}      # ride_id -> (route coordinates, (min_lng, min_lat, max_lng, max_lat))
+        self._loaded_at = None
+        self._pending = None   # (method, args) applied during a reload, replayed on the new data
+
+    def init_app(self, app):
+        """Read grid settings from the Flask config."""
+        self.cell_size_deg = app.config.get('LIVE_INDEX_CELL_DEG', self.cell_size_deg)
+        self.resync_seconds = app.config.get('LIVE_INDEX_RESYNC_SECONDS', self.resync_seconds)
+
+    # -------------------------
+    # Internal helpers
+    # -------------------------
+
+    def _cell_for(self, coords):
+        return (
+            math.floor(coords[0] / self.cell_size_deg),
+            math.floor(coords[1] / self.cell_size_deg)
+        )
+
+    @staticmethod
+    def _position_of(ride):
+        """The point a ride is indexed under: live position if known, else pickup."""
+        location = ride.get('current_location') or ride['pickup_location']
+        return location['coordinates']
+
+    @staticmethod
+    def _route_of(ride):
+        """A ride's route coordinates, or the straight line if it was stored without one."""
+        route = ride.get('route')
+        if route and route.get('coordinates'):
+            return route['coordinates']
+        return [ride['pickup_location']['coordinates'], ride['destination_location']['coordinates']]
+
+    def _unlink(self, ride_id):
+        cell = self._ride_cell.pop(ride_id, None)
+        if cell is not None:
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(ride_id)
+                if not bucket:
+                    del self._cells[cell]
+
+    def _link(self, ride_id, coords):
+        cell = self._cell_for(coords)
+        self._cells.setdefault(cell, set()).add(ride_id)
+        self._ride_cell[ride_id] = cell
+
+    def _is_stale(self):
+        if self._loaded_at is None:
+            return True
+        if not self.resync_seconds:
+            return False
+        return time.monotonic() - self._loaded_at > self.resync_seconds
+
+    def _record(self, method, *args):
+        # Caller holds self._lock; a reload in flight re-applies this once it swaps in
+        if self._pending is not None:
+            self._pending.append((method, args))
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+
+    def load(self, rides):
+        """Replace the whole index with the given active rides."""
+        # Build the new grid unlocked; readers keep using the current one meanwhile
+        fresh = LiveRideIndex(self.cell_size_deg, self.resync_seconds)
+        for ride in rides:
+            fresh._upsert_locked(ride)
+
+        with self._lock:
+            self._rides = fresh._rides
+            self._cells = fresh._cells
+            self._ride_cell = fresh._ride_cell
+            self._by_driver = fresh._by_driver
+            self._routes = fresh._routes
+            self._loaded_at = time.monotonic()
+
+            # Changes made while the rides were being read may be missing from them
+            pending, self._pending = self._pending, None
+            for method, args in pending or ():
+                getattr(self, method)(*args)
+
+    def ensure_loaded(self, loader):
+        """
+        Load (or re-sync) from MongoDB if the index is cold or stale.
+
+        The query runs without the index lock held. While a re-sync is running
+        other callers carry on with the current data; only a cold index makes
+        them wait for it.
+        """
+        if not self._is_stale():
+            return
+        if not self._reload_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._is_stale():
+                with self._lock:
+                    self._pending = []
+                self.load(loader())
+        finally:
+            with self._lock:
+                self._pending = None
+            self._reload_lock.release()
+
+    def _upsert_locked(self, ride):
+        ride_id = str(ride['_id'])
+        driver_id = str(ride['driver_id'])
+
+        # A driver only has one live ride; drop any older entry
+        previous = self._by_driver.get(driver_id)
+        if previous is not None and previous != ride_id:
+            self._remove_locked(previous)
+
+        self._unlink(ride_id)
+        self._rides[ride_id] = ride
+        self._by_driver[driver_id] = ride_id
+        self._link(ride_id, self._position_of(ride))
+
+        route = self._route_of(ride)
+        lngs = [point[0] for point in route]
+        lats = [point[1] for point in route]
+        self._routes[ride_id] = (route, (min(lngs), min(lats), max(lngs), max(lats)))
+
+    def upsert(self, ride):
+        """Add or replace an active ride (called from go_live)."""
+        with self._lock:
+            self._record('upsert', ride)
+            self._upsert_locked(ride)
+
+    def _remove_locked(self, ride_id):
+        ride = self._rides.pop(ride_id, None)
+        self._routes.pop(ride_id, None)
+        self._unlink(ride_id)
+        if ride is not None and self._by_driver.get(str(ride['driver_id'])) == ride_id:
+            del self._by_driver[str(ride['driver_id'])]
+
+    def remove(self, ride_id):
+        """Drop a ride from the index (called from go_offline)."""
+        with self._lock:
+            self._record('remove', ride_id)
+            self._remove_locked(str(ride_id))
+
+    def update_driver_location(self, driver_id, coords, updated_at=None):
+        """
+        Move a driver's live ride to a new position.
+
+        Returns:
+            True if the driver had an indexed ride, False otherwise
+        """
+        with self._lock:
+            self._record('update_driver_location', driver_id, coords, updated_at)
+            ride_id = self._by_driver.get(str(driver_id))
+            if ride_id is None:
+                return False
+
+            # Copy-on-write so readers holding the old dict are unaffected
+            ride = dict(self._rides[ride_id])
+            ride['current_location'] = {"type": "Point", "coordinates": coords}
+            if updated_at is not None:
+                ride['location_updated_at'] = updated_at
+            self._rides[ride_id] = ride
+
+            new_cell = self._cell_for(coords)
+            if self._ride_cell.get(ride_id) != new_cell:
+                self._unlink(ride_id)
+                self._link(ride_id, coords)
+            return True
+
+    def update_driver_snapshot(self, driver_id, fields):
+        """Merge changed driver details into a driver's indexed ride."""
+        with self._lock:
+            self._record('update_driver_snapshot', driver_id, fields)
+            ride_id = self._by_driver.get(str(driver_id))
+            if ride_id is None:
+                return False
+
+            ride = dict(self._rides[ride_id])
+            ride['driver_snapshot'] = dict(ride.get('driver_snapshot') or {}, **fields)
+            self._rides[ride_id] = ride
+            return True
+
+    def update_ride_fields(self, driver_id, fields):
+        """Overwrite top-level fields (e.g. seats_available) on a driver's indexed ride."""
+        with self._lock:
+            self._record('update_ride_fields', driver_id, fields)
+            ride_id = self._by_driver.get(str(driver_id))
+            if ride_id is None:
+                return False
+
+            self._rides[ride_id] = dict(self._rides[ride_id], **fields)
+            return True
+
+    def get_by_driver(self, driver_id):
+        """Return the indexed ride for a driver, or None."""
+        with self._lock:
+            ride_id = self._by_driver.get(str(driver_id))
+            return self._rides.get(ride_id) if ride_id else None
+
+    # -------------------------
+    # Queries
+    # -------------------------
+
+    def find_nearby(self, coords, max_distance_km=15):
+        """
+        Find indexed rides within max_distance_km of coords.
+
+        Args:
+            coords: [longitude, latitude] of the rider
+            max_distance_km: Search radius in kilometres
+
+        Returns:
+            List of ride documents (copies) with a "distance" field in metres,
+            nearest first - the same shape Ride.find_nearby_rides returns.
+        """
+        lon, lat = coords[0], coords[1]
+        lat_span = max_distance_km / KM_PER_DEGREE
+        lon_span = max_distance_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+
+        min_x, min_y = self._cell_for([lon - lon_span, lat - lat_span])
+        max_x, max_y = self._cell_for([lon + lon_span, lat + lat_span])
+
+        with self._lock:
+            # Walk whichever is smaller: the cells in the bounding box, or the occupied cells
+            box_cells = (max_x - min_x + 1) * (max_y - min_y + 1)
+            if box_cells <= len(self._cells):
+                candidate_ids = []
+                for x in range(min_x, max_x + 1):
+                    for y in range(min_y, max_y + 1):
+                        bucket = self._cells.get((x, y))
+                        if bucket:
+                            candidate_ids.extend(bucket)
+            else:
+                candidate_ids = [
+                    ride_id
+                    for (x, y), bucket in self._cells.items()
+                    if min_x <= x <= max_x and min_y <= y <= max_y
+                    for ride_id in bucket
+                ]
+            candidates = [self._rides[ride_id] for ride_id in candidate_ids]
+
+        results = []
+        for ride in candidates:
+            distance_km = calculate_haversine_distance(coords, self._position_of(ride))
+            if distance_km <= max_distance_km:
+                results.append(dict(ride, distance=distance_km * 1000))
+
+        results.sort(key=lambda ride: ride['distance'])
+        return results
+
+    def find_along_route(self, coords, corridor_width_km):
+        """
+        Find indexed rides whose route passes within corridor_width_km of coords.
+
+        Args:
+            coords: [longitude, latitude] of the rider's pickup
+            corridor_width_km: How far off the route the pickup may be
+
+        Returns:
+            List of ride documents (copies) with a "distance" field in metres
+            from the driver's current position to coords
+        """
+        lon, lat = coords[0], coords[1]
+        lat_span = corridor_width_km / KM_PER_DEGREE
+        lon_span = corridor_width_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+
+        with self._lock:
+            # Bounding boxes grown by the corridor width rule out most routes cheaply
+            candidates = [
+                (self._rides[ride_id], route)
+                for ride_id, (route, (min_lon, min_lat, max_lon, max_lat)) in self._routes.items()
+                if min_lon - lon_span <= lon <= max_lon + lon_span
+                and min_lat - lat_span <= lat <= max_lat + lat_span
+            ]
+
+        results = []
+        for ride, route in candidates:
+            if distance_to_route_km(coords, route) <= corridor_width_km:
+                distance_km = calculate_haversine_distance(coords, self._position_of(ride))
+                results.append(dict(ride, distance=distance_km * 1000))
+        return results
+
+    def __len__(self):
+        return len(self._rides)
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified JWTs, so token_required can skip the HMAC
+    check and claims parsing for tokens it has seen recently.
+
+    Keys are BLAKE2b digests of the token (raw tokens are never kept); values
+    are the token's exp, its jti and the current_user dict built from its payload.
+    Entries are dropped once exp has passed, on logout, and least recently
+    used first beyond JWT_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # digest -> (exp, jti, current_user)
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('JWT_CACHE_MAX_ENTRIES', self.max_entries)
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, token):
+        """(jti, current_user) for a cached token, or None if unknown or expired."""
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[0] <= time.time():
+                del self._entries[digest]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._stats["hits"] += 1
+            return entry[1], entry[2]
+
+    def put(self, token, exp, jti, current_user):
+        digest = self._digest(token)
+        with self._lock:
+            self._entries[digest] = (exp, jti, current_user)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict(self, token):
+        with self._lock:
+            if self._entries.pop(self._digest(token), None) is not None:
+                self._stats["evicted"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0
+        return stats
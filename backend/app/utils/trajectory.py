@@ -0,0 +1,257 @@
+import calendar
+import datetime
+import struct
+import threading
+import time
+from array import array
+
+from .distance_utils import calculate_haversine_distance
+
+# Coordinates are stored as integer micro-degrees (~0.1 m resolution)
+COORD_SCALE = 1_000_000
+
+# Encoded blob header: version, point count, first lon, first lat, first timestamp
+ENCODING_VERSION = 1
+HEADER = struct.Struct('<BIiiI')
+
+# Ignore GPS jitter smaller than this when summing the distance travelled
+MIN_MOVEMENT_KM = 0.005
+
+
+def _to_epoch_seconds(timestamp):
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+def _write_varint(out, value):
+    # Zigzag so small negative deltas stay small, then LEB128
+    value = (value << 1) ^ (value >> 63)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), position
+
+
+class TrajectoryBuffer:
+    """
+    Recorded path of one ride, kept as delta-encoded integer columns.
+
+    Each point costs 12 bytes in memory and typically 3-6 bytes once encoded,
+    so a 30 minute ride with a ping every 5 seconds is well under 2 KB. The
+    distance travelled is summed as points arrive.
+    """
+
+    def __init__(self):
+        self.lon_deltas = array('i')
+        self.lat_deltas = array('i')
+        self.time_deltas = array('i')
+        self.distance_km = 0.0
+        self._first = None  # (lon, lat, epoch seconds) as integers
+        self._last = None
+        self._last_coords = None
+        self.truncated = False  # set once the recorder stops accepting points
+
+    def __len__(self):
+        return len(self.lon_deltas) + (1 if self._first else 0)
+
+    @property
+    def started_at(self):
+        return datetime.datetime.utcfromtimestamp(self._first[2]) if self._first else None
+
+    @property
+    def ended_at(self):
+        return datetime.datetime.utcfromtimestamp(self._last[2]) if self._last else None
+
+    def append(self, coordinates, timestamp):
+        """
+        Add a point to the trajectory.
+
+        Args:
+            coordinates: [longitude, latitude]
+            timestamp: datetime (UTC) of the fix
+        """
+        point = (
+            round(coordinates[0] * COORD_SCALE),
+            round(coordinates[1] * COORD_SCALE),
+            _to_epoch_seconds(timestamp)
+        )
+
+        if self._first is None:
+            self._first = self._last = point
+            self._last_coords = coordinates
+            return
+
+        # Out-of-order fix (e.g. a retried request) - keep the path monotonic in time
+        if point[2] < self._last[2]:
+            return
+
+        moved_km = calculate_haversine_distance(self._last_coords, coordinates)
+        if moved_km >= MIN_MOVEMENT_KM:
+            self.distance_km += moved_km
+            self._last_coords = coordinates
+
+        self.lon_deltas.append(point[0] - self._last[0])
+        self.lat_deltas.append(point[1] - self._last[1])
+        self.time_deltas.append(point[2] - self._last[2])
+        self._last = point
+
+    def encode(self):
+        """Serialize the trajectory into one compact binary blob."""
+        if self._first is None:
+            return b''
+
+        out = bytearray(HEADER.pack(ENCODING_VERSION, len(self), *self._first))
+        for lon_delta, lat_delta, time_delta in zip(self.lon_deltas, self.lat_deltas, self.time_deltas):
+            _write_varint(out, lon_delta)
+            _write_varint(out, lat_delta)
+            _write_varint(out, time_delta)
+        return bytes(out)
+
+
+def decode_trajectory(blob):
+    """
+    Decode a blob produced by TrajectoryBuffer.encode.
+
+    Returns:
+        List of ([longitude, latitude], datetime) tuples
+    """
+    if not blob:
+        return []
+
+    version, count, lon, lat, timestamp = HEADER.unpack_from(blob, 0)
+    if version != ENCODING_VERSION:
+        raise ValueError(f"Unsupported trajectory encoding version {version}")
+
+    points = [([lon / COORD_SCALE, lat / COORD_SCALE], timestamp)]
+    position = HEADER.size
+    for _ in range(count - 1):
+        lon_delta, position = _read_varint(blob, position)
+        lat_delta, position = _read_varint(blob, position)
+        time_delta, position = _read_varint(blob, position)
+        lon += lon_delta
+        lat += lat_delta
+        timestamp += time_delta
+        points.append(([lon / COORD_SCALE, lat / COORD_SCALE], timestamp))
+
+    return [
+        (coords, datetime.datetime.utcfromtimestamp(epoch_seconds))
+        for coords, epoch_seconds in points
+    ]
+
+
+class TrajectoryRecorder:
+    """
+    Process-local registry of in-progress trajectories, one per started ride.
+    Driver location updates are routed to every ride the driver currently has
+    started (several when the ride is pooled).
+
+    Memory is bounded: a buffer stops taking points at max_points (and is
+    marked truncated), and a ride that has had no fix for idle_seconds is
+    dropped, so rides that are never completed do not stay in memory.
+    """
+
+    # How often append_for_driver looks for idle buffers
+    SWEEP_INTERVAL_SECONDS = 60
+
+    def __init__(self, max_points=20000, idle_seconds=30 * 60):
+        self.max_points = max_points
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._buffers = {}    # request_id -> TrajectoryBuffer
+        self._by_driver = {}  # driver_id -> set of request_ids
+        self._rides = {}      # request_id -> (driver_id, rider_id)
+        self._touched = {}    # request_id -> monotonic time of the last start/fix
+        self._swept_at = time.monotonic()
+
+    def init_app(self, app):
+        self.max_points = app.config.get('TRAJECTORY_MAX_POINTS', self.max_points)
+        self.idle_seconds = app.config.get('TRAJECTORY_IDLE_MINUTES', self.idle_seconds / 60) * 60
+
+    def start(self, request_id, driver_id, coordinates=None, timestamp=None, rider_id=None):
+        """Begin recording when a ride starts, optionally seeded with the driver's position."""
+        buffer = TrajectoryBuffer()
+        if coordinates is not None and timestamp is not None:
+            buffer.append(coordinates, timestamp)
+        now = time.monotonic()
+        with self._lock:
+            self._discard(str(request_id))
+            self._buffers[str(request_id)] = buffer
+            self._by_driver.setdefault(str(driver_id), set()).add(str(request_id))
+            self._rides[str(request_id)] = (str(driver_id), rider_id)
+            self._touched[str(request_id)] = now
+            self._sweep(now)
+
+    def append_for_driver(self, driver_id, coordinates, timestamp):
+        """Add a driver's GPS fix to their started rides, if any are being recorded."""
+        now = time.monotonic()
+        with self._lock:
+            for request_id in self._by_driver.get(str(driver_id), ()):
+                buffer = self._buffers.get(request_id)
+                if buffer is None:
+                    continue
+                # Still counts as activity, so a long ride is truncated rather than evicted
+                self._touched[request_id] = now
+                if len(buffer) >= self.max_points:
+                    buffer.truncated = True
+                    continue
+                buffer.append(coordinates, timestamp)
+            self._sweep(now)
+
+    def finish(self, request_id):
+        """Stop recording and return the TrajectoryBuffer, or None if none was recorded."""
+        with self._lock:
+            return self._discard(str(request_id))
+
+    def finish_driver(self, driver_id):
+        """
+        Stop recording every ride of a driver (e.g. when they go offline).
+
+        Returns:
+            List of (request_id, rider_id, TrajectoryBuffer) tuples
+        """
+        with self._lock:
+            finished = []
+            for request_id in list(self._by_driver.get(str(driver_id), ())):
+                rider_id = self._rides.get(request_id, (None, None))[1]
+                buffer = self._discard(request_id)
+                if buffer is not None:
+                    finished.append((request_id, rider_id, buffer))
+            return finished
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buffers)
+
+    def _discard(self, request_id):
+        # Caller holds self._lock
+        buffer = self._buffers.pop(request_id, None)
+        self._touched.pop(request_id, None)
+        ride = self._rides.pop(request_id, None)
+        if ride is not None:
+            request_ids = self._by_driver.get(ride[0])
+            if request_ids is not None:
+                request_ids.discard(request_id)
+                if not request_ids:
+                    del self._by_driver[ride[0]]
+        return buffer
+
+    def _sweep(self, now):
+        # Caller holds self._lock; drops rides with no fix for idle_seconds
+        if now - self._swept_at < self.SWEEP_INTERVAL_SECONDS:
+            return
+        self._swept_at = now
+        for request_id, touched in list(self._touched.items()):
+            if now - touched > self.idle_seconds:
+                self._discard(request_id)
@@ -0,0 +1,257 @@
+import datetime
+import math
+import re
+from functools import wraps
+
+import orjson
+from bson.objectid import ObjectId
+from flask import request, jsonify
+
+MISSING = object()
+
+
+class ValidationError(ValueError):
+    """A request body that does not match its schema; the message is returned to the client."""
+
+
+class Field:
+    """
+    One request body field. Subclasses implement convert(), which returns the
+    cleaned value or raises ValidationError. Optional fields that are absent
+    (or null) are left out of the result unless a default is given.
+    """
+
+    def __init__(self, required=True, default=MISSING, error=None):
+        self.required = required and default is MISSING
+        self.default = default
+        self.error = error
+
+    def convert(self, value, name):
+        raise NotImplementedError
+
+    def fail(self, name, reason):
+        raise ValidationError(self.error or f"{name} {reason}")
+
+
+def _number(value):
+    """value as a finite float, or None for anything else (booleans and strings included)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class String(Field):
+    def __init__(self, min_length=1, max_length=500, pattern=None, choices=None, strip=True, **kwargs):
+        super().__init__(**kwargs)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.pattern = re.compile(pattern) if pattern else None
+        self.choices = frozenset(choices) if choices else None
+        self.strip = strip
+
+    def convert(self, value, name):
+        if not isinstance(value, str):
+            self.fail(name, "must be a string")
+        if self.strip:
+            value = value.strip()
+        if len(value) < self.min_length:
+            self.fail(name, "cannot be empty" if self.min_length == 1 else f"must be at least {self.min_length} characters")
+        if len(value) > self.max_length:
+            self.fail(name, f"must be at most {self.max_length} characters")
+        if self.pattern is not None and not self.pattern.fullmatch(value):
+            self.fail(name, "has an invalid format")
+        if self.choices is not None and value not in self.choices:
+            self.fail(name, f"must be one of: {', '.join(sorted(self.choices))}")
+        return value
+
+
+class Number(Field):
+    def __init__(self, minimum=None, maximum=None, integer=False, **kwargs):
+        super().__init__(**kwargs)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.integer = integer
+
+    def convert(self, value, name):
+        number = _number(value)
+        if number is None:
+            self.fail(name, "must be a number")
+        if self.integer:
+            if not number.is_integer():
+                self.fail(name, "must be a whole number")
+            number = int(number)
+        if self.minimum is not None and number < self.minimum:
+            self.fail(name, f"must be at least {self.minimum}")
+        if self.maximum is not None and number > self.maximum:
+            self.fail(name, f"must be at most {self.maximum}")
+        return number
+
+
+class Boolean(Field):
+    def convert(self, value, name):
+        if not isinstance(value, bool):
+            self.fail(name, "must be true or false")
+        return value
+
+
+class Coordinates(Field):
+    """A [longitude, latitude] pair, as stored in GeoJSON points."""
+
+    def convert(self, value, name):
+        if not isinstance(value, list) or len(value) != 2:
+            self.fail(name, "must be [longitude, latitude]")
+        lng, lat = _number(value[0]), _number(value[1])
+        if lng is None or lat is None:
+            self.fail(name, "must be [longitude, latitude] numbers")
+        if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+            self.fail(name, "is out of range (longitude -180..180, latitude -90..90)")
+        return [lng, lat]
+
+
+class LatLng(Field):
+    """A {lat, lng} object, as sent to the Maps endpoints."""
+
+    def convert(self, value, name):
+        if not isinstance(value, dict):
+            self.fail(name, "must be a {lat, lng} object")
+        lat, lng = _number(value.get('lat')), _number(value.get('lng'))
+        if lat is None or lng is None:
+            self.fail(name, "must have numeric lat and lng")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            self.fail(name, "is out of range (lat -90..90, lng -180..180)")
+        return {"lat": lat, "lng": lng}
+
+
+class Place(Field):
+    """A {lat, lng} object or a free-text address."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._latlng = LatLng(error=self.error)
+        self._address = String(error=self.error)
+
+    def convert(self, value, name):
+        if isinstance(value, dict):
+            return self._latlng.convert(value, name)
+        if isinstance(value, str):
+            return self._address.convert(value, name)
+        self.fail(name, "must be a {lat, lng} object or an address")
+
+
+class ObjectIdString(Field):
+    """A 24-character hex MongoDB id, kept as a string."""
+
+    def convert(self, value, name):
+        if not isinstance(value, str) or not ObjectId.is_valid(value):
+            self.fail(name, "is not a valid id")
+        return value
+
+
+class DateTime(Field):
+    """
+    An ISO 8601 timestamp, always returned timezone-aware: a trailing Z, or no
+    offset at all, is read as UTC.
+    """
+
+    def convert(self, value, name):
+        if not isinstance(value, str):
+            self.fail(name, "must be an ISO 8601 datetime")
+        try:
+            parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            self.fail(name, "must be an ISO 8601 datetime")
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed
+
+
+class ListOf(Field):
+    def __init__(self, item, min_items=0, max_items=1000, **kwargs):
+        super().__init__(**kwargs)
+        self.item = item
+        self.min_items = min_items
+        self.max_items = max_items
+
+    def convert(self, value, name):
+        if not isinstance(value, list):
+            self.fail(name, "must be a list")
+        if len(value) < self.min_items:
+            self.fail(name, f"must have at least {self.min_items} item{'s' if self.min_items != 1 else ''}")
+        if len(value) > self.max_items:
+            self.fail(name, f"must have at most {self.max_items} items")
+        convert = self.item.convert
+        return [convert(item, f"{name}[{i}]") for i, item in enumerate(value)]
+
+
+class Nested(Field):
+    def __init__(self, schema, **kwargs):
+        super().__init__(**kwargs)
+        self.schema = schema
+
+    def convert(self, value, name):
+        return self.schema.validate(value, prefix=f"{name}.")
+
+
+class Schema:
+    """
+    Declarative request body. Fields are class attributes; they are collected
+    once, when the class is defined, into a tuple that validate() walks in a
+    single pass. Unknown keys are dropped.
+
+        class FareEstimateBody(Schema):
+            pickup_location = Coordinates()
+            destination_location = Coordinates()
+    """
+
+    _fields = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = dict(cls._fields)
+        fields.update((name, value) for name, value in vars(cls).items() if isinstance(value, Field))
+        cls._fields = tuple(fields.items())
+
+    @classmethod
+    def validate(cls, data, prefix=''):
+        """The cleaned body as a dict, or ValidationError for the first bad field."""
+        if not isinstance(data, dict):
+            raise ValidationError(f"{prefix.rstrip('.') or 'Request body'} must be a JSON object")
+        result = {}
+        for name, field in cls._fields:
+            value = data.get(name)
+            if value is None:
+                if field.default is not MISSING:
+                    result[name] = field.default
+                elif field.required:
+                    raise ValidationError(field.error or f"Missing required field: {prefix}{name}")
+                continue
+            result[name] = field.convert(value, prefix + name)
+        return result
+
+    @classmethod
+    def decode(cls, raw):
+        """Parse raw JSON bytes (or str) and validate them in one pass."""
+        try:
+            data = orjson.loads(raw or b'{}')
+        except (orjson.JSONDecodeError, TypeError):
+            raise ValidationError("Request body must be valid JSON")
+        return cls.validate(data)
+
+
+def validate_body(schema):
+    """
+    Decorator that decodes the request body with schema before the view runs,
+    exposing the cleaned dict as request.payload. Malformed bodies get a 400
+    without reaching the view. Use after @token_required / @role_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                request.payload = schema.decode(request.get_data())
+            except ValidationError as e:
+                return jsonify({'error': str(e)}), 400
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
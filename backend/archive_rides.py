@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Ride Archiver for CampusPool
+Moves finished (completed and rejected) ride requests from ride_requests into
+ride_history, with the rider's and driver's details embedded, so the hot
+collection and its indexes only hold live rides. Requests are archived once
+they have been finished for RIDE_ARCHIVE_AFTER_MINUTES, in batches of
+RIDE_ARCHIVE_BATCH_SIZE. Cancelled requests are not archived; the TTL index
+created by setup_database.py removes them after CANCELLED_REQUEST_TTL_HOURS.
+
+Run it once, or leave it running to archive every RIDE_ARCHIVE_INTERVAL_MINUTES:
+
+    python archive_rides.py          # loop
+    python archive_rides.py --once   # single run
+"""
+
+import datetime
+import sys
+import time
+
+from app import create_app
+from app.models.ride_model import RideHistory
+
+
+def archive_finished_rides(config, now=None):
+    """
+    Archive every request that has been finished for long enough, batch by batch.
+
+    Returns:
+        Number of requests archived
+    """
+    now = now or datetime.datetime.utcnow()
+    older_than = now - datetime.timedelta(minutes=config['RIDE_ARCHIVE_AFTER_MINUTES'])
+    batch_size = config['RIDE_ARCHIVE_BATCH_SIZE']
+
+    archived = 0
+    while True:
+        moved = RideHistory.archive_batch(older_than, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+
+def main():
+    app = create_app()
+    run_once = '--once' in sys.argv[1:]
+    interval_seconds = app.config['RIDE_ARCHIVE_INTERVAL_MINUTES'] * 60
+
+    with app.app_context():
+        while True:
+            started = time.perf_counter()
+            try:
+                archived = archive_finished_rides(app.config)
+                print(f"✓ Archived {archived} finished ride requests "
+                      f"in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                print(f"Error during ride archival: {e}")
+                if run_once:
+                    return False
+
+            if run_once:
+                return True
+            time.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
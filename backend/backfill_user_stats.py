@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+User Statistics Backfill for CampusPool
+Rebuilds the materialized user_stats documents (served by
+/api/profiles/statistics) from ride history. Completed rides, archived ones
+in ride_history first and then those still in ride_requests, are streamed in
+batches of USER_STATS_BACKFILL_BATCH_SIZE, each batch becoming one bulk write
+of $inc / $push updates, so memory stays flat however long the history is.
+Ratings received are seeded from users.averageRating and totalRides, since
+individual ratings are not stored per ride.
+
+Run it once after deploying, or whenever the stats need rebuilding (with
+archive_rides.py stopped, so no ride moves between the two passes):
+
+    python backfill_user_stats.py
+"""
+
+import sys
+import time
+from collections import defaultdict
+
+from app import create_app, mongo
+from app.models.stats_model import UserStats
+
+
+def batches(cursor, batch_size):
+    """Lists of up to batch_size documents from a cursor"""
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_ratings(batch_size):
+    """Start every rated user's stats from their current average rating"""
+    seeded = 0
+    cursor = mongo.db.users.find(
+        {"totalRides": {"$gt": 0}}, {"role": 1, "averageRating": 1, "totalRides": 1}
+    ).batch_size(batch_size)
+
+    for batch in batches(cursor, batch_size):
+        mongo.db.user_stats.bulk_write([
+            UserStats.update_operation(user['_id'], user.get('role'), {
+                "rating_sum": user.get('averageRating', 0) * user['totalRides'],
+                "rating_count": user['totalRides']
+            })
+            for user in batch
+        ], ordered=False)
+        seeded += len(batch)
+    return seeded
+
+
+def completed_requests(batch_size):
+    """Completed requests still in ride_requests"""
+    return mongo.db.ride_requests.find(
+        {"status": "completed"},
+        {"rider_id": 1, "driver_id": 1, "pickup_address": 1, "destination_address": 1,
+         "estimated_fare": 1, "distance_km": 1, "completed_at": 1}
+    ).sort("completed_at", 1).batch_size(batch_size)
+
+
+def archived_rides(batch_size):
+    """Completed requests already moved to ride_history, in ride_requests shape"""
+    cursor = mongo.db.ride_history.find(
+        {"status": "completed"},
+        {"request_id": 1, "rider_id": 1, "driver_id": 1, "pickup_address": 1, "destination_address": 1,
+         "final_fare": 1, "distance_km": 1, "completed_at": 1}
+    ).sort("completed_at", 1).batch_size(batch_size)
+    for record in cursor:
+        yield dict(record, _id=record['request_id'], estimated_fare=record.get('final_fare', 0))
+
+
+def add_completed_rides(rides, batch_size, recent_limit):
+    """Fold completed rides into user_stats, one bulk write per batch"""
+    processed = 0
+    for batch in batches(rides, batch_size):
+        user_ids = {ride['rider_id'] for ride in batch} | {ride['driver_id'] for ride in batch}
+        names = {
+            user['_id']: user.get('name', 'Unknown')
+            for user in mongo.db.users.find({"_id": {"$in": list(user_ids)}}, {"name": 1})
+        }
+
+        # Several rides in a batch often belong to the same user; send one update each
+        increments = defaultdict(lambda: defaultdict(float))
+        recent = defaultdict(list)
+        for ride in batch:
+            fare = ride.get('estimated_fare', 0) or 0
+            distance_km = ride.get('distance_km', 0) or 0
+            for user_key, other_key in (('rider_id', 'driver_id'), ('driver_id', 'rider_id')):
+                key = (ride[user_key], user_key[:-3])
+                increments[key]['rides_completed'] += 1
+                increments[key]['fare_total'] += fare
+                increments[key]['distance_km_total'] += distance_km
+                recent[key].append(UserStats.recent_ride(ride, names.get(ride[other_key], 'Unknown')))
+
+        mongo.db.user_stats.bulk_write([
+            UserStats.update_operation(
+                user_id, role,
+                dict(counters, rides_completed=int(counters['rides_completed'])),
+                recent[(user_id, role)][-recent_limit:], recent_limit
+            )
+            for (user_id, role), counters in increments.items()
+        ], ordered=False)
+        processed += len(batch)
+        print(f"  ... {processed} rides")
+    return processed
+
+
+def backfill_user_stats():
+    app = create_app()
+    config = app.config
+    batch_size = config['USER_STATS_BACKFILL_BATCH_SIZE']
+
+    with app.app_context():
+        if mongo.db is None:
+            print("MONGO_URI is not configured")
+            return False
+
+        started = time.perf_counter()
+        try:
+            deleted = mongo.db.user_stats.delete_many({}).deleted_count
+            print(f"Cleared {deleted} existing user_stats documents")
+
+            seeded = seed_ratings(batch_size)
+            print(f"✓ Seeded ratings for {seeded} users")
+
+            recent_limit = config['USER_STATS_RECENT_RIDES']
+            processed = add_completed_rides(archived_rides(batch_size), batch_size, recent_limit)
+            processed += add_completed_rides(completed_requests(batch_size), batch_size, recent_limit)
+            print(f"✓ Rebuilt user_stats from {processed} completed rides "
+                  f"in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"Error during user stats backfill: {e}")
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    success = backfill_user_stats()
+    sys.exit(0 if success else 1)
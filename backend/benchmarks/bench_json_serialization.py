@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for API response serialization.
+Builds synthetic /api/rides/nearby and /api/rides/my-requests payloads of
+growing size and times jsonify with Flask's default JSON provider against the
+provider create_app installs. It first checks that provider is the orjson one
+with MONGO_URI configured (Flask-PyMongo's init_app sets a provider of its
+own). The client connects lazily, so no database needs to be running.
+
+    python benchmarks/bench_json_serialization.py
+"""
+
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+from bson.objectid import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017/campuspool')
+
+from app import create_app
+from app.utils.distance_utils import get_college_coordinates
+from app.utils.json_provider import ORJSONProvider
+
+NEARBY_SIZES = [20, 100, 500]
+MY_REQUESTS_SIZES = [20, 100, 500]
+REPEATS = 200
+
+
+def nearby_payload(n, rng):
+    campus = np.array(get_college_coordinates())
+    pickups = (campus + rng.normal(scale=0.03, size=(n, 2))).round(6).tolist()
+    destinations = (campus + rng.normal(scale=0.05, size=(n, 2))).round(6).tolist()
+    rides = [{
+        "ride_id": str(ObjectId()),
+        "driver": {
+            "name": f"Driver {i}",
+            "rating": float(rng.choice([0, 3.5, 4, 4.5, 5])),
+            "phone": "Hidden until ride accepted",
+            "vehicle": {"model": "Honda Activa", "color": "Grey"}
+        },
+        "pickup_address": f"{i} Hennur Main Road, Bengaluru, Karnataka",
+        "destination_address": "Kristu Jayanti College, K. Narayanapura, Bengaluru",
+        "pickup_coordinates": pickups[i],
+        "destination_coordinates": destinations[i],
+        "distance_km": round(float(rng.uniform(0.2, 15)), 2),
+        "smart_score": float(rng.uniform(0, 100)),
+        "suggested_fare": float(rng.integers(20, 120)),
+        "seats_available": 1
+    } for i in range(n)]
+    return {"nearby_rides": rides, "total_found": n}
+
+
+def my_requests_payload(n, raw):
+    """Formatted as the handler does today, or (raw) with ObjectIds and datetimes left in."""
+    created = datetime.datetime(2025, 1, 6, 8, 30)
+    requests = []
+    for i in range(n):
+        created_at = created - datetime.timedelta(hours=i)
+        requests.append({
+            "request_id": ObjectId() if raw else str(ObjectId()),
+            "status": "completed",
+            "driver_name": f"Driver {i % 25}",
+            "pickup_address": f"{i} Hennur Main Road, Bengaluru, Karnataka",
+            "destination_address": "Kristu Jayanti College, K. Narayanapura, Bengaluru",
+            "estimated_fare": 45,
+            "created_at": created_at if raw else created_at.strftime("%Y-%m-%d %H:%M"),
+            "otp": None
+        })
+    return {"requests": requests, "total": n}
+
+
+def time_response(app, payload):
+    with app.app_context():
+        app.json.response(payload)  # Warm up
+        started = time.perf_counter()
+        for _ in range(REPEATS):
+            response = app.json.response(payload)
+        elapsed = (time.perf_counter() - started) / REPEATS
+    return elapsed * 1000, len(response.get_data())
+
+
+def main():
+    rng = np.random.default_rng(42)
+    default_app = Flask(__name__)
+    orjson_app = create_app()
+    assert orjson_app.config.get('MONGO_URI'), "MONGO_URI must be configured for this check"
+    assert isinstance(orjson_app.json, ORJSONProvider), \
+        f"create_app installed {type(orjson_app.json).__name__}, not ORJSONProvider"
+    print(f"✓ create_app serves JSON with {type(orjson_app.json).__name__}\n")
+
+    print(f"{'payload':<28}{'bytes':>10}{'default ms':>13}{'orjson ms':>12}{'speed-up':>10}")
+    cases = [(f"/nearby x{n}", nearby_payload(n, rng), None) for n in NEARBY_SIZES]
+    cases += [(f"/my-requests x{n}", my_requests_payload(n, raw=False), None) for n in MY_REQUESTS_SIZES]
+    # Raw documents: only the orjson provider can encode ObjectId/datetime directly
+    cases += [(f"/my-requests raw x{n}", None, my_requests_payload(n, raw=True)) for n in MY_REQUESTS_SIZES]
+
+    for name, payload, raw_payload in cases:
+        if payload is not None:
+            default_ms, size = time_response(default_app, payload)
+            orjson_ms, _ = time_response(orjson_app, payload)
+            print(f"{name:<28}{size:>10}{default_ms:>13.3f}{orjson_ms:>12.3f}{default_ms / orjson_ms:>9.1f}x")
+        else:
+            orjson_ms, size = time_response(orjson_app, raw_payload)
+            print(f"{name:<28}{size:>10}{'n/a':>13}{orjson_ms:>12.3f}{'':>10}")
+
+
+if __name__ == "__main__":
+    main()
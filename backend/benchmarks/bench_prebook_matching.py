@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the batch pre-booking matcher.
+Generates synthetic requests and drivers around the campus and times the cost
+matrix build and the assignment solve for growing window sizes. Needs no database.
+
+    python benchmarks/bench_prebook_matching.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.distance_utils import get_college_coordinates
+from app.utils.prebook_matcher import build_prebook_cost_matrix, solve_prebook_assignment
+
+# (requests, drivers) per matching window
+SIZES = [(250, 100), (1000, 400), (2500, 1000), (5000, 2000)]
+WINDOW_HOURS = 24
+CONFLICT_WINDOW_SECONDS = 3600
+MAX_PER_DRIVER = 3
+
+
+def synthetic_window(n_requests, n_drivers, rng):
+    campus = np.array(get_college_coordinates())
+    # Homes scattered within roughly 20 km of campus
+    pickups = campus + rng.normal(scale=0.08, size=(n_requests, 2))
+    drivers = campus + rng.normal(scale=0.08, size=(n_drivers, 2))
+    request_times = rng.uniform(0, WINDOW_HOURS * 3600, size=n_requests)
+    rider_ratings = rng.choice([0, 3.5, 4, 4.5, 5], size=n_requests)
+    driver_ratings = rng.choice([0, 3.5, 4, 4.5, 5], size=n_drivers)
+    return pickups, request_times, rider_ratings, drivers, driver_ratings
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{'requests':>9} {'drivers':>8} {'cost matrix':>12} {'solve':>9} {'matched':>8} {'avg cost':>9}")
+
+    for n_requests, n_drivers in SIZES:
+        pickups, request_times, rider_ratings, drivers, driver_ratings = synthetic_window(
+            n_requests, n_drivers, rng
+        )
+
+        started = time.perf_counter()
+        cost = build_prebook_cost_matrix(
+            pickups, request_times / 3600, rider_ratings, drivers, driver_ratings
+        )
+        built = time.perf_counter()
+        matches = solve_prebook_assignment(
+            cost, request_times, np.full(n_drivers, MAX_PER_DRIVER), CONFLICT_WINDOW_SECONDS
+        )
+        solved = time.perf_counter()
+
+        avg_cost = np.mean([match_cost for _, _, match_cost in matches]) if matches else 0
+        print(f"{n_requests:>9} {n_drivers:>8} {built - started:>11.3f}s {solved - built:>8.3f}s "
+              f"{len(matches):>8} {avg_cost:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Landmark Matrix Builder for CampusPool
+Precomputes road distance, duration and route polyline between the popular
+destinations and a grid of zones around campus, and writes them to the
+memory-mapped file the API reads at start-up (LANDMARK_MATRIX_PATH).
+
+Directions responses are cached on disk, so re-running after a partial
+failure or a grid change only fetches the missing routes.
+
+    python build_landmark_matrix.py              # road data from Google Directions
+    python build_landmark_matrix.py --estimate   # offline estimate (no API calls, no polylines)
+
+An --estimate build is flagged as estimated in the file header, so the API
+reports its distances as "estimated" rather than road data.
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app import create_app, maps_client
+from app.utils.cache import TieredCache
+from app.utils.distance_utils import calculate_haversine_distance, calculate_eta
+from app.utils.landmark_matrix import build_matrix_nodes, write_landmark_matrix
+
+# Road distance is typically ~1.3x the straight line in Bengaluru
+ESTIMATE_ROAD_FACTOR = 1.3
+
+directions_cache = TieredCache('landmark_directions', 'LANDMARK_DIRECTIONS_CACHE',
+                               max_entries=50000, ttl_seconds=90 * 24 * 60 * 60)
+
+
+def fetch_route(origin, destination):
+    """Directions for one pair: a dict for the matrix, or None if no route."""
+    cache_key = f"{origin[1]:.6f},{origin[0]:.6f}|{destination[1]:.6f},{destination[0]:.6f}"
+    cached = directions_cache.get(cache_key)
+    if cached is not None:
+        return cached or None
+
+    response = maps_client.get('directions', {
+        'origin': f"{origin[1]},{origin[0]}",
+        'destination': f"{destination[1]},{destination[0]}",
+        'mode': 'driving'
+    })
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+    route = {}
+    if data.get('status') == 'OK' and data.get('routes'):
+        leg = data['routes'][0]['legs'][0]
+        route = {
+            'distance_m': leg['distance']['value'],
+            'duration_s': leg['duration']['value'],
+            'polyline': data['routes'][0]['overview_polyline']['points'],
+            'start_address': leg['start_address'],
+            'end_address': leg['end_address']
+        }
+
+    # Cache "no route" too (as an empty dict) so it isn't asked again
+    if data.get('status') in ('OK', 'ZERO_RESULTS', 'NOT_FOUND'):
+        directions_cache.set(cache_key, route)
+    return route or None
+
+
+def estimate_route(origin, destination):
+    distance_km = calculate_haversine_distance(origin, destination) * ESTIMATE_ROAD_FACTOR
+    return {
+        'distance_m': distance_km * 1000,
+        'duration_s': calculate_eta(distance_km, traffic_factor=1.0) * 60
+    }
+
+
+def build_matrix():
+    app = create_app()
+    config = app.config
+    estimate = '--estimate' in sys.argv[1:]
+
+    nodes, landmark_count = build_matrix_nodes(
+        config['LANDMARK_ZONE_GRID_DEG'], config['LANDMARK_ZONE_RADIUS_KM']
+    )
+    pairs = [
+        (origin, destination)
+        for origin in range(len(nodes))
+        for destination in range(len(nodes))
+        if origin != destination and (origin < landmark_count or destination < landmark_count)
+    ]
+    print(f"Building landmark matrix: {landmark_count} landmarks, {len(nodes) - landmark_count} zones, "
+          f"{len(pairs)} routes")
+
+    if not estimate:
+        if not maps_client.api_key:
+            print("Error: GOOGLE_MAPS_API_KEY not configured (use --estimate for an offline build).")
+            return False
+        directions_cache.init_app(app)
+
+    def route_for(pair):
+        origin, destination = nodes[pair[0]], nodes[pair[1]]
+        if estimate:
+            return pair, estimate_route(origin, destination)
+        try:
+            return pair, fetch_route(origin, destination)
+        except requests.RequestException as e:
+            print(f"! Failed to fetch route {pair}: {e}")
+            return pair, None
+
+    started = time.perf_counter()
+    routes = {}
+    with ThreadPoolExecutor(max_workers=config.get('MAPS_POOL_CONNECTIONS', 10)) as executor:
+        for done, (pair, route) in enumerate(executor.map(route_for, pairs), start=1):
+            if route:
+                routes[pair] = route
+            if done % 500 == 0:
+                print(f"  {done}/{len(pairs)} routes")
+
+    write_landmark_matrix(config['LANDMARK_MATRIX_PATH'], nodes, landmark_count, routes, estimated=estimate)
+    print(f"✓ Wrote {len(routes)}/{len(pairs)} {'estimated' if estimate else 'road'} routes to {config['LANDMARK_MATRIX_PATH']} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return True
+
+
+if __name__ == "__main__":
+    success = build_matrix()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Place Index Builder for CampusPool
+Converts an OpenStreetMap extract of north Bengaluru into the compact,
+memory-mapped place index used by the offline reverse geocoder
+(PLACE_INDEX_PATH).
+
+Input is GeoJSON as exported by Overpass Turbo (OSM tags as feature
+properties). Named places and suburbs become localities, named highways are
+indexed along their vertices as streets, everything else named is a point of
+interest (polygons by the mean of their outer ring). The popular destinations
+are always included.
+
+    python build_place_index.py north_bengaluru.geojson
+"""
+
+import json
+import sys
+import time
+
+from app import create_app
+from app.utils.distance_utils import get_popular_destinations
+from app.utils.offline_geocoder import write_place_index
+
+# OSM place=* values treated as localities
+LOCALITY_PLACES = {'city', 'town', 'village', 'suburb', 'quarter', 'neighbourhood', 'hamlet', 'locality'}
+
+
+def feature_points(geometry):
+    """[longitude, latitude] points indexed for a GeoJSON geometry."""
+    kind = geometry.get('type')
+    coordinates = geometry.get('coordinates') or []
+    if kind == 'Point':
+        return [coordinates]
+    if kind == 'LineString':
+        return coordinates
+    if kind == 'MultiLineString':
+        return [point for line in coordinates for point in line]
+    if kind in ('Polygon', 'MultiPolygon'):
+        ring = coordinates[0] if kind == 'Polygon' else coordinates[0][0]
+        if not ring:
+            return []
+        return [[sum(point[0] for point in ring) / len(ring), sum(point[1] for point in ring) / len(ring)]]
+    return []
+
+
+def load_places(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    places = []
+    seen = set()
+    for feature in data.get('features', []):
+        properties = feature.get('properties') or {}
+        name = properties.get('name:en') or properties.get('name')
+        if not name or not feature.get('geometry'):
+            continue
+
+        if properties.get('place') in LOCALITY_PLACES:
+            kind = 'locality'
+        elif properties.get('highway'):
+            kind = 'street'
+        else:
+            kind = 'poi'
+
+        for lng, lat in (point[:2] for point in feature_points(feature['geometry'])):
+            # Street vertices closer than ~10 m add nothing to the index
+            key = (name, kind, round(lng, 4), round(lat, 4))
+            if key not in seen:
+                seen.add(key)
+                places.append({"name": name, "kind": kind, "coordinates": [lng, lat]})
+
+    return places
+
+
+def build_index():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return False
+
+    app = create_app()
+    config = app.config
+    started = time.perf_counter()
+
+    places = load_places(sys.argv[1])
+    places.extend(
+        {"name": place['name'], "kind": 'poi', "coordinates": place['coordinates']}
+        for place in get_popular_destinations()
+    )
+    counts = {kind: sum(place['kind'] == kind for place in places) for kind in ('locality', 'street', 'poi')}
+    print(f"Indexing {len(places)} points: {counts['locality']} localities, "
+          f"{counts['street']} street points, {counts['poi']} places")
+
+    write_place_index(config['PLACE_INDEX_PATH'], places, config['PLACE_INDEX_GRID_DEG'])
+    print(f"✓ Wrote place index to {config['PLACE_INDEX_PATH']} in {time.perf_counter() - started:.1f}s")
+    return True
+
+
+if __name__ == "__main__":
+    success = build_index()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Query Count Check for CampusPool
+Runs the handlers that read users and profiles through the request-scoped
+DataLoaders (app.utils.dataloader) and fails if any of them queries users or
+user_profiles more than once per request.
+
+It seeds a rider, a driver and their ride requests and pre-bookings into the
+database named by MONGO_URI, then removes them again. Point it at a scratch
+database, not production:
+
+    MONGO_URI=mongodb://localhost:27017/campuspool_check python check_query_counts.py
+"""
+
+import datetime
+import os
+import sys
+import uuid
+from collections import Counter
+
+from bson.objectid import ObjectId
+
+# The query listener must be registered before create_app creates the client
+os.environ['MONGO_COUNT_QUERIES'] = 'true'
+os.environ.setdefault('SECRET_KEY', uuid.uuid4().hex)
+
+from app import create_app, mongo
+from app.utils.dataloader import query_counter
+from app.utils.jwt_utils import generate_jwt_token
+
+# The collections the loaders are responsible for
+LOADED_COLLECTIONS = ('users', 'user_profiles')
+
+
+def point(coordinates):
+    return {"type": "Point", "coordinates": coordinates}
+
+
+def seed(now):
+    """Insert the documents the checked handlers read; returns their ids by name"""
+    tag = uuid.uuid4().hex[:8]
+    ids = {name: ObjectId() for name in (
+        'rider', 'driver', 'ride', 'request', 'prebook_open', 'prebook_matched', 'prebook_proposed'
+    )}
+    pickup, campus = [77.6101, 13.0245], [77.6407, 13.0587]
+
+    for role in ('rider', 'driver'):
+        mongo.db.users.insert_one({
+            "_id": ids[role], "name": f"Query Check {role.title()}", "email": f"querycheck-{role}-{tag}@example.com",
+            "role": role, "homeLocation": point(pickup), "averageRating": 4.0, "totalRides": 2,
+            "created_at": now
+        })
+        mongo.db.user_profiles.insert_one({
+            "user_id": ids[role], "phone_number": "9000000000",
+            "vehicle_model": "Honda Activa", "vehicle_color": "Grey"
+        })
+
+    mongo.db.rides.insert_one({
+        "_id": ids['ride'], "driver_id": ids['driver'], "status": "active",
+        "pickup_location": point(pickup), "destination_location": point(campus),
+        "pickup_address": "Hennur Main Road", "destination_address": "Kristu Jayanti College",
+        "seats_available": 1, "stops": [], "schedule_version": 0, "created_at": now, "updated_at": now
+    })
+    mongo.db.ride_requests.insert_one({
+        "_id": ids['request'], "rider_id": ids['rider'], "driver_id": ids['driver'], "status": "accepted",
+        "pickup_location": point(pickup), "destination_location": point(campus),
+        "pickup_address": "Hennur Main Road", "destination_address": "Kristu Jayanti College",
+        "estimated_fare": 45, "distance_km": 4.6, "otp": "1234", "created_at": now, "updated_at": now
+    })
+
+    # A day apart, so accepting the open one does not conflict with the matched one
+    for days, (name, status, extra) in enumerate((
+            ('prebook_open', 'open', {}),
+            ('prebook_matched', 'matched', {"matched_driver_id": ids['driver']}),
+            ('prebook_proposed', 'open', {"proposed_driver_id": ids['driver'], "proposed_at": now})), start=2):
+        mongo.db.prebook_requests.insert_one(dict({
+            "_id": ids[name], "rider_id": ids['rider'], "status": status,
+            "pickup_location": point(pickup), "destination_location": point(campus),
+            "pickup_address": "Hennur Main Road", "destination_address": "Kristu Jayanti College",
+            "requested_datetime": now + datetime.timedelta(days=days),
+            "estimated_fare": 45, "created_at": now, "updated_at": now
+        }, **extra))
+    return ids
+
+
+def cleanup(ids):
+    users = [ids['rider'], ids['driver']]
+    mongo.db.users.delete_many({"_id": {"$in": users}})
+    mongo.db.user_profiles.delete_many({"user_id": {"$in": users}})
+    mongo.db.user_stats.delete_many({"_id": {"$in": users}})
+    mongo.db.rides.delete_many({"driver_id": ids['driver']})
+    mongo.db.ride_requests.delete_many({"rider_id": ids['rider']})
+    mongo.db.ride_history.delete_many({"rider_id": ids['rider']})
+    mongo.db.prebook_requests.delete_many({"rider_id": ids['rider']})
+
+
+def check_query_counts():
+    app = create_app()
+    if not app.config.get('MONGO_URI'):
+        print("Error: MONGO_URI not found in environment variables.")
+        return False
+
+    client = app.test_client()
+    now = datetime.datetime.utcnow()
+
+    with app.app_context():
+        ids = seed(now)
+        headers = {
+            role: {"Authorization": f"Bearer {generate_jwt_token(ids[role], f'{role}@example.com', role)}"}
+            for role in ('rider', 'driver')
+        }
+
+    # (description, role, method, path, JSON body), run in this order
+    checks = [
+        ("request status", 'rider', 'GET', f"/api/rides/request-status/{ids['request']}", None),
+        ("rider's requests", 'rider', 'GET', "/api/rides/my-requests", None),
+        ("driver's pending requests", 'driver', 'GET', "/api/rides/requests", None),
+        ("active ride (rider)", 'rider', 'GET', "/api/rides/active-ride", None),
+        ("active ride (driver)", 'driver', 'GET', "/api/rides/active-ride", None),
+        ("accept pre-booking", 'driver', 'POST', f"/api/rides/prebook/accept/{ids['prebook_open']}", None),
+        ("rider's pre-bookings", 'rider', 'GET', "/api/rides/prebook/my-requests", None),
+        ("driver's accepted pre-bookings", 'driver', 'GET', "/api/rides/prebook/my-accepted", None),
+        ("pre-booking proposals", 'driver', 'GET', "/api/rides/prebook/proposals", None),
+        ("profile", 'rider', 'GET', "/api/profiles/get", None),
+        ("driver info", 'rider', 'GET', f"/api/profiles/driver-info/{ids['driver']}", None),
+        ("profile statistics", 'driver', 'GET', "/api/profiles/statistics", None),
+        ("complete ride", 'driver', 'POST', "/api/rides/complete-ride",
+         {"request_id": str(ids['request']), "ratings": {"rider_rating": 5}}),
+    ]
+
+    success = True
+    try:
+        for description, role, method, path, body in checks:
+            if description == "complete ride":
+                with app.app_context():
+                    mongo.db.ride_requests.update_one(
+                        {"_id": ids['request']}, {"$set": {"status": "started", "started_at": now}}
+                    )
+            try:
+                with query_counter.assert_max_queries(collections=LOADED_COLLECTIONS) as counter:
+                    response = client.open(path, method=method, headers=headers[role], json=body)
+            except AssertionError as e:
+                print(f"✗ {description}: {e}")
+                success = False
+                continue
+
+            queries = Counter()
+            for (command, collection), count in counter.items():
+                if collection in LOADED_COLLECTIONS:
+                    queries[collection] += count
+            if response.status_code >= 400:
+                print(f"✗ {description}: HTTP {response.status_code} {response.get_json()}")
+                success = False
+            else:
+                print(f"✓ {description}: {dict(queries) or 'no user/profile queries'}")
+    finally:
+        with app.app_context():
+            cleanup(ids)
+
+    return success
+
+
+if __name__ == "__main__":
+    success = check_query_counts()
+    sys.exit(0 if success else 1)
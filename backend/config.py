@@ -9,7 +9,109 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     MONGO_URI = os.environ.get('MONGO_URI')
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
+    MONGO_COUNT_QUERIES = os.environ.get('MONGO_COUNT_QUERIES', 'false').lower() == 'true'  # Per-thread query counting for tests
     
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('SECRET_KEY')  # Use same secret key
-    JWT_ACCESS_TOKEN_EXPIRES = 24 * 60 * 60  # 24 hours in seconds
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = 24 * 60 * 60  # 24 hours in seconds
+    JWT_CACHE_MAX_ENTRIES = int(os.environ.get('JWT_CACHE_MAX_ENTRIES', 10000))  # Verified tokens kept by token_required
+    JWT_REVOCATION_REFRESH_SECONDS = int(os.environ.get('JWT_REVOCATION_REFRESH_SECONDS', 5))  # How quickly other workers see a logout
+
+    # Live ride spatial index (in-memory grid serving /api/rides/nearby)
+    LIVE_INDEX_CELL_DEG = float(os.environ.get('LIVE_INDEX_CELL_DEG', 0.02))  # ~2 km grid cells
+    LIVE_INDEX_RESYNC_SECONDS = int(os.environ.get('LIVE_INDEX_RESYNC_SECONDS', 30))  # Reload from MongoDB
+
+    # Local cache directory for persistent (SQLite) caches of Google Maps responses
+    CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(basedir, 'backend', 'cache'))
+
+    # Reverse geocode cache
+    GEOCODE_CACHE_GRID_DEG = float(os.environ.get('GEOCODE_CACHE_GRID_DEG', 0.0005))  # ~55 m cells
+    GEOCODE_CACHE_TTL_SECONDS = int(os.environ.get('GEOCODE_CACHE_TTL_SECONDS', 30 * 24 * 60 * 60))  # 30 days
+    GEOCODE_CACHE_MAX_ENTRIES = int(os.environ.get('GEOCODE_CACHE_MAX_ENTRIES', 10000))
+
+    # Offline reverse geocoder (place index built by build_place_index.py, loaded on first use)
+    PLACE_INDEX_PATH = os.environ.get('PLACE_INDEX_PATH', os.path.join(CACHE_DIR, 'place_index.bin'))
+    PLACE_INDEX_GRID_DEG = float(os.environ.get('PLACE_INDEX_GRID_DEG', 0.005))  # ~550 m cells
+    OFFLINE_GEOCODE_MAX_DISTANCE_M = float(os.environ.get('OFFLINE_GEOCODE_MAX_DISTANCE_M', 150))
+
+    # Distance matrix per-cell cache and request chunking
+    DISTANCE_MATRIX_CACHE_GRID_DEG = float(os.environ.get('DISTANCE_MATRIX_CACHE_GRID_DEG', 0.001))  # ~110 m cells
+    DISTANCE_MATRIX_CACHE_TTL_SECONDS = int(os.environ.get('DISTANCE_MATRIX_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60))  # 7 days
+    DISTANCE_MATRIX_CACHE_MAX_ENTRIES = int(os.environ.get('DISTANCE_MATRIX_CACHE_MAX_ENTRIES', 50000))
+    DISTANCE_MATRIX_MAX_ELEMENTS = int(os.environ.get('DISTANCE_MATRIX_MAX_ELEMENTS', 100))  # Provider limit per request
+    DISTANCE_MATRIX_MAX_WORKERS = int(os.environ.get('DISTANCE_MATRIX_MAX_WORKERS', 4))
+
+    # Directions cache (stale-while-revalidate) and provider circuit breaker
+    DIRECTIONS_CACHE_GRID_DEG = float(os.environ.get('DIRECTIONS_CACHE_GRID_DEG', 0.001))  # ~110 m cells
+    DIRECTIONS_CACHE_FRESH_SECONDS = int(os.environ.get('DIRECTIONS_CACHE_FRESH_SECONDS', 24 * 60 * 60))  # Refreshed in the background after 1 day
+    DIRECTIONS_CACHE_TTL_SECONDS = int(os.environ.get('DIRECTIONS_CACHE_TTL_SECONDS', 30 * 24 * 60 * 60))  # Served stale for up to 30 days
+    DIRECTIONS_CACHE_MAX_ENTRIES = int(os.environ.get('DIRECTIONS_CACHE_MAX_ENTRIES', 20000))
+    DIRECTIONS_CACHE_TIME_BUCKET_MINUTES = int(os.environ.get('DIRECTIONS_CACHE_TIME_BUCKET_MINUTES', 0))  # 0 = one route for all times of day
+    DIRECTIONS_FALLBACK_AFTER_SECONDS = float(os.environ.get('DIRECTIONS_FALLBACK_AFTER_SECONDS', 3))
+    DIRECTIONS_BREAKER_FAILURES = int(os.environ.get('DIRECTIONS_BREAKER_FAILURES', 5))
+    DIRECTIONS_BREAKER_RESET_SECONDS = int(os.environ.get('DIRECTIONS_BREAKER_RESET_SECONDS', 30))
+    DIRECTIONS_MAX_WORKERS = int(os.environ.get('DIRECTIONS_MAX_WORKERS', 4))
+
+    # Places autocomplete prefix trie
+    AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('AUTOCOMPLETE_MAX_ENTRIES', 20000))  # Provider places kept in the trie
+    AUTOCOMPLETE_MAX_RESULTS = int(os.environ.get('AUTOCOMPLETE_MAX_RESULTS', 5))
+    AUTOCOMPLETE_MIN_LOCAL_RESULTS = int(os.environ.get('AUTOCOMPLETE_MIN_LOCAL_RESULTS', 3))  # Fewer local matches go to Google
+    AUTOCOMPLETE_SAVED_PLACES_TTL_SECONDS = int(os.environ.get('AUTOCOMPLETE_SAVED_PLACES_TTL_SECONDS', 600))
+
+    # Google Maps HTTP client (pooled keep-alive session shared by /api/maps)
+    MAPS_API_BASE_URL = os.environ.get('MAPS_API_BASE_URL', 'https://maps.googleapis.com')
+    MAPS_POOL_CONNECTIONS = int(os.environ.get('MAPS_POOL_CONNECTIONS', 10))
+    MAPS_POOL_MAXSIZE = int(os.environ.get('MAPS_POOL_MAXSIZE', 20))
+    MAPS_MAX_RETRIES = int(os.environ.get('MAPS_MAX_RETRIES', 2))
+    MAPS_BACKOFF_BASE_SECONDS = float(os.environ.get('MAPS_BACKOFF_BASE_SECONDS', 0.2))
+    MAPS_BACKOFF_MAX_SECONDS = float(os.environ.get('MAPS_BACKOFF_MAX_SECONDS', 2.0))
+    MAPS_TIMEOUTS = {  # Seconds per endpoint
+        'geocode': 10,
+        'autocomplete': 10,
+        'place_details': 10,
+        'directions': 15,
+        'distance_matrix': 15
+    }
+
+    # Server-Sent Events (GET /api/rides/stream)
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    SSE_MAX_QUEUE_SIZE = int(os.environ.get('SSE_MAX_QUEUE_SIZE', 100))
+
+    # Driver location write-behind buffer
+    LOCATION_FLUSH_INTERVAL_SECONDS = float(os.environ.get('LOCATION_FLUSH_INTERVAL_SECONDS', 5))
+
+    # In-memory ride trajectories (app.utils.trajectory)
+    TRAJECTORY_MAX_POINTS = int(os.environ.get('TRAJECTORY_MAX_POINTS', 20000))
+    TRAJECTORY_IDLE_MINUTES = float(os.environ.get('TRAJECTORY_IDLE_MINUTES', 30))
+
+    # Batch pre-booking matcher (match_prebookings.py)
+    PREBOOK_MATCH_INTERVAL_MINUTES = int(os.environ.get('PREBOOK_MATCH_INTERVAL_MINUTES', 10))
+    PREBOOK_MATCH_WINDOW_HOURS = int(os.environ.get('PREBOOK_MATCH_WINDOW_HOURS', 24))
+    PREBOOK_MATCH_MAX_DISTANCE_KM = float(os.environ.get('PREBOOK_MATCH_MAX_DISTANCE_KM', 25))
+    PREBOOK_MATCH_MAX_PER_DRIVER = int(os.environ.get('PREBOOK_MATCH_MAX_PER_DRIVER', 3))
+    PREBOOK_CONFLICT_WINDOW_MINUTES = int(os.environ.get('PREBOOK_CONFLICT_WINDOW_MINUTES', 60))
+
+    # Route-corridor matching
+    ROUTE_SIMPLIFY_TOLERANCE_M = float(os.environ.get('ROUTE_SIMPLIFY_TOLERANCE_M', 30))
+    CORRIDOR_WIDTH_KM = float(os.environ.get('CORRIDOR_WIDTH_KM', 1.5))
+    CORRIDOR_MAX_DETOUR_KM = float(os.environ.get('CORRIDOR_MAX_DETOUR_KM', 5))
+
+    # Pooled rides: extra kilometres a driver's schedule may add to their direct route
+    POOL_DETOUR_BUDGET_KM = float(os.environ.get('POOL_DETOUR_BUDGET_KM', 6))
+
+    # Precomputed road distance/ETA matrix for popular destinations (built by build_landmark_matrix.py)
+    LANDMARK_MATRIX_PATH = os.environ.get('LANDMARK_MATRIX_PATH', os.path.join(CACHE_DIR, 'landmark_matrix.bin'))
+    LANDMARK_ZONE_GRID_DEG = float(os.environ.get('LANDMARK_ZONE_GRID_DEG', 0.01))  # ~1.1 km zones
+    LANDMARK_ZONE_RADIUS_KM = float(os.environ.get('LANDMARK_ZONE_RADIUS_KM', 12))
+    LANDMARK_SNAP_RADIUS_KM = float(os.environ.get('LANDMARK_SNAP_RADIUS_KM', 0.5))
+
+    # Materialized per-user statistics (user_stats, rebuilt by backfill_user_stats.py)
+    USER_STATS_RECENT_RIDES = int(os.environ.get('USER_STATS_RECENT_RIDES', 5))
+    USER_STATS_BACKFILL_BATCH_SIZE = int(os.environ.get('USER_STATS_BACKFILL_BATCH_SIZE', 1000))
+
+    # Ride archival (archive_rides.py): finished requests move from ride_requests to ride_history
+    RIDE_ARCHIVE_AFTER_MINUTES = int(os.environ.get('RIDE_ARCHIVE_AFTER_MINUTES', 60))  # Leave time for status polling
+    RIDE_ARCHIVE_BATCH_SIZE = int(os.environ.get('RIDE_ARCHIVE_BATCH_SIZE', 500))
+    RIDE_ARCHIVE_INTERVAL_MINUTES = int(os.environ.get('RIDE_ARCHIVE_INTERVAL_MINUTES', 10))
+    RIDE_HISTORY_RECENT_LIMIT = int(os.environ.get('RIDE_HISTORY_RECENT_LIMIT', 20))  # Archived rows in /my-requests
+    CANCELLED_REQUEST_TTL_HOURS = int(os.environ.get('CANCELLED_REQUEST_TTL_HOURS', 24))
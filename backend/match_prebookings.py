@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Batch Pre-booking Matcher for CampusPool
+Proposes driver matches for all open pre-booking requests in one global pass,
+instead of leaving drivers to accept requests one at a time.
+Run it once, or leave it running to re-match every PREBOOK_MATCH_INTERVAL_MINUTES:
+
+    python match_prebookings.py          # loop
+    python match_prebookings.py --once   # single run
+"""
+
+import calendar
+import datetime
+import sys
+import time
+
+import numpy as np
+
+from app import create_app
+from app.models.ride_model import PreBookRequest
+from app.models.user_model import User
+from app.utils.prebook_matcher import (
+    build_prebook_cost_matrix, block_time_conflicts, solve_prebook_assignment
+)
+
+
+def _epoch_seconds(timestamps):
+    return np.array([calendar.timegm(t.utctimetuple()) for t in timestamps], dtype=float)
+
+
+def match_prebook_requests(config, now=None):
+    """
+    Propose matches for every open pre-booking request in the next matching window.
+
+    Returns:
+        (number of open requests, number of proposals)
+    """
+    now = now or datetime.datetime.utcnow()
+    window_end = now + datetime.timedelta(hours=config['PREBOOK_MATCH_WINDOW_HOURS'])
+    conflict_window = datetime.timedelta(minutes=config['PREBOOK_CONFLICT_WINDOW_MINUTES'])
+
+    requests = PreBookRequest.find_open_in_window(now, window_end)
+    drivers = User.find_drivers_for_matching()
+    if not requests or not drivers:
+        PreBookRequest.save_proposals([req['_id'] for req in requests], [])
+        return len(requests), 0
+
+    request_times = _epoch_seconds([req['requested_datetime'] for req in requests])
+    cost = build_prebook_cost_matrix(
+        [req['pickup_location']['coordinates'] for req in requests],
+        (request_times - calendar.timegm(now.utctimetuple())) / 3600,
+        [req.get('rider_rating', 0) for req in requests],
+        [driver['homeLocation']['coordinates'] for driver in drivers],
+        [driver.get('averageRating', 0) for driver in drivers],
+        config['PREBOOK_MATCH_MAX_DISTANCE_KM']
+    )
+
+    # Rides drivers already accepted use up capacity and block clashing times
+    driver_columns = {driver['_id']: column for column, driver in enumerate(drivers)}
+    capacity = np.full(len(drivers), config['PREBOOK_MATCH_MAX_PER_DRIVER'])
+    busy = [
+        (driver_columns[ride['matched_driver_id']], ride['requested_datetime'])
+        for ride in PreBookRequest.find_matched_in_window(now - conflict_window, window_end + conflict_window)
+        if ride.get('matched_driver_id') in driver_columns
+    ]
+    if busy:
+        busy_columns = np.array([column for column, _ in busy])
+        np.subtract.at(capacity, busy_columns, 1)
+        block_time_conflicts(cost, request_times, busy_columns,
+                             _epoch_seconds([when for _, when in busy]),
+                             conflict_window.total_seconds())
+
+    matches = solve_prebook_assignment(
+        cost, request_times, np.maximum(capacity, 0), conflict_window.total_seconds()
+    )
+
+    PreBookRequest.save_proposals(
+        [req['_id'] for req in requests],
+        [(requests[row]['_id'], drivers[column]['_id'], match_cost) for row, column, match_cost in matches]
+    )
+    return len(requests), len(matches)
+
+
+def main():
+    app = create_app()
+    run_once = '--once' in sys.argv[1:]
+    interval_seconds = app.config['PREBOOK_MATCH_INTERVAL_MINUTES'] * 60
+
+    with app.app_context():
+        while True:
+            started = time.perf_counter()
+            try:
+                open_count, proposal_count = match_prebook_requests(app.config)
+                print(f"✓ Proposed {proposal_count} matches for {open_count} open pre-bookings "
+                      f"in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                print(f"Error during pre-booking matching: {e}")
+                if run_once:
+                    return False
+
+            if run_once:
+                return True
+            time.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -34,7 +34,8 @@ def setup_database():
         # Create collections if they don't exist
         collections_to_create = [
                     'users', 'rides', 'ride_requests', 'user_profiles', 
-                    'ride_history', 'ratings', 'notifications', 'prebook_requests'  # ADD THIS
+                    'ride_history', 'ratings', 'notifications', 'prebook_requests',  # ADD THIS
+                    'ride_trajectories', 'revoked_tokens', 'user_stats'
                 ]        
         for collection_name in collections_to_create:
             if collection_name not in db.list_collection_names():
@@ -58,6 +59,10 @@ def setup_database():
         db.ride_requests.create_index([("pickup_location", "2dsphere")])
         print("✓ Created 2dsphere index on ride_requests.pickup_location")
         
+        # Pre-booking requests - for finding requests near a driver
+        db.prebook_requests.create_index([("pickup_location", "2dsphere")])
+        print("✓ Created 2dsphere index on prebook_requests.pickup_location")
+        
         # Create performance indexes
         print("\n⚡ Creating performance indexes...")
         
@@ -105,6 +110,12 @@ def setup_database():
             print("✓ Created compound index on prebook_requests.status + requested_datetime")
         except Exception as e:
             print(f"! Pre-booking status+datetime index may already exist: {e}")
+            
+        try:
+            db.prebook_requests.create_index([("proposed_driver_id", ASCENDING), ("status", ASCENDING)])
+            print("✓ Created compound index on prebook_requests.proposed_driver_id + status")
+        except Exception as e:
+            print(f"! Pre-booking proposal index may already exist: {e}")
 
         # Create additional useful indexes
         print("\nCreating additional indexes...")
@@ -117,10 +128,51 @@ def setup_database():
         db.ride_requests.create_index([("driver_id", 1), ("status", 1)])
         print("✓ Created compound index on ride_requests.driver_id + ride_requests.status")
         
+        # One open (pending or accepted) request per rider, enforced by RideStateMachine's lock field
+        locked_riders = set()
+        for open_request in db.ride_requests.find(
+                {"status": {"$in": ["pending", "accepted"]}}, {"rider_id": 1}).sort("created_at", -1):
+            if open_request['rider_id'] not in locked_riders:
+                locked_riders.add(open_request['rider_id'])
+                db.ride_requests.update_one(
+                    {"_id": open_request['_id']}, {"$set": {"open_rider_id": open_request['rider_id']}}
+                )
+        db.ride_requests.create_index(
+            [("open_rider_id", 1)], unique=True,
+            partialFilterExpression={"open_rider_id": {"$exists": True}}
+        )
+        print(f"✓ Created unique index on ride_requests.open_rider_id ({len(locked_riders)} open requests locked)")
+
+        # Cancelled requests are deleted by TTL; give existing ones the same lifetime from their last update
+        ttl_ms = int(os.getenv('CANCELLED_REQUEST_TTL_HOURS', 24)) * 60 * 60 * 1000
+        db.ride_requests.update_many(
+            {"status": "cancelled", "expires_at": {"$exists": False}},
+            [{"$set": {"expires_at": {"$add": [{"$ifNull": ["$updated_at", "$created_at"]}, ttl_ms]}}}]
+        )
+        db.ride_requests.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        print("✓ Created TTL index on ride_requests.expires_at (cancelled requests)")
+
+        # Finished requests are moved to ride_history by archive_rides.py
+        db.ride_requests.create_index([("status", 1), ("updated_at", 1)])
+        db.ride_history.create_index([("request_id", 1)], unique=True)
+        db.ride_history.create_index([("rider_id", 1), ("requested_at", -1)])
+        db.ride_history.create_index([("driver_id", 1), ("requested_at", -1)])
+        print("✓ Created archival index on ride_requests.status + updated_at and ride_history indexes")
+
         # Index for user profiles
         db.user_profiles.create_index([("user_id", 1)], unique=True)
         print("✓ Created unique index on user_profiles.user_id")
         
+        # One recorded path per ride request
+        db.ride_trajectories.create_index([("request_id", 1)], unique=True)
+        print("✓ Created unique index on ride_trajectories.request_id")
+        
+        # Revoked token IDs, removed automatically once the token would have expired anyway
+        db.revoked_tokens.create_index([("jti", 1)], unique=True)
+        db.revoked_tokens.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        db.revoked_tokens.create_index([("revoked_at", 1)])
+        print("✓ Created unique index on revoked_tokens.jti, TTL index on expires_at and index on revoked_at")
+        
         # Index for email uniqueness (if not already exists)
         try:
             db.users.create_index([("email", 1)], unique=True)
@@ -7,8 +7,11 @@ let destinationCoordinates = null;
 let currentLocation = null;
 let activeRideId = null;
 let requestsRefreshInterval = null;
+let requestsEventSource = null;
 let acceptedRequestId = null;
 let locationTrackingInterval = null;
+let liveLocationSocket = null;
+let riderLocationMarker = null;
 let currentOTP = null;
 
 // College coordinates (Kristu Jayanti College)
@@ -106,6 +109,7 @@ async function checkForActiveRide() {
             if (rideInfo.status === 'accepted' || rideInfo.status === 'started') {
                 acceptedRequestId = rideInfo.request_id;
                 currentOTP = rideInfo.otp;
+                openLiveLocationChannel(acceptedRequestId);
                 
                 // Show active ride section
                 showActiveRideSection(rideInfo);
@@ -459,13 +463,26 @@ async function startAcceptingRequests() {
         const seatsAvailable = document.getElementById('available-seats').value;
         const helperMessage = document.getElementById('helper-message').value;
         
+        // Send the driving route so riders along the way can find this ride
+        let routePolyline = null;
+        try {
+            const directions = await apiCall('/maps/directions', 'POST', {
+                origin: { lat: pickupCoordinates[1], lng: pickupCoordinates[0] },
+                destination: { lat: destinationCoordinates[1], lng: destinationCoordinates[0] }
+            });
+            routePolyline = directions.route ? directions.route.polyline : null;
+        } catch (error) {
+            console.warn('Route lookup failed, going live with a straight-line route:', error);
+        }
+        
         const response = await apiCall('/rides/go-live', 'POST', {
             pickup_location: pickupCoordinates,
             destination_location: destinationCoordinates,
             pickup_address: 'Current Location', // Auto-detected location
             destination_address: document.getElementById('destination-input').value,
             seats_available: parseInt(seatsAvailable),
-            helper_message: helperMessage
+            helper_message: helperMessage,
+            route_polyline: routePolyline
         });
 
         activeRideId = response.ride_id;
@@ -516,6 +533,7 @@ async function goOffline() {
         // Update state
         isOnline = false;
         activeRideId = null;
+        closeLiveLocationChannel();
         acceptedRequestId = null;
         currentOTP = null;
         
@@ -551,18 +569,48 @@ async function goOffline() {
     }
 }
 
-// Start polling for ride requests
+// Start listening for ride requests.
+// Uses the server-sent event stream when available and falls back to polling.
 function startRequestsPolling() {
     loadRideRequests(); // Load immediately
     
+    if (window.EventSource) {
+        if (requestsEventSource) return; // Already listening
+        
+        requestsEventSource = new EventSource(`${API_URL}/rides/stream?token=${encodeURIComponent(getAuthToken())}`);
+        
+        // New, cancelled or updated requests - refresh the list
+        requestsEventSource.addEventListener('status', () => {
+            loadRideRequests();
+        });
+        
+        requestsEventSource.onerror = () => {
+            // The browser retries automatically; poll only if the stream is gone for good
+            if (requestsEventSource && requestsEventSource.readyState === EventSource.CLOSED) {
+                requestsEventSource = null;
+                startRequestsIntervalPolling();
+            }
+        };
+        return;
+    }
+    
+    startRequestsIntervalPolling();
+}
+
+// Fallback: poll for requests on a timer
+function startRequestsIntervalPolling() {
     // Poll every 8 seconds
     requestsRefreshInterval = setInterval(() => {
         loadRideRequests();
     }, 8000);
 }
 
-// Stop polling for requests
+// Stop listening for requests (event stream and polling)
 function stopRequestsPolling() {
+    if (requestsEventSource) {
+        requestsEventSource.close();
+        requestsEventSource = null;
+    }
     if (requestsRefreshInterval) {
         clearInterval(requestsRefreshInterval);
         requestsRefreshInterval = null;
@@ -669,6 +717,7 @@ window.respondToRequest = async function(requestId, action) {
         if (action === 'accept') {
             acceptedRequestId = requestId;
             currentOTP = response.otp;
+            openLiveLocationChannel(acceptedRequestId);
             
             // Hide requests card
             const requestsCard = document.getElementById('requests-card');
@@ -881,6 +930,7 @@ async function completeRide() {
         showStatus('🎉 Ride completed successfully! Thank you for helping the community!', 'success');
         
         // Reset state
+        closeLiveLocationChannel();
         acceptedRequestId = null;
         currentOTP = null;
         
@@ -1240,6 +1290,16 @@ function startLocationTracking() {
             navigator.geolocation.getCurrentPosition(
                 async (position) => {
                     const { latitude, longitude } = position.coords;
+                    
+                    // During an accepted ride, send over the live channel instead of HTTP
+                    if (liveLocationSocket && liveLocationSocket.readyState === WebSocket.OPEN) {
+                        liveLocationSocket.send(JSON.stringify({
+                            type: 'location',
+                            coordinates: [longitude, latitude]
+                        }));
+                        return;
+                    }
+                    
                     try {
                         await apiCall('/rides/update-location', 'POST', {
                             current_location: [longitude, latitude]
@@ -1256,6 +1316,54 @@ function startLocationTracking() {
     }, 10000); // Every 10 seconds
 }
 
+// Live location channel with the rider of the accepted request
+function openLiveLocationChannel(requestId) {
+    if (!window.WebSocket || !requestId) return;
+    closeLiveLocationChannel();
+    
+    const wsUrl = `${API_URL.replace(/^http/, 'ws')}/rides/live/${requestId}?token=${encodeURIComponent(getAuthToken())}`;
+    liveLocationSocket = new WebSocket(wsUrl);
+    
+    liveLocationSocket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'location' && message.role === 'rider') {
+            showRiderLocation(message.coordinates);
+        }
+    };
+    
+    liveLocationSocket.onclose = () => {
+        liveLocationSocket = null; // Location updates fall back to HTTP
+    };
+}
+
+function closeLiveLocationChannel() {
+    if (liveLocationSocket) {
+        liveLocationSocket.onclose = null;
+        liveLocationSocket.close();
+        liveLocationSocket = null;
+    }
+    if (riderLocationMarker) {
+        riderLocationMarker.setMap(null);
+        riderLocationMarker = null;
+    }
+}
+
+// Show the rider's shared position on the map
+function showRiderLocation(riderCoords) {
+    if (!map || !riderCoords) return;
+    
+    const position = { lat: riderCoords[1], lng: riderCoords[0] };
+    if (riderLocationMarker) {
+        riderLocationMarker.setPosition(position);
+    } else {
+        riderLocationMarker = new google.maps.Marker({
+            position: position,
+            map: map,
+            title: 'Your Rider'
+        });
+    }
+}
+
 function stopLocationTracking() {
     if (locationTrackingInterval) {
         clearInterval(locationTrackingInterval);
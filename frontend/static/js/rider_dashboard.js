@@ -13,7 +13,9 @@ let statusPollingInterval = null;
 let driverTrackingInterval = null;
 let ridesRefreshPolling = null;
 let rideStatusPolling = null;
+let rideEventSource = null;
 let liveDriverMarker = null;
+let liveLocationSocket = null;
 let directionsRenderer = null;
 
 // College coordinates (Kristu Jayanti College)
@@ -533,7 +535,9 @@ async function searchForRides() {
     hideStatus();
 
     try {
+        // Corridor search: drivers whose route passes near the pickup, least detour first
         const response = await apiCall('/rides/nearby', 'POST', {
+            mode: 'corridor',
             current_location: pickupCoordinates,
             destination_location: destinationCoordinates,
             max_distance_km: 15
@@ -743,6 +747,7 @@ function showRequestModal(ride) {
                 <p><strong>📍 Your Pickup:</strong> ${pickupInput?.value || 'Not set'}</p>
                 <p><strong>🎯 Your Destination:</strong> ${destinationInput?.value || 'Not set'}</p>
                 <p><strong>📏 Distance to Driver:</strong> ${ride.distance_km} km away</p>
+                ${ride.detour_km !== undefined ? `<p><strong>↪️ Driver's Detour:</strong> ${ride.detour_km} km</p>` : ''}
                 <p><strong>💰 Split Cost:</strong> <span style="color: var(--primary-color); font-weight: bold;">₹${ride.suggested_fare}</span></p>
                 <p><strong>🚗 Driver's Route:</strong> ${ride.pickup_address} → ${ride.destination_address}</p>
             </div>
@@ -1250,6 +1255,7 @@ function startRidesRefreshPolling() {
                     // Refresh available rides silently (without showing loading)
                     console.log('Refreshing available rides...');
                     const response = await apiCall('/rides/nearby', 'POST', {
+                        mode: 'corridor',
                         current_location: pickupCoordinates,
                         destination_location: destinationCoordinates,
                         max_distance_km: 15
@@ -1639,12 +1645,46 @@ async function submitRideRequest(rideId) {
 
 // Test function removed - use real data only
 
-// Start polling for ride status updates
+// Start listening for ride status updates.
+// Uses the server-sent event stream when available and falls back to polling.
 function startRideStatusPolling() {
     if (rideStatusPolling) {
         clearInterval(rideStatusPolling);
+        rideStatusPolling = null;
     }
     
+    if (window.EventSource) {
+        if (rideEventSource) return; // Already listening
+        
+        rideEventSource = new EventSource(`${API_URL}/rides/stream?token=${encodeURIComponent(getAuthToken())}`);
+        
+        rideEventSource.addEventListener('status', async (event) => {
+            const update = JSON.parse(event.data);
+            if (activeRequestId && update.request_id === activeRequestId) {
+                await checkRideStatus(); // Fetch full details once per transition
+            }
+        });
+        
+        rideEventSource.onopen = () => {
+            // Catch up on anything that changed while we were disconnected
+            if (activeRequestId) checkRideStatus();
+        };
+        
+        rideEventSource.onerror = () => {
+            // The browser retries automatically; poll only if the stream is gone for good
+            if (rideEventSource && rideEventSource.readyState === EventSource.CLOSED) {
+                rideEventSource = null;
+                startStatusIntervalPolling();
+            }
+        };
+        return;
+    }
+    
+    startStatusIntervalPolling();
+}
+
+// Fallback: poll the request status on a timer
+function startStatusIntervalPolling() {
     rideStatusPolling = setInterval(async () => {
         if (activeRequestId) {
             await checkRideStatus();
@@ -1652,8 +1692,12 @@ function startRideStatusPolling() {
     }, 10000); // Check every 10 seconds to reduce API calls
 }
 
-// Stop ride status polling
+// Stop ride status updates (event stream and polling)
 function stopRideStatusPolling() {
+    if (rideEventSource) {
+        rideEventSource.close();
+        rideEventSource = null;
+    }
     if (rideStatusPolling) {
         clearInterval(rideStatusPolling);
         rideStatusPolling = null;
@@ -1758,12 +1802,43 @@ async function checkRideStatus() {
     }
 }
 
-// Start tracking driver location during active ride
+// Start tracking driver location during active ride.
+// Positions are pushed over the live WebSocket channel; polling is the fallback.
 function startDriverLocationTracking() {
     if (driverTrackingInterval) {
         clearInterval(driverTrackingInterval);
+        driverTrackingInterval = null;
+    }
+    
+    if (window.WebSocket && activeRequestId) {
+        if (liveLocationSocket) return; // Already connected
+        
+        updateDriverLocation(); // Show the last known position straight away
+        
+        const wsUrl = `${API_URL.replace(/^http/, 'ws')}/rides/live/${activeRequestId}?token=${encodeURIComponent(getAuthToken())}`;
+        liveLocationSocket = new WebSocket(wsUrl);
+        
+        liveLocationSocket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === 'location' && message.role === 'driver') {
+                showDriverLocation(message.coordinates);
+            }
+        };
+        
+        liveLocationSocket.onclose = () => {
+            liveLocationSocket = null;
+            if (activeRequestId) startDriverLocationPolling();
+        };
+        return;
     }
     
+    startDriverLocationPolling();
+}
+
+// Fallback: poll the driver's location on a timer
+function startDriverLocationPolling() {
+    if (driverTrackingInterval) return;
+    
     driverTrackingInterval = setInterval(async () => {
         if (activeRequestId) {
             await updateDriverLocation();
@@ -1773,6 +1848,11 @@ function startDriverLocationTracking() {
 
 // Stop tracking driver location
 function stopDriverLocationTracking() {
+    if (liveLocationSocket) {
+        liveLocationSocket.onclose = null;
+        liveLocationSocket.close();
+        liveLocationSocket = null;
+    }
     if (driverTrackingInterval) {
         clearInterval(driverTrackingInterval);
         driverTrackingInterval = null;
@@ -1785,24 +1865,7 @@ async function updateDriverLocation() {
         const response = await apiCall(`/rides/driver-location/${activeRequestId}`, 'GET');
         
         if (response.driver_location) {
-            // Update driver marker on map
-            const driverCoords = response.driver_location;
-            if (liveDriverMarker) {
-                liveDriverMarker.setMap(null);
-            }
-            
-            liveDriverMarker = new google.maps.Marker({
-                position: { lat: driverCoords[1], lng: driverCoords[0] },
-                map: map,
-                title: 'Your Driver',
-                icon: {
-                    url: 'data:image/svg+xml;charset=UTF-8,<svg xmlns="http://www.w3.org/2000/svg" width="40" height="40" viewBox="0 0 24 24" fill="%23FF6B35"><path d="M12 2C8.13 2 5 5.13 5 9c0 5.25 7 13 7 13s7-7.75 7-13c0-3.87-3.13-7-7-7zm0 9.5c-1.38 0-2.5-1.12-2.5-2.5s1.12-2.5 2.5-2.5 2.5 1.12 2.5 2.5-1.12 2.5-2.5 2.5z"/></svg>',
-                    scaledSize: new google.maps.Size(40, 40)
-                }
-            });
-            
-            // Center map on driver location
-            map.setCenter({ lat: driverCoords[1], lng: driverCoords[0] });
+            showDriverLocation(response.driver_location);
         }
         
     } catch (error) {
@@ -1810,6 +1873,28 @@ async function updateDriverLocation() {
     }
 }
 
+// Draw the driver's marker and centre the map on it
+function showDriverLocation(driverCoords) {
+    if (!map || !driverCoords) return;
+    
+    if (liveDriverMarker) {
+        liveDriverMarker.setMap(null);
+    }
+    
+    liveDriverMarker = new google.maps.Marker({
+        position: { lat: driverCoords[1], lng: driverCoords[0] },
+        map: map,
+        title: 'Your Driver',
+        icon: {
+            url: 'data:image/svg+xml;charset=UTF-8,<svg xmlns="http://www.w3.org/2000/svg" width="40" height="40" viewBox="0 0 24 24" fill="%23FF6B35"><path d="M12 2C8.13 2 5 5.13 5 9c0 5.25 7 13 7 13s7-7.75 7-13c0-3.87-3.13-7-7-7zm0 9.5c-1.38 0-2.5-1.12-2.5-2.5s1.12-2.5 2.5-2.5 2.5 1.12 2.5 2.5-1.12 2.5-2.5 2.5z"/></svg>',
+            scaledSize: new google.maps.Size(40, 40)
+        }
+    });
+    
+    // Center map on driver location
+    map.setCenter({ lat: driverCoords[1], lng: driverCoords[0] });
+}
+
 // Share rider location with driver
 async function shareRiderLocation() {
     try {
@@ -1828,11 +1913,15 @@ async function shareRiderLocation() {
         
         const coords = [position.coords.longitude, position.coords.latitude];
         
-        // Call backend to share location (we'll need to add this endpoint)
-        const response = await apiCall('/rides/share-rider-location', 'POST', {
-            request_id: activeRequestId,
-            current_location: coords
-        });
+        if (liveLocationSocket && liveLocationSocket.readyState === WebSocket.OPEN) {
+            // Relay straight to the driver over the live channel
+            liveLocationSocket.send(JSON.stringify({ type: 'location', coordinates: coords }));
+        } else {
+            await apiCall('/rides/share-rider-location', 'POST', {
+                request_id: activeRequestId,
+                current_location: coords
+            });
+        }
         
         showStatus('📍 Location shared with driver!', 'success');
         